@@ -20,6 +20,7 @@ from pychess.Utils.const import FEN_START, reprResult
 from pychess.Variants import name2variant
 from pychess.System import profile_me, Timer
 from pychess.System.protoopen import protoopen
+from pychess.Utils.eco import get_deepest_eco
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Savers.pgnbase import pgn_load
 from pychess.Database.dbwalk import walk
@@ -281,6 +282,12 @@ class PgnImport():
 
                     eco = get_tag(i, "ECO")
                     eco = eco[:3] if eco else None
+                    if eco is None and variant == 0:
+                        # classify the games without an ECO tag, by the
+                        # deepest known opening of their first 40 plies
+                        opening = get_deepest_eco(b.hash for b in boards[1:40])
+                        if opening is not None:
+                            eco = opening[0]
 
                     fen = get_tag(i, "FEN")
 
@@ -3,7 +3,7 @@ from __future__ import print_function
 import os
 import random
 import sys
-from time import time
+from time import sleep, time
 
 this_dir = os.path.dirname(os.path.abspath(__file__))
 if os.path.join(this_dir, "../..") not in sys.path:
@@ -13,12 +13,15 @@ from pychess.Utils.book import getOpenings  # nopep8
 from pychess.Utils.const import WHITE, ASEANCHESS, SITTUYINCHESS, ATOMICCHESS, reprResult, \
     CAMBODIANCHESS, LOSERSCHESS, KINGOFTHEHILLCHESS, DRAW, BLACKWON, WHITEWON, MAKRUKCHESS, \
     SUICIDECHESS, THREECHECKCHESS  # nopep8
-from pychess.Utils.lutils import lsearch  # nopep8
+from pychess.Utils.lutils import lsearch, lsmp  # nopep8
 from pychess.Utils.lutils.ldata import MAXPLY  # nopep8
-from pychess.Utils.lutils.lsearch import alphaBeta  # nopep8
+from pychess.Utils.lutils.lsearch import aspirationSearch  # nopep8
 from pychess.Utils.lutils.lmove import listToSan, toSAN  # nopep8
 from pychess.System.Log import log  # nopep8
 
+# How often (in seconds) a finished ponder search checks for the opponent's move
+PONDER_POLL_INTERVAL = 0.01
+
 
 class PyChess(object):
 
@@ -32,7 +35,12 @@ class PyChess(object):
         self.searchtime = 0
         self.scr = 0  # The current predicted score. Used when accepting draw offers
         self.playingAs = WHITE
-        self.ponder = False  # Currently unused
+        self.ponder = False  # Think on the expected reply in opponent's time
+        self.pondering = False  # Currently thinking on self.ponderMove
+        self.ponderMove = None  # The reply expected after our last move
+        self.ponderStart = 0
+        self.ponderHitTime = 0
+        self.cores = 1
         self.post = False
         self.debug = True
         self.outOfBook = False
@@ -76,68 +84,125 @@ class PyChess(object):
             self.outOfBook = True
         return choice
 
-    def __go(self, ondone=None):
-        """ Finds and prints the best move from the current position """
-
-        mv = False if self.outOfBook else self.__getBestOpening()
+    def __getUseTime(self):
+        """ How many seconds to spend on the current move """
+        if self.searchtime > 0:
+            return self.searchtime
+        usetime = self.clock[self.playingAs] / self.__remainingMovesA()
+        if self.clock[self.playingAs] > 10:
+            # If we have time, we assume 40 moves rather than 80
+            usetime *= 2
+        # The increment is a constant. We'll use this always
+        return usetime + self.increment[self.playingAs]
+
+    def __ponderHit(self):
+        """ The opponent played self.ponderMove. The running ponder search
+            continues as the real search, and the time it has already spent
+            counts towards the time for the move. If that is used up, the
+            move is played at once. """
+        self.ponderHitTime = time()
+        if self.basetime > 0:
+            lsearch.endtime = self.ponderStart + self.__getUseTime()
+        self.pondering = False
+
+    def __go(self, ondone=None, board=None):
+        """ Finds and prints the best move from the current position.
+            When pondering, board is the position after the expected reply,
+            and the search goes on until __ponderHit is called, or it is
+            stopped. """
+
+        if board is None:
+            board = self.board
+
+        mv = False if self.outOfBook or self.pondering else \
+            self.__getBestOpening()
         if mv:
             mvs = [mv]
 
         if not mv:
 
             lsearch.skipPruneChance = self.skipPruneChance
-            lsearch.searching = True
+            lsearch.stats.reset()
+            if not self.pondering:
+                # A ponder search was started as part of starting to ponder
+                lsearch.searching = True
 
             timed = self.basetime > 0
-
-            if self.searchtime > 0:
-                usetime = self.searchtime
-            else:
-                usetime = self.clock[self.playingAs] / self.__remainingMovesA()
-                if self.clock[self.playingAs] > 10:
-                    # If we have time, we assume 40 moves rather than 80
-                    usetime *= 2
-                # The increment is a constant. We'll use this always
-                usetime += self.increment[self.playingAs]
+            usetime = self.__getUseTime()
 
             prevtime = 0
             starttime = time()
             lsearch.endtime = starttime + usetime if timed else sys.maxsize
+            if self.pondering:
+                # The clock starts at the ponder hit
+                self.ponderStart = starttime
+                lsearch.endtime = sys.maxsize
             if self.debug:
-                if timed:
+                if self.pondering:
+                    self.print("# Pondering on %s" %
+                               toSAN(self.board, self.ponderMove))
+                elif timed:
                     self.print(
                         "# Time left: %3.2f s; Planing to think for %3.2f s" %
                         (self.clock[self.playingAs], usetime))
                 else:
                     self.print("# Searching to depth %d without timelimit" %
                                self.sd)
+                if self.cores > 1:
+                    self.print("# Searching with %d processes" % self.cores)
 
-            for depth in range(1, self.sd + 1):
-                # Heuristic time saving
-                # Don't waste time, if the estimated isn't enough to complete
-                # next depth
-                if timed and usetime <= prevtime * 4 and usetime > 1:
-                    break
-                lsearch.timecheck_counter = lsearch.TIMECHECK_FREQ
-                search_result = alphaBeta(self.board, depth)
-                if lsearch.searching:
-                    mvs, self.scr = search_result
-                    if time() > lsearch.endtime:
-                        break
+            if self.cores > 1:
+                def onIteration(depth, score, nodes, mvs):
                     if self.post:
-                        pv1 = " ".join(listToSan(self.board, mvs))
+                        pv1 = " ".join(listToSan(board, mvs))
                         time_cs = int(100 * (time() - starttime))
                         self.print("%s %s %s %s %s" % (
-                            depth, self.scr, time_cs, lsearch.nodes, pv1))
-                else:
-                    # We were interrupted
-                    if depth == 1:
+                            depth, score, time_cs, nodes, pv1))
+                        self.print("# stats %s" % lsearch.stats)
+
+                mvs, self.scr, depth = lsmp.search(
+                    board, self.sd, self.cores, self.skipPruneChance,
+                    onIteration)
+            else:
+                for depth in range(1, self.sd + 1):
+                    # Heuristic time saving
+                    # Don't waste time, if the estimated isn't enough to complete
+                    # next depth
+                    usetime = lsearch.endtime - starttime
+                    if timed and usetime <= prevtime * 4 and usetime > 1:
+                        break
+                    lsearch.timecheck_counter = lsearch.TIMECHECK_FREQ
+                    search_result = aspirationSearch(board, depth,
+                                                     self.scr)
+                    if lsearch.searching:
                         mvs, self.scr = search_result
-                    break
-                prevtime = time() - starttime - prevtime
+                        if time() > lsearch.endtime:
+                            break
+                        if self.post:
+                            pv1 = " ".join(listToSan(board, mvs))
+                            time_cs = int(100 * (time() - starttime))
+                            self.print("%s %s %s %s %s" % (
+                                depth, self.scr, time_cs, lsearch.nodes, pv1))
+                            self.print("# stats %s" % lsearch.stats)
+                    else:
+                        # We were interrupted
+                        if depth == 1:
+                            mvs, self.scr = search_result
+                        break
+                    prevtime = time() - starttime - prevtime
+
+            # A ponder search waits for the opponent's move, even if it has
+            # nothing left to search.
+            while self.pondering and lsearch.searching:
+                sleep(PONDER_POLL_INTERVAL)
+            if self.pondering:
+                # The opponent didn't play the expected move
+                lsearch.nodes = 0
+                return
 
-                self.clock[self.playingAs] -= time(
-                ) - starttime - self.increment[self.playingAs]
+            # Until a ponder hit, the time was the opponent's
+            self.clock[self.playingAs] -= time() - max(
+                starttime, self.ponderHitTime) - self.increment[self.playingAs]
 
             if not mvs:
                 if not lsearch.searching:
@@ -150,12 +215,12 @@ class PyChess(object):
                 if self.scr == 0:
                     self.print("result %s" % reprResult[DRAW])
                 elif self.scr < 0:
-                    if self.board.color == WHITE:
+                    if board.color == WHITE:
                         self.print("result %s" % reprResult[BLACKWON])
                     else:
                         self.print("result %s" % reprResult[WHITEWON])
                 else:
-                    if self.board.color == WHITE:
+                    if board.color == WHITE:
                         self.print("result %s" % reprResult[WHITEWON])
                     else:
                         self.print("result %s" % reprResult[BLACKWON])
@@ -165,7 +230,8 @@ class PyChess(object):
             lsearch.searching = False
 
         move = mvs[0]
-        sanmove = toSAN(self.board, move)
+        sanmove = toSAN(board, move)
+        self.ponderMove = mvs[1] if len(mvs) > 1 else None
         if ondone:
             ondone(sanmove)
         return sanmove
@@ -177,17 +243,20 @@ class PyChess(object):
         start = time()
         lsearch.endtime = sys.maxsize
         lsearch.searching = True
+        lsearch.stats.reset()
 
+        scr = 0
         for depth in range(1, self.sd):
             if not lsearch.searching:
                 break
             board = self.board.clone()
-            mvs, scr = alphaBeta(board, depth)
+            mvs, scr = aspirationSearch(board, depth, scr)
 
             pv1 = " ".join(listToSan(board, mvs))
             time_cs = int(100 * (time() - start))
             self.print("%s %s %s %s %s" %
                        (depth, scr, time_cs, lsearch.nodes, pv1))
+            self.print("# stats %s" % lsearch.stats)
 
             lsearch.nodes = 0
 
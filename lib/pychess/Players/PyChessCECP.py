@@ -3,7 +3,7 @@ from __future__ import print_function
 import re
 import signal
 import sys
-from threading import Thread
+from threading import Lock, Thread
 
 import pychess
 from pychess.compat import raw_input
@@ -14,11 +14,12 @@ from pychess.Utils.const import NORMALCHESS, FEN_START, BLACK, FISCHERRANDOMCHES
     CRAZYHOUSECHESS, WILDCASTLESHUFFLECHESS, LOSERSCHESS, SUICIDECHESS, ATOMICCHESS, \
     THREECHECKCHESS, KINGOFTHEHILLCHESS, ASEANCHESS, MAKRUKCHESS, CAMBODIANCHESS, \
     SITTUYINCHESS, WHITE
-from pychess.Utils.lutils.Benchmark import benchmark
+from pychess.Utils.lutils.Benchmark import benchmark, benchmarkTables
 from pychess.Utils.lutils.perft import perft
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.ldata import MAXPLY
 from pychess.Utils.lutils import lsearch, leval
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable
 from pychess.Utils.lutils.lmove import parseSAN, parseAny, toSAN, ParsingError
 from pychess.Utils.lutils.lmovegen import genAllMoves, genCaptures, genCheckEvasions
 from pychess.Utils.lutils.validator import validateMove
@@ -41,6 +42,10 @@ class PyChessCECP(PyChess):
         self.forced = False
         self.analyzing = False
         self.thread = None
+        # Guards the switches between searching, pondering and stopping, which
+        # happen on both the search thread and the input thread.
+        self.ponderLock = Lock()
+        self.stopped = False
 
         self.basetime = 0
 
@@ -65,8 +70,8 @@ class PyChessCECP(PyChess):
             "pause": 0,  # Unimplemented
             "nps": 0,  # Unimplemented
             "debug": 1,
-            "memory": 0,  # Unimplemented
-            "smp": 0,  # Unimplemented
+            "memory": 1,
+            "smp": 1,
             "egt": "gaviota",
             "option": "skipPruneChance -slider 0 0 100"
         }
@@ -142,7 +147,6 @@ class PyChessCECP(PyChess):
                             self.board.variant = SUICIDECHESS
                         elif lines[1] == "atomic":
                             self.board.variant = ATOMICCHESS
-                            self.board.iniAtomic()
                         elif lines[1] == "3check":
                             self.board.variant = THREECHECKCHESS
                         elif lines[1] == "kingofthehill":
@@ -175,6 +179,9 @@ class PyChessCECP(PyChess):
                             self.print("piece R& R@1")
                             self.print("piece K& Kj@3")
                             self.print("piece P& fmWfcFj@3")
+                        # The board may have been kept, with the material of
+                        # its old variant
+                        self.board.iniMaterial()
 
                 elif lines[0] == "quit":
                     self.forced = True
@@ -237,6 +244,8 @@ class PyChessCECP(PyChess):
                     self.clock[1 - self.playingAs] = float(lines[1]) / 100.
 
                 elif lines[0] == "usermove":
+                    if self.__ponderHit(lines[1]):
+                        continue
                     self.__stopSearching()
                     try:
                         move = parseAny(self.board, lines[1])
@@ -284,7 +293,9 @@ class PyChessCECP(PyChess):
                 # "edit" is unimplemented. See docs. Exiting edit mode returns to analyze mode.
 
                 elif lines[0] == "hint":
-                    pass  # TODO: Respond "Hint: MOVE" if we have an expected reply
+                    move = self.ponderMove
+                    if move is not None and self.board.color != self.playingAs:
+                        self.print("Hint: %s" % toSAN(self.board, move))
 
                 elif lines[0] == "bk":
                     entries = getOpenings(self.board)
@@ -310,6 +321,8 @@ class PyChessCECP(PyChess):
 
                 elif lines[0] in ("hard", "easy"):
                     self.ponder = (lines[0] == "hard")
+                    if not self.ponder and self.pondering:
+                        self.__stopSearching()
 
                 elif lines[0] in ("post", "nopost"):
                     self.post = (lines[0] == "post")
@@ -323,21 +336,58 @@ class PyChessCECP(PyChess):
 
                 # Unimplemented: pause, resume
 
-                elif lines[0] == "memory":
-                    # FIXME: this is supposed to control the *total* memory use.
+                elif lines[0] in ("memory", "hash"):
+                    # FIXME: "memory" is supposed to control the *total*
+                    # memory use. We only use it for the hash table.
+                    if lsearch.searching:
+                        self.print("Error (already searching):", line)
+                    else:
+                        limit = int(lines[1])
+                        if limit < 1:
+                            self.print("Error (limit too low):", line)
+                        else:
+                            lsearch.setHashSize(limit * 1024 * 1024)
+
+                elif lines[0] == "pawnhash":
                     if lsearch.searching:
                         self.print("Error (already searching):", line)
+                    elif len(lines) > 1 and lines[1] == "stats":
+                        table = leval.pawnTable
+                        self.print("Pawn table: %d probes, %.1f%% hits, "
+                                   "%d collisions, %d reuses of the last "
+                                   "entry" %
+                                   (table.probes, 100 * table.hitRate(),
+                                    table.collisions, table.lastKeyHits))
                     else:
                         limit = int(lines[1])
                         if limit < 1:
                             self.print("Error (limit too low):", line)
                         else:
-                            pass
-                            # TODO implement
-                            # lsearch.setHashSize(limit)
+                            leval.setPawnTableSize(limit * 1024 * 1024)
+
+                elif lines[0] == "hashtable":
+                    if lsearch.searching:
+                        self.print("Error (already searching):", line)
+                    elif len(lines) > 1 and lines[1] == "numpy":
+                        try:
+                            from pychess.Utils.lutils.NumpyTranspositionTable \
+                                import NumpyTranspositionTable
+                        except ImportError:
+                            self.print("Error (NumPy is not available):", line)
+                        else:
+                            lsearch.setTableClass(NumpyTranspositionTable)
+                    elif len(lines) > 1 and lines[1] == "struct":
+                        lsearch.setTableClass(TranspositionTable)
+                    else:
+                        self.print("Usage: hashtable struct|numpy")
 
                 elif lines[0] == "cores":
-                    pass  # We aren't SMP-capable.
+                    cores = int(lines[1])
+                    if cores < 1:
+                        self.print("Error (cores must be at least 1): %s" %
+                                   line)
+                    else:
+                        self.cores = cores
 
                 elif lines[0] == "egtpath":
                     if len(lines) >= 3 and lines[1] == "gaviota":
@@ -345,6 +395,21 @@ class PyChessCECP(PyChess):
                         from pychess.Utils.lutils.lsearch import enableEGTB
                         enableEGTB()
 
+                elif lines[0] == "egtbstats":
+                    if lsearch.egtb is None:
+                        self.print("Error (no endgame tables):", line)
+                    else:
+                        tbstats = lsearch.egtb.getStats()
+                        self.print("EGTB cache: %d probes, %d hits" %
+                                   (tbstats["cacheProbes"],
+                                    tbstats["cacheHits"]))
+                        if "total_hits" in tbstats:
+                            self.print("EGTB library: %d WDL and %d DTM "
+                                       "hits, %d files opened" %
+                                       (tbstats["total_hits"][0],
+                                        tbstats["total_hits"][1],
+                                        tbstats["files_opened"]))
+
                 elif lines[0] == "option" and len(lines) > 1:
                     name, eq, value = lines[1].partition("=")
                     if value:
@@ -386,8 +451,15 @@ class PyChessCECP(PyChess):
                     self.print([toSAN(self.board, move)
                                 for move in genCheckEvasions(self.board)])
 
+                elif lines[0] == "stats":
+                    # Counters of the last search
+                    self.print("# stats %s" % lsearch.stats)
+
                 elif lines[0] == "benchmark":
-                    benchmark()
+                    if len(lines) > 1 and lines[1] == "tables":
+                        benchmarkTables()
+                    else:
+                        benchmark()
 
                 elif lines[0] == "profile":
                     if len(lines) > 1:
@@ -405,6 +477,16 @@ class PyChessCECP(PyChess):
                     else:
                         self.print("Error (arguments must be integer")
 
+                elif lines[0] == "fastperft":
+                    # Bulk counted and hashed perft, with the root moves split
+                    # among the processes set by the cores command
+                    root = "0" if len(lines) < 3 else lines[2]
+                    depth = "1" if len(lines) == 1 else lines[1]
+                    if root.isdigit() and depth.isdigit():
+                        perft(self.board, int(depth), int(root), self.cores)
+                    else:
+                        self.print("Error (arguments must be integer")
+
                 elif len(lines) == 1:
                     # A GUI without usermove support might try to send a move.
                     try:
@@ -430,7 +512,9 @@ class PyChessCECP(PyChess):
                 self.print("Error (missing argument): %s" % line)
 
     def __stopSearching(self):
-        lsearch.searching = False
+        with self.ponderLock:
+            self.stopped = True
+            lsearch.searching = False
         if self.thread:
             self.thread.join()
 
@@ -439,14 +523,54 @@ class PyChessCECP(PyChess):
             if not self.forced:
                 self.board.applyMove(parseSAN(self.board, result))
                 self.print("move %s" % result)
-            # TODO: start pondering, if enabled
 
-        self.thread = Thread(target=PyChess._PyChess__go,
-                             name=fident(PyChess._PyChess__go),
-                             args=(self, ondone))
+        self.stopped = False
+        self.thread = Thread(target=self.__think,
+                             name=fident(self.__think),
+                             args=(ondone, ))
         self.thread.daemon = True
         self.thread.start()
 
+    def __think(self, ondone):
+        """ Searches for our move, then ponders on the expected reply for as
+            long as the opponent plays the moves we expect """
+        PyChess._PyChess__go(self, ondone)
+        while self.__startPondering():
+            board = self.board.clone()
+            board.applyMove(self.ponderMove)
+            PyChess._PyChess__go(self, ondone, board)
+            if self.pondering:
+                self.pondering = False
+                break
+
+    def __startPondering(self):
+        with self.ponderLock:
+            if self.stopped or self.forced or self.analyzing or \
+                    not self.ponder or self.ponderMove is None or \
+                    self.board.color == self.playingAs:
+                return False
+            self.pondering = True
+            lsearch.searching = True
+            return True
+
+    def __ponderHit(self, text):
+        """ If we are pondering on the move in text, plays it on the board,
+            lets the running search continue as our real search, and returns
+            True """
+        with self.ponderLock:
+            if not self.pondering:
+                return False
+            try:
+                move = parseAny(self.board, text)
+            except ParsingError:
+                return False
+            if move != self.ponderMove:
+                return False
+            self.board.applyMove(move)
+            self.playingAs = self.board.color
+            PyChess._PyChess__ponderHit(self)
+            return True
+
     def __analyze(self):
         self.thread = Thread(target=PyChess._PyChess__analyze,
                              name=fident(PyChess._PyChess__analyze),
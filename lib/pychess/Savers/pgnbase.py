@@ -38,6 +38,7 @@ class PgnBase(ChessFile):
     def __init__(self, file, games):
         ChessFile.__init__(self, file, games)
         self.tagcache = {}
+        self.error = None
 
     def parse_string(self, string, board, position, variation=False, pgn_import=False):
         """Recursive parses a movelist part of one game.
@@ -266,7 +267,12 @@ tagre = re.compile(r"\[([a-zA-Z0-9_]+)\s+\"(.*?)\"\]")
 
 
 def pgn_load(file, klass=PgnBase):
-    games = []
+    return klass(file, list(pgn_games(file)))
+
+
+def pgn_games(file):
+    """ Yields the [tags, movetext] of each game of the file, one at a time,
+        so big files can be walked without holding all their games """
     in_tags = False
 
     tags = []
@@ -284,7 +290,7 @@ def pgn_load(file, klass=PgnBase):
                 if not in_tags:
                     # new game starting
                     if moves:
-                        games.append(["".join(tags), "".join(moves)])
+                        yield ["".join(tags), "".join(moves)]
                         tags = []
                         moves = []
 
@@ -300,9 +306,7 @@ def pgn_load(file, klass=PgnBase):
             moves.append(line)
 
     if moves:
-        games.append(["".join(tags), "".join(moves)])
-
-    return klass(file, games)
+        yield ["".join(tags), "".join(moves)]
 
 
 nag2symbolDict = {
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 from gi.repository import GObject
 
 from .Move import Move
+from .lutils.bitboard import bitCount
 from .lutils.egtb_k4it import EgtbK4kit
 from .lutils.egtb_gaviota import EgtbGaviota
 
@@ -24,7 +25,7 @@ class EndgameTable(GObject.GObject):
         self.providers = providers
 
     def _pieceCounts(self, board):
-        return sorted([bin(board.friends[i]).count("1") for i in range(2)])
+        return sorted([bitCount(board.friends[i]) for i in range(2)])
 
     def scoreGame(self, lBoard, omitDepth=False, probeSoft=False):
         """ Return result and depth to mate. (Intended for engine use.)
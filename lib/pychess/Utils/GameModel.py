@@ -13,7 +13,7 @@ from pychess.System import conf, fident
 from pychess.System.protoopen import protoopen, protosave, isWriteable
 from pychess.System.Log import log
 from pychess.Utils.Move import Move
-from pychess.Utils.eco import get_eco
+from pychess.Utils.eco import get_eco, get_deepest_eco
 from pychess.Utils.Offer import Offer
 from pychess.Utils.TimeModel import TimeModel
 from pychess.Variants.normal import NormalBoard
@@ -338,6 +338,21 @@ class GameModel(GObject.GObject, Thread):
             self.tags["Variation"] = opening[2]
             self.emit("opening_changed")
 
+    def setDeepestOpening(self):
+        """ Sets the opening of a loaded game at once, to the deepest one
+            known in its first 40 plies, like setOpening would move by move """
+        last = min(40, self.ply, len(self.boards))
+        if last == 0:
+            return
+        opening = get_deepest_eco(self.getBoardAtPly(ply).board.hash
+                                  for ply in range(1, last))
+        if opening is None:
+            opening = ("", "", "")
+        self.tags["ECO"] = opening[0]
+        self.tags["Opening"] = opening[1]
+        self.tags["Variation"] = opening[2]
+        self.emit("opening_changed")
+
     # Board stuff
 
     def _get_ply(self):
@@ -1,9 +1,11 @@
 from __future__ import print_function
 
+import mmap
 import os
 import sys
+from array import array
+from bisect import bisect_left
 from struct import Struct
-from collections import namedtuple
 
 from pychess.System import conf
 from pychess.System.prefix import addDataPrefix
@@ -20,18 +22,10 @@ if getattr(sys, 'frozen', False):
 else:
     default_path = os.path.join(addDataPrefix("pychess_book.bin"))
 
-path = conf.get("opening_file_entry", default_path)
-
-if os.path.isfile(path):
-    bookfile = True
-else:
-    bookfile = False
-    log.warning("Could not find %s" % path)
-
 # The book probing code is based on that of PolyGlot by Fabien Letouzey.
 # PolyGlot is available under the GNU GPL from http://wbec-ridderkerk.nl
 
-BookEntry = namedtuple('BookEntry', 'key move weight games score')
+# An entry is made of:
 # 'key' c_uint64      the position's hash
 # 'move' c_uint16     the candidate move
 # 'weight' c_uint16   proportional to prob. we should play it
@@ -41,47 +35,123 @@ BookEntry = namedtuple('BookEntry', 'key move weight games score')
 
 entrystruct = Struct(">QHHHH")
 entrysize = entrystruct.size
+keystruct = Struct(">Q")
 
+# Books of up to this many entries get an index of their keys in memory (8
+# bytes per entry). Bigger ones are binary searched in the mapped file.
+INDEX_LIMIT = 1 << 24
 
-def getOpenings(board):
-    """ Return a tuple (move, weight, games, score) for each opening move
-        in the given position. The weight is proportional to the probability
-        that a move should be played. By convention, games is the number of
-        times a move has been tried, and score the number of points it has
-        scored (with 2 per victory and 1 per draw). However, opening books
-        aren't required to keep this information. """
 
-    openings = []
-    if not bookfile:
-        return openings
-
-    with open(path, "rb") as bookFile:
-        key = board.hash
-        # Find the first entry whose key is >= the position's hash
-        bookFile.seek(0, os.SEEK_END)
-        low, high = 0, bookFile.tell() // 16 - 1
-        if high < 0:
-            return openings
+class PolyglotBook(object):
+    """ A Polyglot opening book, mapped into memory once, so probing it
+        makes no system calls. The entries are sorted by key, which is
+        binary searched in an index of the keys, or in the mapped file. """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = None
+        self.keys = None
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.count = size // entrysize
+            if self.count:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if 0 < self.count <= INDEX_LIMIT:
+            try:
+                words = array("Q")
+            except ValueError:
+                # Python 2 has no arrays of unsigned long longs
+                words = None
+            if words is not None and words.itemsize == 8:
+                words.frombytes(self.data[:self.count * entrysize])
+                if sys.byteorder == "little":
+                    words.byteswap()
+                # The key is the first of the two words of each entry
+                self.keys = words[::2]
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.keys = None
+        self.count = 0
+
+    # A book replaced by loadBook may still be read by a getOpenings call on
+    # another thread, so it is only closed once the last reference is gone.
+    __del__ = close
+
+    def find(self, key):
+        """ Returns the index of the first entry whose key is >= key """
+        if self.keys is not None:
+            return bisect_left(self.keys, key)
+        low, high = 0, self.count
         while low < high:
             mid = (low + high) // 2
-            bookFile.seek(mid * 16)
-            entry = bookFile.read(entrysize)
-            if len(entry) != entrysize:
-                return openings
-            entry = BookEntry._make(entrystruct.unpack(entry))
-            if entry.key < key:
+            if keystruct.unpack_from(self.data, mid * entrysize)[0] < key:
                 low = mid + 1
             else:
                 high = mid
+        return low
 
-        bookFile.seek(low * 16)
-        while True:
-            entry = bookFile.read(entrysize)
-            if len(entry) != entrysize:
-                return openings
-            entry = BookEntry._make(entrystruct.unpack(entry))
-            if entry.key != key:
+    def entries(self, key):
+        """ Returns a list of (move, weight, games, score) tuples of the
+            entries of key, with the moves as Polyglot encodes them """
+        entries = []
+        index = self.find(key)
+        while index < self.count:
+            entry = entrystruct.unpack_from(self.data, index * entrysize)
+            if entry[0] != key:
                 break
-            move = parsePolyglot(board, entry.move)
-            openings.append((move, entry.weight, entry.games, entry.score))
-    return openings
+            entries.append(entry[1:])
+            index += 1
+        return entries
+
+    def __iter__(self):
+        """ Yields all the (key, move, weight, games, score) entries """
+        for index in range(self.count):
+            yield entrystruct.unpack_from(self.data, index * entrysize)
+
+    def getOpenings(self, board):
+        return [(parsePolyglot(board, move), weight, games, score)
+                for move, weight, games, score in self.entries(board.hash)]
+
+
+path = None
+bookfile = False
+book = None
+
+
+def loadBook(*args):
+    """ Opens the book of the opening_file_entry of conf (pychess_book.bin
+        by default). Called again whenever it changes. """
+    global path, bookfile, book
+    path = conf.get("opening_file_entry", default_path)
+    new = None
+    if os.path.isfile(path):
+        try:
+            new = PolyglotBook(path)
+        except (IOError, OSError, ValueError) as err:
+            log.warning("Could not open %s: %s" % (path, err))
+    else:
+        log.warning("Could not find %s" % path)
+    # The previous book closes itself when its readers are done with it
+    book = new
+    bookfile = book is not None
+
+
+loadBook()
+conf.notify_add("opening_file_entry", loadBook)
+
+
+def getOpenings(board):
+    """ Return a tuple (move, weight, games, score) for each opening move
+        in the given position. The weight is proportional to the probability
+        that a move should be played. By convention, games is the number of
+        times a move has been tried, and score the number of points it has
+        scored (with 2 per victory and 1 per draw). However, opening books
+        aren't required to keep this information. """
+
+    if book is None:
+        return []
+    return book.getOpenings(board)
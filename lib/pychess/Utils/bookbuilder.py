@@ -0,0 +1,423 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+# Builds Polyglot opening books from games, and merges books.
+#
+# The games are read one at a time, from PGN files or from the PyChess
+# database, and the results of each (position, move) are counted. When too
+# many have been counted, they are written to a temporary file, sorted, and
+# counting starts over, so building a book from millions of games takes a
+# bounded amount of memory. The sorted runs are then merged into the book.
+
+import heapq
+import os
+import sys
+import tempfile
+from array import array
+from struct import Struct
+
+from pychess.compat import open
+from pychess.System.protoopen import PGN_ENCODING
+from pychess.Utils.const import WHITE, DRAW, WHITEWON, BLACKWON, \
+    NORMALCHESS, FEN_START
+from pychess.Utils.book import PolyglotBook, entrystruct
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import toPolyglot
+
+# The counts of a (position, move) in the temporary runs: the key, the move,
+# and the wins, draws and losses of the side to move
+runstruct = Struct(">QHIII")
+
+# Moves deeper than this are left out of the books
+MAX_PLY = 60
+
+# Counts kept in memory before they are written to a run. Each takes about
+# 150 bytes.
+MAX_ENTRIES = 1 << 19
+
+RESULTS = (WHITEWON, DRAW, BLACKWON)
+
+
+class GameFilter(object):
+    """ Tells which games go into a book. minElo is the lowest rating of
+        both players, fromDate and toDate are inclusive (year, month, day)
+        tuples, and results the accepted results of the games. Games missing
+        the rating or date that is filtered on are left out. """
+
+    def __init__(self, minElo=None, fromDate=None, toDate=None,
+                 results=RESULTS):
+        self.minElo = minElo
+        self.fromDate = tuple(fromDate) if fromDate else None
+        self.toDate = tuple(toDate) if toDate else None
+        self.results = results
+
+    def accept(self, whiteElo, blackElo, date, result):
+        """ The ratings may be None, and date is a (year, month, day) tuple
+            with 0 for the unknown parts """
+        if result not in self.results:
+            return False
+        if self.minElo is not None:
+            if whiteElo is None or blackElo is None or \
+                    min(whiteElo, blackElo) < self.minElo:
+                return False
+        if self.fromDate is not None or self.toDate is not None:
+            if not date[0]:
+                return False
+            if self.fromDate is not None and date < self.fromDate:
+                return False
+            if self.toDate is not None and \
+                    date[:len(self.toDate)] > self.toDate:
+                return False
+        return True
+
+
+def parseDate(text):
+    """ Returns the (year, month, day) of a PGN date, like 2016.04.?? """
+    date = [0, 0, 0]
+    for i, part in enumerate(text.split(".")[:3]):
+        if part.isdigit():
+            date[i] = int(part)
+    return tuple(date)
+
+
+def _rating(text):
+    return int(text) if text and text.isdigit() else None
+
+
+def pgnGames(path, gameFilter=None, maxPly=MAX_PLY):
+    """ Yields the positions and the result of the normal chess games of a
+        PGN file, which gameFilter accepts. The positions are (key, move,
+        color) tuples, with the move in Polyglot format, up to maxPly. """
+    from pychess.Savers.pgnbase import PgnBase, pgn_games
+
+    if gameFilter is None:
+        gameFilter = GameFilter()
+    with open(path, "r", encoding=PGN_ENCODING) as file:
+        for game in pgn_games(file):
+            pgnfile = PgnBase(file, [game])
+            if pgnfile.get_variant(0) not in ("", "Normal"):
+                continue
+            result = pgnfile.get_result(0)
+            if not gameFilter.accept(
+                    _rating(pgnfile._getTag(0, "WhiteElo")),
+                    _rating(pgnfile._getTag(0, "BlackElo")),
+                    parseDate(pgnfile._getTag(0, "Date")), result):
+                continue
+
+            board = LBoard(NORMALCHESS)
+            board.applyFen(pgnfile._getTag(0, "FEN") or FEN_START)
+            boards = pgnfile.parse_string(pgnfile.get_movetext(0), board,
+                                          board.plyCount + maxPly,
+                                          pgn_import=True)
+            yield [(prev.hash, toPolyglot(prev, cur.lastMove), prev.color)
+                   for prev, cur in zip(boards, boards[1:])], result
+
+
+def databaseGames(path=None, gameFilter=None, maxPly=MAX_PLY):
+    """ Like pgnGames, for the games of a PyChess database, pychess.pdb by
+        default. Needs SQLAlchemy. """
+    from sqlalchemy import select
+    from pychess.Database import model as dbmodel
+    from pychess.Database.dbwalk import COMMENT, VARI_START, VARI_END
+
+    if path is not None:
+        dbmodel.set_engine("sqlite:///" + path)
+    if gameFilter is None:
+        gameFilter = GameFilter()
+    game = dbmodel.game
+    selection = select([game.c.white_elo, game.c.black_elo,
+                        game.c.date_year, game.c.date_month,
+                        game.c.date_day, game.c.result, game.c.fen,
+                        game.c.movelist],
+                       (game.c.variant == NORMALCHESS) |
+                       (game.c.variant.is_(None)))
+    conn = dbmodel.engine.connect()
+    try:
+        for whiteElo, blackElo, year, month, day, result, fen, movelist in \
+                conn.execute(selection):
+            date = (year or 0, month or 0, day or 0)
+            if not gameFilter.accept(whiteElo, blackElo, date, result):
+                continue
+
+            moves = array("H")
+            try:
+                moves.frombytes(movelist)
+            except AttributeError:
+                # Python 2
+                moves.fromstring(movelist)
+            board = LBoard(NORMALCHESS)
+            board.applyFen(fen or FEN_START)
+            positions = []
+            depth = 0
+            for elem in moves:
+                if elem == VARI_START:
+                    depth += 1
+                elif elem == VARI_END:
+                    depth -= 1
+                elif depth == 0 and elem < COMMENT:
+                    if len(positions) >= maxPly:
+                        break
+                    positions.append((board.hash, toPolyglot(board, elem),
+                                      board.color))
+                    board.applyMove(elem)
+            yield positions, result
+    finally:
+        conn.close()
+
+
+def _fit(values, limit=0xffff):
+    """ Divides the values by the least integer making them fit in limit """
+    top = max(values)
+    if top <= limit:
+        return values
+    divisor = (top + limit - 1) // limit
+    return [value // divisor for value in values]
+
+
+def _writeKey(file, key, moves):
+    """ Writes the entries of a key, given as a dict of move: [weight, games,
+        score], scaled down to 16 bits and sorted by weight, heaviest first.
+        Scaling may bring the weights of rare moves down to 0. PyChess leaves
+        the book when the first entry of a key weighs 0, so thanks to the
+        order that only happens when all of them do. """
+    moves = sorted(moves.items(), key=lambda item: -item[1][0])
+    weights = _fit([entry[0] for move, entry in moves])
+    # games and score are divided alike, to keep the score per game
+    counts = _fit([entry[1] for move, entry in moves] +
+                  [entry[2] for move, entry in moves])
+    n = len(moves)
+    for i, (move, entry) in enumerate(moves):
+        file.write(entrystruct.pack(key, move, weights[i], counts[i],
+                                    counts[n + i]))
+    return n
+
+
+class BookBuilder(object):
+    """ Counts the results of the moves of games, and writes them as a
+        Polyglot book. The weight of a move is its score, 2 for each win
+        and 1 for each draw of the side that played it. """
+
+    def __init__(self, maxEntries=MAX_ENTRIES, tempdir=None):
+        self.maxEntries = maxEntries
+        self.tempdir = tempdir
+        # key << 16 | move: [wins, draws, losses]
+        self.counts = {}
+        self.runs = []
+        self.games = 0
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        self.counts = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def addGame(self, positions, result):
+        """ Adds the (key, move, color) positions of a game won by WHITEWON
+            or BLACKWON, or a DRAW """
+        counts = self.counts
+        for key, move, color in positions:
+            if result == DRAW:
+                index = 1
+            elif (result == WHITEWON) == (color == WHITE):
+                index = 0
+            else:
+                index = 2
+            item = key << 16 | move
+            count = counts.get(item)
+            if count is None:
+                count = counts[item] = [0, 0, 0]
+            count[index] += 1
+        self.games += 1
+        if len(counts) >= self.maxEntries:
+            self._spill()
+
+    def addGames(self, games):
+        for positions, result in games:
+            self.addGame(positions, result)
+
+    def _spill(self):
+        """ Writes the counts to a new run, sorted """
+        run = tempfile.TemporaryFile(dir=self.tempdir)
+        counts = self.counts
+        pack = runstruct.pack
+        run.writelines(pack(item >> 16, item & 0xffff, *counts[item])
+                       for item in sorted(counts))
+        self.runs.append(run)
+        self.counts = {}
+
+    def _readRun(self, run):
+        size = runstruct.size
+        unpack_from = runstruct.unpack_from
+        run.seek(0)
+        while True:
+            data = run.read(size * 4096)
+            if not data:
+                break
+            for offset in range(0, len(data), size):
+                key, move, wins, draws, losses = unpack_from(data, offset)
+                yield key << 16 | move, wins, draws, losses
+
+    def _counted(self):
+        """ Yields the (item, wins, draws, losses) counts of all the games,
+            sorted by item """
+        counts = self.counts
+        memory = ((item,) + tuple(counts[item]) for item in sorted(counts))
+        runs = [self._readRun(run) for run in self.runs] + [memory]
+        last = total = None
+        for item, wins, draws, losses in heapq.merge(*runs):
+            if item == last:
+                total[0] += wins
+                total[1] += draws
+                total[2] += losses
+                continue
+            if last is not None:
+                yield (last,) + tuple(total)
+            last = item
+            total = [wins, draws, losses]
+        if last is not None:
+            yield (last,) + tuple(total)
+
+    def write(self, path, minGames=1):
+        """ Writes the book, leaving out the moves played in less than
+            minGames games, and returns the number of entries """
+        entries = 0
+        with open(path, "wb") as file:
+            key = None
+            moves = {}
+            for item, wins, draws, losses in self._counted():
+                games = wins + draws + losses
+                if games < minGames:
+                    continue
+                if item >> 16 != key:
+                    if moves:
+                        entries += _writeKey(file, key, moves)
+                    key = item >> 16
+                    moves = {}
+                score = 2 * wins + draws
+                moves[item & 0xffff] = [score, games, score]
+            if moves:
+                entries += _writeKey(file, key, moves)
+        return entries
+
+
+def buildBook(games, path, minGames=1, maxEntries=MAX_ENTRIES):
+    """ Writes the book of the games, as yielded by pgnGames or
+        databaseGames. Returns the numbers of games and entries. """
+    with BookBuilder(maxEntries) as builder:
+        builder.addGames(games)
+        return builder.games, builder.write(path, minGames)
+
+
+def _bookEntries(path, priority):
+    polyglot = PolyglotBook(path)
+    try:
+        for entry in polyglot:
+            yield (entry[0], -priority) + entry[1:]
+    finally:
+        polyglot.close()
+
+
+def mergeBooks(books, path):
+    """ Merges the (path, priority) books into one. Each position takes the
+        moves of the books of highest priority that have it. The moves of
+        books of the same priority are added up. Returns the number of
+        entries. """
+    entries = 0
+    with open(path, "wb") as file:
+        key = None
+        moves = {}
+        for entry in heapq.merge(*[_bookEntries(book, priority)
+                                   for book, priority in books]):
+            if entry[0] != key:
+                if moves:
+                    entries += _writeKey(file, key, moves)
+                key, priority = entry[0], entry[1]
+                moves = {}
+            elif entry[1] != priority:
+                # A book of lower priority
+                continue
+            move = moves.get(entry[2])
+            if move is None:
+                moves[entry[2]] = list(entry[3:])
+            else:
+                for i in range(3):
+                    move[i] += entry[3 + i]
+        if moves:
+            entries += _writeKey(file, key, moves)
+    return entries
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Builds and merges Polyglot opening books")
+    subparsers = parser.add_subparsers(dest="command")
+    build = subparsers.add_parser("build", help="build a book from PGN "
+                                  "files and PyChess databases (.pdb)")
+    build.add_argument("output")
+    build.add_argument("sources", nargs="+")
+    build.add_argument("--min-elo", type=int, default=None,
+                       help="lowest rating of both players")
+    build.add_argument("--from-date", default=None,
+                       help="first date of the games, as YYYY.MM.DD")
+    build.add_argument("--to-date", default=None,
+                       help="last date of the games, as YYYY.MM.DD")
+    build.add_argument("--results", default="1-0,1/2-1/2,0-1",
+                       help="results of the games (default: %(default)s)")
+    build.add_argument("--max-ply", type=int, default=MAX_PLY,
+                       help="depth of the book (default: %(default)s)")
+    build.add_argument("--min-games", type=int, default=1,
+                       help="leave out the moves played in less games "
+                       "(default: %(default)s)")
+    build.add_argument("--entries", type=int, default=MAX_ENTRIES,
+                       help="counts kept in memory (default: %(default)s)")
+    merge = subparsers.add_parser("merge", help="merge books, given as "
+                                  "PATH[:PRIORITY], with 0 by default")
+    merge.add_argument("output")
+    merge.add_argument("books", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        results = {"1-0": WHITEWON, "1/2-1/2": DRAW, "0-1": BLACKWON}
+        gameFilter = GameFilter(
+            args.min_elo,
+            parseDate(args.from_date) if args.from_date else None,
+            # Unknown parts of the last date take in the whole month or year
+            tuple(part for part in parseDate(args.to_date) if part)
+            if args.to_date else None,
+            tuple(results[result] for result in args.results.split(",")))
+        with BookBuilder(args.entries) as builder:
+            for source in args.sources:
+                if source.lower().endswith(".pdb"):
+                    games = databaseGames(source, gameFilter, args.max_ply)
+                else:
+                    games = pgnGames(source, gameFilter, args.max_ply)
+                builder.addGames(games)
+            entries = builder.write(args.output, args.min_games)
+        print("%d games, %d entries" % (builder.games, entries))
+
+    elif args.command == "merge":
+        books = []
+        for book in args.books:
+            path, sep, priority = book.rpartition(":")
+            if sep and priority.lstrip("-").isdigit() and \
+                    os.path.isfile(path):
+                books.append((path, int(priority)))
+            else:
+                books.append((book, 0))
+        print("%d entries" % mergeBooks(books, args.output))
+
+    else:
+        parser.print_help()
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,6 @@ import gettext
 import sqlite3
 import struct
 
-from pychess.compat import memoryview
 from pychess.System.prefix import addDataPrefix, isInstalled
 
 db_path = os.path.join(addDataPrefix("eco.db"))
@@ -31,10 +30,68 @@ else:
 hash_struct = struct.Struct('>Q')
 
 
-def get_eco(hash):
+class EcoIndex(object):
+    """ The openings of eco.db, in all its languages, held in memory. They
+        are keyed by the Polyglot hash of their last position, so openings
+        reached by transposition are recognized too. """
+
+    def __init__(self, conn):
+        # lang: {hash: (eco, opening, variation)}
+        self.openings = {}
+        # The names of an opening are shared by all its positions
+        names = {}
+        cur = conn.cursor()
+        cur.execute("select hash, lang, eco, opening, variation from openings")
+        for hash, lang, eco, opening, variation in cur:
+            key = hash_struct.unpack(bytes(hash))[0]
+            entry = (eco, opening, variation)
+            entry = names.setdefault(entry, entry)
+            # Like the former queries, the first line of a position wins
+            self.openings.setdefault(lang, {}).setdefault(key, entry)
+
+    def __len__(self):
+        return sum(len(openings) for openings in self.openings.values())
+
+    def get(self, hash, lang=lang):
+        openings = self.openings.get(lang)
+        if openings is None:
+            return None
+        return openings.get(hash)
+
+    def deepest(self, hashes, lang=lang):
+        """ Returns the opening of the last of the hashes that has one """
+        openings = self.openings.get(lang)
+        if openings is None:
+            return None
+        found = None
+        for hash in hashes:
+            opening = openings.get(hash)
+            if opening is not None:
+                found = opening
+        return found
+
+
+index = None
+
+
+def get_index():
+    """ Loads the index of eco.db on first use """
+    global index
+    if index is None and ECO_OK:
+        index = EcoIndex(conn)
+    return index
+
+
+def get_eco(hash, lang=lang):
+    """ Returns the (eco, opening, variation) of the position, or None """
+    if not ECO_OK:
+        return None
+    return get_index().get(hash, lang)
+
+
+def get_deepest_eco(hashes, lang=lang):
+    """ Returns the (eco, opening, variation) of the last position of a game
+        that is a known opening, given the hashes of its positions, or None """
     if not ECO_OK:
         return None
-    cur = conn.cursor()
-    select = "select eco, opening, variation from openings where hash=? and lang=?"
-    cur.execute(select, (memoryview(hash_struct.pack(hash)), lang))
-    return cur.fetchone()
+    return get_index().deepest(hashes, lang)
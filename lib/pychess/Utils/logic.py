@@ -26,10 +26,9 @@ from pychess.Variants.threecheck import checkCount
 
 def getDestinationCords(board, cord):
     tcords = []
-    for move in lmovegen.genAllMoves(board.board):
+    for move in lmovegen.genLegalMoves(board.board):
         if FCORD(move) == cord.cord:
-            if not board.board.willLeaveInCheck(move):
-                tcords.append(Cord(TCORD(move)))
+            tcords.append(Cord(TCORD(move)))
     return tcords
 
 
@@ -90,21 +89,25 @@ def getStatus(board):
             return DRAW, DRAW_INSUFFICIENT
 
     hasMove = False
-    for move in lmovegen.genAllMoves(lboard):
-        if board.variant == ATOMICCHESS:
+    if board.variant == ATOMICCHESS:
+        for move in lmovegen.genAllMoves(lboard):
             if kingExplode(lboard, move, 1 - board.color) and not kingExplode(
                     lboard, move, board.color):
                 hasMove = True
                 break
             elif kingExplode(lboard, move, board.color):
                 continue
-        lboard.applyMove(move)
-        if lboard.opIsChecked():
+            lboard.applyMove(move)
+            if lboard.opIsChecked():
+                lboard.popMove()
+                continue
+            hasMove = True
             lboard.popMove()
-            continue
-        hasMove = True
-        lboard.popMove()
-        break
+            break
+    else:
+        for move in lmovegen.genLegalMoves(lboard):
+            hasMove = True
+            break
 
     if not hasMove:
         if lboard.isChecked():
@@ -222,7 +225,6 @@ def genCastles(board):
 
 def legalMoveCount(board):
     moves = 0
-    for move in lmovegen.genAllMoves(board.board):
-        if not board.board.willLeaveInCheck(move):
-            moves += 1
+    for move in lmovegen.genLegalMoves(board.board):
+        moves += 1
     return moves
@@ -1,9 +1,18 @@
 from __future__ import print_function
 from pychess.Utils.lutils.LBoard import LBoard
-from pychess.Utils.lutils.leval import clearPawnTable
+from pychess.Utils.lutils.bitboard import bitCount, tableBitCount, firstBit, \
+    lastBit, iterBits
+from pychess.Utils.lutils.leval import clearPawnTable, evaluateComplete
 from pychess.Utils.lutils.lmove import listToSan
-from pychess.Utils.lutils import lsearch
-from pychess.Utils.const import NORMALCHESS
+from pychess.Utils.lutils.lsort import clearSeeCache
+from pychess.Utils.lutils.perft import do_perft
+from pychess.Utils.lutils import leval, lsearch
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable
+from pychess.Utils.const import NORMALCHESS, WHITE
+import json
+import math
+import platform
+import random
 import sys
 from time import time
 
@@ -38,12 +47,14 @@ def benchmark():
     for i, fen in enumerate(benchmarkPositions):
         lsearch.table.clear()
         clearPawnTable()
+        clearSeeCache()
         board = LBoard(NORMALCHESS)
         board.applyFen(fen)
         pos_start_time = time()
         pos_start_nodes = lsearch.nodes
+        scr = 0
         for depth in range(1, 6):
-            mvs, scr = lsearch.alphaBeta(board, depth)
+            mvs, scr = lsearch.aspirationSearch(board, depth, scr)
             pos_time = time() - pos_start_time
             pos_nodes = lsearch.nodes - pos_start_nodes
             pv = " ".join(listToSan(board, mvs))
@@ -55,3 +66,360 @@ def benchmark():
     print("Total:", suite_nodes, "nodes in", suite_time, "s: ", suite_nodes /
           suite_time, "n/s")
     lsearch.nodes = 0
+    return suite_nodes, suite_time
+
+
+def benchmarkTables(rounds=2):
+    """ Runs benchmark() with each available transposition table
+        implementation, and compares their speed. A first, untimed run warms
+        up the caches, and the implementations then take turns, in reversed
+        order every other round, so neither gains from running last. """
+
+    classes = [TranspositionTable]
+    try:
+        from pychess.Utils.lutils.NumpyTranspositionTable import \
+            NumpyTranspositionTable
+        classes.append(NumpyTranspositionTable)
+    except ImportError:
+        print("NumPy is not available. Only benchmarking", classes[0].__name__)
+
+    oldClass = lsearch.tableClass
+    results = dict((cls.__name__, [0, 0]) for cls in classes)
+    try:
+        benchmark()
+        for i in range(rounds):
+            for cls in (classes if i % 2 == 0 else classes[::-1]):
+                lsearch.setTableClass(cls)
+                nodes, suite_time = benchmark()
+                results[cls.__name__][0] += nodes
+                results[cls.__name__][1] += suite_time
+    finally:
+        lsearch.setTableClass(oldClass)
+
+    for cls in classes:
+        nodes, suite_time = results[cls.__name__]
+        print(cls.__name__ + ":", nodes, "nodes in", suite_time, "s: ",
+              nodes / suite_time, "n/s")
+
+
+def _binBitCount(bitboard):
+    return bin(bitboard).count("1")
+
+
+def _listBits(bitboard):
+    return list(iterBits(bitboard))
+
+
+def benchmarkBitOps(count=1000000):
+    """ Times count calls of each bit operation of bitboard.py on random
+        bitboards, and returns a list of (name, nanoseconds per call) tuples.
+        bitCount is listed along with its table fallback, and the counting
+        of ones in bin() it replaces. """
+
+    rand = random.Random(0)
+    bitboards = [rand.getrandbits(64) & rand.getrandbits(64) | 1
+                 for i in range(1000)]
+    funcs = (("bitCount", bitCount), ("tableBitCount", tableBitCount),
+             ("bin().count", _binBitCount), ("firstBit", firstBit),
+             ("lastBit", lastBit), ("iterBits", _listBits))
+    results = []
+    for name, func in funcs:
+        start_time = time()
+        for i in range(count // len(bitboards)):
+            for bitboard in bitboards:
+                func(bitboard)
+        results.append((name, (time() - start_time) * 1e9 / count))
+    return results
+
+
+# Positions and depths for the perft part of runSuite(), with their known
+# node counts.
+perftPositions = [
+    ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 3, 8902),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     2, 2039),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 4, 43238),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3,
+     9467),
+]
+
+# How many times evaluateComplete is run on each benchmark position
+EVAL_COUNT = 200
+
+SUITE_VERSION = 1
+
+
+def _searchPosition(fen, maxdepth):
+    lsearch.table.clear()
+    clearPawnTable()
+    clearSeeCache()
+    leval.pawnTable.resetCounters()
+    lsearch.endtime = sys.maxsize
+    lsearch.searching = True
+    board = LBoard(NORMALCHESS)
+    board.applyFen(fen)
+    start_time = time()
+    start_nodes = lsearch.nodes
+    depths = []
+    scr = 0
+    for depth in range(1, maxdepth + 1):
+        mvs, scr = lsearch.aspirationSearch(board, depth, scr)
+        depths.append((lsearch.nodes - start_nodes, time() - start_time))
+    lsearch.nodes = 0
+    return depths
+
+
+def _perftPosition(fen, depth):
+    board = LBoard(NORMALCHESS)
+    board.applyFen(fen)
+    start_time = time()
+    nodes = do_perft(board, depth, 0)
+    return nodes, time() - start_time
+
+
+def _evalPositions(fens):
+    boards = []
+    for fen in fens:
+        board = LBoard(NORMALCHESS)
+        board.applyFen(fen)
+        boards.append(board)
+    clearPawnTable()
+    start_time = time()
+    for board in boards:
+        for i in range(EVAL_COUNT):
+            evaluateComplete(board, WHITE)
+    return time() - start_time
+
+
+def runSuite(maxdepth=5, repeat=3, positions=None):
+    """ Runs the search, perft and evaluation benchmarks repeat times, and
+        returns the results as a dict, which can be saved as JSON and given
+        to compareResults().
+        The search results have the nodes and the cumulated time for every
+        depth of every position. The bench signature is the total number of
+        search nodes, which only changes when the search itself changes. """
+
+    fens = benchmarkPositions[:positions]
+    search = [{"fen": fen, "depths": [], } for fen in fens]
+    perft = [{"fen": fen, "depth": depth, "expected": count, "nodes": 0,
+              "times": []} for fen, depth, count in perftPositions]
+    evals = {"positions": len(fens), "count": EVAL_COUNT, "times": []}
+
+    for run in range(repeat):
+        for result in search:
+            for depth, (nodes, seconds) in enumerate(
+                    _searchPosition(result["fen"], maxdepth)):
+                if run == 0:
+                    result["depths"].append({"depth": depth + 1,
+                                             "nodes": nodes,
+                                             "times": []})
+                result["depths"][depth]["times"].append(seconds)
+            result["pawnHitRate"] = leval.pawnTable.hitRate()
+            result["pawnLastKeyHits"] = leval.pawnTable.lastKeyHits
+        for result in perft:
+            nodes, seconds = _perftPosition(result["fen"], result["depth"])
+            result["nodes"] = nodes
+            result["times"].append(seconds)
+        evals["times"].append(_evalPositions(fens))
+
+    for result in search:
+        last = result["depths"][-1]
+        result["nodes"] = last["nodes"]
+        result["nps"] = last["nodes"] / _mean(last["times"])
+    for result in perft:
+        result["nps"] = result["nodes"] / _mean(result["times"])
+    evals["eps"] = len(fens) * EVAL_COUNT / _mean(evals["times"])
+
+    nodes = sum(result["nodes"] for result in search)
+    seconds = sum(_mean(result["depths"][-1]["times"]) for result in search)
+    return {"version": SUITE_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time(),
+            "maxdepth": maxdepth,
+            "repeat": repeat,
+            "signature": nodes,
+            "nps": nodes / seconds,
+            "search": search,
+            "perft": perft,
+            "eval": evals}
+
+
+def _mean(values):
+    return sum(values) / float(len(values))
+
+
+def _variance(values):
+    if len(values) < 2:
+        return 0.
+    mean = _mean(values)
+    return sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+
+
+def _betacf(a, b, x):
+    # Continued fraction of the incomplete beta function (Numerical Recipes)
+    qab, qap, qam = a + b, a + 1., a - 1.
+    c, d = 1., 1. - qab * x / qap
+    d = 1. / (d if abs(d) > 1e-30 else 1e-30)
+    h = d
+    for m in range(1, 201):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1. + aa * d
+        d = 1. / (d if abs(d) > 1e-30 else 1e-30)
+        c = 1. + aa / c
+        c = c if abs(c) > 1e-30 else 1e-30
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1. + aa * d
+        d = 1. / (d if abs(d) > 1e-30 else 1e-30)
+        c = 1. + aa / c
+        c = c if abs(c) > 1e-30 else 1e-30
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.) < 1e-12:
+            break
+    return h
+
+
+def _betainc(a, b, x):
+    """ The regularized incomplete beta function I_x(a, b) """
+    if x <= 0.:
+        return 0.
+    if x >= 1.:
+        return 1.
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) +
+                     a * math.log(x) + b * math.log(1. - x))
+    if x < (a + 1.) / (a + b + 2.):
+        return front * _betacf(a, b, x) / a
+    return 1. - front * _betacf(b, a, 1. - x) / b
+
+
+def welchTest(old, new):
+    """ Welch's t-test of two lists of samples. Returns the t statistic and
+        the two sided p-value of the means being equal. """
+    n1, n2 = len(old), len(new)
+    v1, v2 = _variance(old) / n1, _variance(new) / n2
+    diff = _mean(new) - _mean(old)
+    if v1 + v2 == 0:
+        return (0., 1.) if diff == 0 else (math.copysign(float("inf"), diff),
+                                           0.)
+    t = diff / math.sqrt(v1 + v2)
+    df = (v1 + v2) ** 2 / (v1 ** 2 / max(n1 - 1, 1) + v2 ** 2 / max(n2 - 1, 1))
+    return t, _betainc(df / 2., .5, df / (df + t * t))
+
+
+def _samples(results):
+    """ Yields the timed items of a runSuite() result as (name, times) """
+    for i, result in enumerate(results["search"]):
+        yield "search %d" % i, result["depths"][-1]["times"]
+    for i, result in enumerate(results["perft"]):
+        yield "perft %d" % i, result["times"]
+    yield "eval", results["eval"]["times"]
+
+
+def compareResults(old, new, alpha=0.05):
+    """ Compares two runSuite() results. Returns a list of
+        (name, old mean time, new mean time, p-value, slower), where slower is
+        True for a statistically significant slowdown. """
+    oldSamples = dict(_samples(old))
+    comparison = []
+    for name, times in _samples(new):
+        if name not in oldSamples:
+            continue
+        t, p = welchTest(oldSamples[name], times)
+        comparison.append((name, _mean(oldSamples[name]), _mean(times), p,
+                           t > 0 and p < alpha))
+    return comparison
+
+
+def printComparison(old, new, alpha=0.05):
+    """ Prints compareResults(). Returns the number of slowdowns found. """
+    if old["signature"] != new["signature"]:
+        print("Bench signature changed from", old["signature"], "to",
+              new["signature"], "- the search now visits other nodes")
+    for i, result in enumerate(new["perft"]):
+        if result["nodes"] != result["expected"]:
+            print("perft %d counted %d nodes instead of %d" % (
+                i, result["nodes"], result["expected"]))
+    print("%-10s %10s %10s %8s %8s" % ("", "old s", "new s", "change", "p"))
+    slowdowns = 0
+    for name, oldTime, newTime, p, slower in compareResults(old, new, alpha):
+        print("%-10s %10.4f %10.4f %+7.1f%% %8.4f %s" % (
+            name, oldTime, newTime, 100. * (newTime - oldTime) / oldTime, p,
+            "SLOWER" if slower else ""))
+        slowdowns += slower
+    print("nps: %.0f -> %.0f" % (old["nps"], new["nps"]))
+    return slowdowns
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of the PyChess engine (lutils)")
+    subparsers = parser.add_subparsers(dest="command")
+    run = subparsers.add_parser("run", help="run the suite and save the "
+                                "results as JSON")
+    run.add_argument("output", help="JSON file to write, - for stdout")
+    run.add_argument("--depth", type=int, default=5,
+                     help="search depth (default: %(default)s)")
+    run.add_argument("--repeat", type=int, default=3,
+                     help="number of runs (default: %(default)s)")
+    run.add_argument("--positions", type=int, default=None,
+                     help="only search the first POSITIONS positions")
+    compare = subparsers.add_parser("compare", help="compare two saved "
+                                    "results, and fail on slowdowns")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--alpha", type=float, default=0.05,
+                         help="significance level (default: %(default)s)")
+    bitops = subparsers.add_parser("bitops", help="time the bit operations "
+                                   "of bitboard.py")
+    bitops.add_argument("--count", type=int, default=1000000,
+                        help="calls of each operation (default: "
+                        "%(default)s)")
+    evalprofile = subparsers.add_parser("evalprofile", help="time the "
+                                        "terms of the evaluation over the "
+                                        "positions of a PGN file")
+    evalprofile.add_argument("pgn")
+    evalprofile.add_argument("--games", type=int, default=None,
+                             help="only read the first GAMES games")
+    evalprofile.add_argument("--repeat", type=int, default=10,
+                             help="evaluations of each position (default: "
+                             "%(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = runSuite(args.depth, args.repeat, args.positions)
+        if args.output == "-":
+            json.dump(results, sys.stdout, indent=1)
+        else:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=1)
+        print("Bench signature", results["signature"], "at",
+              int(results["nps"]), "n/s", file=sys.stderr)
+    elif args.command == "compare":
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        return 1 if printComparison(old, new, args.alpha) else 0
+    elif args.command == "bitops":
+        for name, nanoseconds in benchmarkBitOps(args.count):
+            print("%-14s %8.1f ns" % (name, nanoseconds))
+    elif args.command == "evalprofile":
+        from pychess.Utils.lutils.EvalProfiler import EvalProfiler, \
+            readPositions
+        with open(args.pgn) as f:
+            boards = readPositions(f, args.games)
+        print(len(boards), "positions")
+        profiler = EvalProfiler()
+        profiler.profile(boards, args.repeat)
+        profiler.report()
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+from __future__ import absolute_import
+from __future__ import print_function
+
+# Counts the calls of the terms of leval.evaluateComplete, and the time spent
+# in them, by game phase. While enabled, the term functions of leval are
+# replaced by timing wrappers, which evaluateComplete picks up as it looks
+# them up on every call. Disabled, the original functions are put back, so
+# the profiler costs nothing.
+
+try:
+    from time import perf_counter as clock
+except ImportError:
+    from time import time as clock
+
+from pychess.Utils.const import NORMALCHESS, FEN_START
+from pychess.Utils.lutils.LBoard import LBoard
+from . import leval
+
+TERMS = ("evalMaterial", "evalBishops", "evalRooks", "evalDoubleQR7",
+         "evalKing", "evalKingTropism", "evalDev", "cacheablePawnInfo",
+         "evalPawnStructure", "evalTrappedBishops")
+
+# evalMaterial returns phases 1 to 8
+PHASES = range(1, 9)
+
+
+class EvalProfiler(object):
+    def __init__(self):
+        self.originals = None
+        # The phase of the evaluation in progress, as found by evalMaterial,
+        # which comes first
+        self.phase = 1
+        self.reset()
+
+    def reset(self):
+        # stats[term][phase] is a list of the calls and the seconds
+        self.stats = dict((term, [[0, 0.] for i in range(9)])
+                          for term in TERMS)
+        # The calls and seconds of evaluateComplete, when profile() is used
+        self.total = [0, 0.]
+
+    def enable(self):
+        if self.originals is not None:
+            return
+        self.originals = dict((term, getattr(leval, term)) for term in TERMS)
+        for term, func in self.originals.items():
+            setattr(leval, term, self._timed(term, func))
+
+    def disable(self):
+        if self.originals is None:
+            return
+        for term, func in self.originals.items():
+            setattr(leval, term, func)
+        self.originals = None
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *args):
+        self.disable()
+
+    def _timed(self, term, func):
+        stats = self.stats[term]
+
+        if term == "evalMaterial":
+            def timed(*args):
+                start = clock()
+                result = func(*args)
+                elapsed = clock() - start
+                self.phase = result[1]
+                entry = stats[self.phase]
+                entry[0] += 1
+                entry[1] += elapsed
+                return result
+        else:
+            def timed(*args):
+                start = clock()
+                result = func(*args)
+                elapsed = clock() - start
+                entry = stats[self.phase]
+                entry[0] += 1
+                entry[1] += elapsed
+                return result
+        return timed
+
+    def profile(self, boards, repeat=1):
+        """ Evaluates each board repeat times, from the side to move, with
+            the profiler enabled """
+        evaluateComplete = leval.evaluateComplete
+        with self:
+            for board in boards:
+                start = clock()
+                for i in range(repeat):
+                    evaluateComplete(board, board.color)
+                self.total[0] += repeat
+                self.total[1] += clock() - start
+
+    def report(self, file=None):
+        """ Prints the calls and time of each term, and the time per call by
+            phase. The time of evaluateComplete includes the overhead of
+            timing the terms. """
+        print("%-20s %10s %10s %9s %7s" % ("term", "calls", "seconds",
+                                           "us/call", "share"), file=file)
+        for term in TERMS:
+            calls = sum(entry[0] for entry in self.stats[term])
+            seconds = sum(entry[1] for entry in self.stats[term])
+            print("%-20s %10d %10.4f %9.2f %6.1f%%" % (
+                term, calls, seconds, 1e6 * seconds / calls if calls else 0.,
+                100. * seconds / self.total[1] if self.total[1] else 0.),
+                file=file)
+        if self.total[0]:
+            print("%-20s %10d %10.4f %9.2f" % (
+                "evaluateComplete", self.total[0], self.total[1],
+                1e6 * self.total[1] / self.total[0]), file=file)
+
+        print(file=file)
+        print("us/call by phase", file=file)
+        print("%-20s" % "term" +
+              "".join("%8d" % phase for phase in PHASES), file=file)
+        print("%-20s" % "evaluations" +
+              "".join("%8d" % self.stats["evalMaterial"][phase][0]
+                      for phase in PHASES), file=file)
+        for term in TERMS:
+            stats = self.stats[term]
+            print("%-20s" % term + "".join(
+                "%8.2f" % (1e6 * stats[phase][1] / stats[phase][0])
+                if stats[phase][0] else "%8s" % "-"
+                for phase in PHASES), file=file)
+
+
+def readPositions(file, maxGames=None):
+    """ Returns the positions of the normal chess games in the PGN file, as
+        LBoards. Games with other variants are skipped. """
+    from pychess.Savers.pgnbase import pgn_load
+
+    pgnfile = pgn_load(file)
+    boards = []
+    for no in range(len(pgnfile.games)):
+        if maxGames is not None and no >= maxGames:
+            break
+        if pgnfile.get_variant(no) not in ("", "Normal"):
+            continue
+        board = LBoard(NORMALCHESS)
+        board.applyFen(pgnfile._getTag(no, "FEN") or FEN_START)
+        boards.extend(pgnfile.parse_string(pgnfile.get_movetext(no), board,
+                                           -1, pgn_import=True))
+    return boards
@@ -13,7 +13,7 @@ from pychess.Utils.const import EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING,
     G1, G8, H1, H8, \
     KING_CASTLE, QUEEN_CASTLE, DROP, PROMOTIONS, ENPASSANT, B_OO, B_OOO, W_OO, W_OOO
 from pychess.Utils.repr import reprColor
-from .ldata import FILE, fileBits
+from .ldata import FILE, fileBits, MATERIAL_VALUES, VARIANT_MATERIAL_VALUES
 from .attack import isAttacked
 from .bitboard import clearBit, setBit, bitPosArray
 from .PolyglotHash import pieceHashes, epHashes, \
@@ -32,28 +32,39 @@ STRICT_FEN = False
 ################################################################################
 
 
+# Initial and final (castled) cords of kings and rooks in normal chess
+INI_KINGS = (E1, E8)
+INI_ROOKS = ((A1, H1), (A8, H8))
+FIN_KINGS = ((C1, G1), (C8, G8))
+FIN_ROOKS = ((D1, F1), (D8, F8))
+
+# Empty holdings, shared by all boards of the variants without drops
+NO_HOLDING = ({PAWN: 0,
+               KNIGHT: 0,
+               BISHOP: 0,
+               ROOK: 0,
+               QUEEN: 0,
+               KING: 0},
+              {PAWN: 0,
+               KNIGHT: 0,
+               BISHOP: 0,
+               ROOK: 0,
+               QUEEN: 0,
+               KING: 0})
+
+
 class LBoard(object):
     __hash__ = None
 
-    ini_kings = (E1, E8)
-    ini_rooks = ((A1, H1), (A8, H8))
-
-    # Final positions of castled kings and rooks
-    fin_kings = ((C1, G1), (C8, G8))
-    fin_rooks = ((D1, F1), (D8, F8))
-
-    holding = ({PAWN: 0,
-                KNIGHT: 0,
-                BISHOP: 0,
-                ROOK: 0,
-                QUEEN: 0,
-                KING: 0},
-               {PAWN: 0,
-                KNIGHT: 0,
-                BISHOP: 0,
-                ROOK: 0,
-                QUEEN: 0,
-                KING: 0})
+    __slots__ = (
+        "variant", "nags", "children", "next", "prev", "pieceBoard",
+        "fen_was_applied", "last_move", "hist",
+        "blocker", "friends", "kings", "boards", "pieceCount", "arBoard",
+        "color", "enpassant", "castling", "hasCastled", "fifty", "plyCount",
+        "checked", "opchecked", "hash", "pawnhash", "material", "pieceValues",
+        "ini_kings", "ini_rooks", "fin_kings", "fin_rooks",
+        "promoted", "holding", "capture_promoting",
+        "ini_queens", "is_first_move")
 
     def __init__(self, variant=NORMALCHESS):
         self.variant = variant
@@ -77,30 +88,55 @@ class LBoard(object):
 
         self.last_move = None
 
+        # The history of the position is a chain of immutable tuples, one
+        # for each applied move, made of the previous entry, the move, the
+        # captured piece (EMPTY for non captures), the enpassant, castling,
+        # hash, fifty, checked and opchecked values from before the move, and
+        # a variant specific value (capture_promoting in drop variants,
+        # is_first_move in cambodian, and the exploded pieces in atomic).
+        # Clones share the chain instead of copying it.
+        self.hist = None
+
+        self.ini_kings = INI_KINGS
+        self.ini_rooks = INI_ROOKS
+        self.fin_kings = FIN_KINGS
+        self.fin_rooks = FIN_ROOKS
+        self.holding = NO_HOLDING
+
     @property
     def lastMove(self):
         if self.last_move is not None:
             return self.last_move if self.fen_was_applied else None
         else:
-            return self.hist_move[-1] if self.fen_was_applied and len(
-                self.hist_move) > 0 else None
+            return self.hist[1] if self.fen_was_applied and \
+                self.hist is not None else None
 
     def repetitionCount(self, draw_threshold=3):
         rc = 1
-        for ply in range(4, 1 + min(len(self.hist_hash), self.fifty), 2):
-            if self.hist_hash[-ply] == self.hash:
+        hist = self.hist
+        ply = 1
+        while hist is not None and ply <= self.fifty:
+            if ply >= 4 and ply % 2 == 0 and hist[5] == self.hash:
                 rc += 1
                 if rc >= draw_threshold:
                     break
+            hist = hist[0]
+            ply += 1
         return rc
 
-    def iniAtomic(self):
-        self.hist_exploding_around = []
+    def iniMaterial(self):
+        """ Sets up the material sums of the two sides, which are kept up to
+            date by _addPiece and _removePiece, for the current variant. Has
+            to be called again if the variant of the board is changed. """
+        self.pieceValues = VARIANT_MATERIAL_VALUES.get(self.variant,
+                                                       MATERIAL_VALUES)
+        self.material = [sum(self.pieceValues[piece] * count
+                             for piece, count in enumerate(pieceCount))
+                         for pieceCount in self.pieceCount]
 
     def iniHouse(self):
-        self.promoted = [0] * 64
+        self.promoted = bytearray(64)
         self.capture_promoting = False
-        self.hist_capture_promoting = []
         self.holding = ({PAWN: 0,
                          KNIGHT: 0,
                          BISHOP: 0,
@@ -118,7 +154,6 @@ class LBoard(object):
         self.ini_kings = (D1, E8)
         self.ini_queens = (E1, D8)
         self.is_first_move = {KING: [True, True], QUEEN: [True, True]}
-        self.hist_is_first_move = []
 
     def applyFen(self, fenstr):
         """ Applies the fenstring to the board.
@@ -146,24 +181,14 @@ class LBoard(object):
         self.checked = None
         self.opchecked = None
 
-        self.arBoard = [0] * 64
+        self.arBoard = bytearray(64)
 
         self.hash = 0
         self.pawnhash = 0
 
-        #  Data from the position's history:
-        self.hist_move = []  # The move that was applied to get the position
-        self.hist_tpiece = []
-        # The piece the move captured, == EMPTY for normal moves
-        self.hist_enpassant = []
-        self.hist_castling = []
-        self.hist_hash = []
-        self.hist_fifty = []
-        self.hist_checked = []
-        self.hist_opchecked = []
-
         # piece counts
         self.pieceCount = ([0] * 7, [0] * 7)
+        self.iniMaterial()
 
         # initial cords of rooks and kings for castling in Chess960
         if self.variant == FISCHERRANDOMCHESS:
@@ -178,9 +203,6 @@ class LBoard(object):
         elif self.variant in DROP_VARIANTS:
             self.iniHouse()
 
-        elif self.variant == ATOMICCHESS:
-            self.iniAtomic()
-
         elif self.variant == CAMBODIANCHESS:
             self.iniCambodian()
 
@@ -438,6 +460,7 @@ class LBoard(object):
             self.kings[color] = cord
         self.hash ^= pieceHashes[color][piece][cord]
         self.arBoard[cord] = piece
+        self.material[color] += self.pieceValues[piece]
 
     def _removePiece(self, cord, piece, color):
         _clearBit = clearBit
@@ -450,6 +473,7 @@ class LBoard(object):
 
         self.hash ^= pieceHashes[color][piece][cord]
         self.arBoard[cord] = EMPTY
+        self.material[color] -= self.pieceValues[piece]
 
     def setColor(self, color):
         if color == self.color:
@@ -509,18 +533,15 @@ class LBoard(object):
         castling = self.castling
 
         if full:
-            self.hist_move.append(move)
-            self.hist_enpassant.append(self.enpassant)
-            self.hist_castling.append(self.castling)
-            self.hist_hash.append(self.hash)
-            self.hist_fifty.append(self.fifty)
-            self.hist_checked.append(self.checked)
-            self.hist_opchecked.append(self.opchecked)
+            state = (self.enpassant, castling, self.hash, self.fifty,
+                     self.checked, self.opchecked)
             if self.variant in DROP_VARIANTS:
-                self.hist_capture_promoting.append(self.capture_promoting)
-            if self.variant == CAMBODIANCHESS:
-                self.hist_is_first_move.append({KING: self.is_first_move[KING][:],
-                                                QUEEN: self.is_first_move[QUEEN][:]})
+                extra = self.capture_promoting
+            elif self.variant == CAMBODIANCHESS:
+                extra = (tuple(self.is_first_move[KING]),
+                         tuple(self.is_first_move[QUEEN]))
+            else:
+                extra = None
         else:
             self.last_move = move
 
@@ -528,6 +549,10 @@ class LBoard(object):
         self.checked = None
 
         if flag == NULL_MOVE:
+            if full:
+                self.hist = (self.hist, move, EMPTY) + state + (extra, )
+            self.setEnpassant(None)
+            self.fifty += 1
             self.setColor(opcolor)
             self.plyCount += 1
             return move
@@ -577,10 +602,7 @@ class LBoard(object):
                             castling &= ~CAS_FLAGS[opcolor][0]
                         elif acord == self.ini_rooks[opcolor][1]:
                             castling &= ~CAS_FLAGS[opcolor][1]
-                if full:
-                    self.hist_exploding_around.append(apieces)
-        if full:
-            self.hist_tpiece.append(tpiece)
+                extra = tuple(apieces)
 
         # Remove moving piece(s), then add them at their destination.
         if flag == DROP:
@@ -610,8 +632,7 @@ class LBoard(object):
                         self._removePiece(acord, apiece, acolor)
                         self.pieceCount[acolor][apiece] -= 1
                         apieces.append((acord, apiece, acolor))
-                if full:
-                    self.hist_exploding_around.append(apieces)
+                extra = tuple(apieces)
         elif flag in PROMOTIONS:
             # Pretend the pawn changes into a piece before reaching its destination.
             fpiece = flag - 2
@@ -673,19 +694,29 @@ class LBoard(object):
         self.setColor(opcolor)
         self.plyCount += 1
 
+        if full:
+            self.hist = (self.hist, move, tpiece) + state + (extra, )
+
     def popMove(self):
         # Note that we remove the last made move, which was not made by boards
         # current color, but by its opponent
         color = 1 - self.color
         opcolor = self.color
 
-        move = self.hist_move.pop()
-        cpiece = self.hist_tpiece.pop()
+        hist = self.hist
+        move, cpiece = hist[1:3]
+        extra = hist[9]
 
         flag = move >> 12
 
         if flag == NULL_MOVE:
+            if self.variant in DROP_VARIANTS:
+                self.capture_promoting = extra
+            elif self.variant == CAMBODIANCHESS:
+                self.is_first_move = {KING: list(extra[0]),
+                                      QUEEN: list(extra[1])}
             self.setColor(color)
+            self._popState(hist)
             return
 
         fcord = (move >> 6) & 63
@@ -722,8 +753,7 @@ class LBoard(object):
                     assert self.holding[color][cpiece] > 0
                     self.holding[color][cpiece] -= 1
             elif self.variant == ATOMICCHESS:
-                apieces = self.hist_exploding_around.pop()
-                for acord, apiece, acolor in apieces:
+                for acord, apiece, acolor in extra:
                     self._addPiece(acord, apiece, acolor)
                     self.pieceCount[acolor][apiece] += 1
 
@@ -736,8 +766,7 @@ class LBoard(object):
                 assert self.holding[color][PAWN] > 0
                 self.holding[color][PAWN] -= 1
             elif self.variant == ATOMICCHESS:
-                apieces = self.hist_exploding_around.pop()
-                for acord, apiece, acolor in apieces:
+                for acord, apiece, acolor in extra:
                     self._addPiece(acord, apiece, acolor)
                     self.pieceCount[acolor][apiece] += 1
 
@@ -764,19 +793,17 @@ class LBoard(object):
                     self.promoted[tcord] = 1
                 else:
                     self.promoted[tcord] = 0
-            self.capture_promoting = self.hist_capture_promoting.pop()
+            self.capture_promoting = extra
 
-        if self.variant == CAMBODIANCHESS:
-            self.is_first_move = self.hist_is_first_move.pop()
+        elif self.variant == CAMBODIANCHESS:
+            self.is_first_move = {KING: list(extra[0]), QUEEN: list(extra[1])}
 
         self.setColor(color)
+        self._popState(hist)
 
-        self.checked = self.hist_checked.pop()
-        self.opchecked = self.hist_opchecked.pop()
-        self.enpassant = self.hist_enpassant.pop()
-        self.castling = self.hist_castling.pop()
-        self.hash = self.hist_hash.pop()
-        self.fifty = self.hist_fifty.pop()
+    def _popState(self, hist):
+        self.hist, move, cpiece, self.enpassant, self.castling, self.hash, \
+            self.fifty, self.checked, self.opchecked, extra = hist
         self.plyCount -= 1
 
     def __eq__(self, other):
@@ -787,6 +814,27 @@ class LBoard(object):
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __getstate__(self):
+        # The history chain is pickled as a flat list, as a long game would
+        # otherwise hit the recursion limit of pickle.
+        state = dict((name, getattr(self, name)) for name in self.__slots__
+                     if hasattr(self, name))
+        entries = []
+        hist = self.hist
+        while hist is not None:
+            entries.append(hist[1:])
+            hist = hist[0]
+        state["hist"] = entries
+        return state
+
+    def __setstate__(self, state):
+        hist = None
+        for entry in reversed(state.pop("hist")):
+            hist = (hist, ) + entry
+        self.hist = hist
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def reprCastling(self):
         if not self.castling:
             return "-"
@@ -949,6 +997,8 @@ class LBoard(object):
         copy.boards = (self.boards[WHITE][:], self.boards[BLACK][:])
         copy.arBoard = self.arBoard[:]
         copy.pieceCount = (self.pieceCount[WHITE][:], self.pieceCount[BLACK][:])
+        copy.material = self.material[:]
+        copy.pieceValues = self.pieceValues
 
         copy.color = self.color
         copy.plyCount = self.plyCount
@@ -963,14 +1013,7 @@ class LBoard(object):
         copy.opchecked = self.opchecked
 
         if full:
-            copy.hist_move = self.hist_move[:]
-            copy.hist_tpiece = self.hist_tpiece[:]
-            copy.hist_enpassant = self.hist_enpassant[:]
-            copy.hist_castling = self.hist_castling[:]
-            copy.hist_hash = self.hist_hash[:]
-            copy.hist_fifty = self.hist_fifty[:]
-            copy.hist_checked = self.hist_checked[:]
-            copy.hist_opchecked = self.hist_opchecked[:]
+            copy.hist = self.hist
         else:
             copy.last_move = self.last_move
 
@@ -985,18 +1028,11 @@ class LBoard(object):
             copy.promoted = self.promoted[:]
             copy.holding = (self.holding[0].copy(), self.holding[1].copy())
             copy.capture_promoting = self.capture_promoting
-            if full:
-                copy.hist_capture_promoting = self.hist_capture_promoting[:]
-        elif self.variant == ATOMICCHESS:
-            if full:
-                copy.hist_exploding_around = [a[:] for a in self.hist_exploding_around]
         elif self.variant == CAMBODIANCHESS:
             copy.ini_kings = self.ini_kings
             copy.ini_queens = self.ini_queens
             copy.is_first_move = {KING: self.is_first_move[KING][:],
                                   QUEEN: self.is_first_move[QUEEN][:]}
-            if full:
-                copy.hist_is_first_move = self.hist_is_first_move[:]
 
         copy.fen_was_applied = self.fen_was_applied
         return copy
@@ -0,0 +1,377 @@
+from __future__ import absolute_import
+
+# Static evaluation of many normal chess positions at once, for tools that
+# score whole databases rather than searching. The positions are given as
+# arrays of bitboards, and the terms of leval.evaluateComplete are computed by
+# NumPy operations over all of them, looping over squares and files where
+# leval loops over pieces.
+#
+# The scores are the same as those of evaluateComplete, except for
+# evalTrappedBishops, whose exchange evaluation needs a real board. It is only
+# non-zero with a bishop trapped on a2/h2/a7/h7, which is the tolerance
+# the batch scores are tested with.
+
+import numpy
+
+from pychess.Utils.const import WHITE, BLACK, PAWN, BPAWN, KNIGHT, BISHOP, \
+    ROOK, QUEEN, KING, CAS_FLAGS, B1, B8, D1, G1, G8
+from .ldata import MATERIAL_VALUES, WHITE_SQUARES, BLACK_SQUARES, \
+    bitPosArray, fileBits, moveArray, fromToRay, passedPawnMask, isolaniMask, \
+    squarePawnMask, passedScores, isolani_normal, isolani_weaker, \
+    pawnScoreBoard, endingKing, frontWall, brank7, brank8, brank67, d2e2, \
+    stonewall, lbox, distance
+from .leval import tropisms
+
+# How many positions are evaluated together. The intermediate arrays take
+# about a kilobyte per position.
+CHUNK_SIZE = 4096
+
+
+def _bitboard(bitboard):
+    return numpy.uint64(bitboard & 0xffffffffffffffff)
+
+
+_8 = numpy.uint64(8)
+
+bitPos = numpy.array(bitPosArray, numpy.uint64)
+kingMoves = numpy.array(moveArray[KING], numpy.uint64)
+stormMasks = numpy.array([isolaniMask[file] | fileBits[file]
+                          for file in range(8)], numpy.uint64)
+endingKingScores = numpy.array(endingKing)
+pawnScores = numpy.array(pawnScoreBoard) * 2
+numberMods = numpy.array((0, 3, 6, 9, 7, 5, 3))
+tropismTables = dict((piece, numpy.array(tropisms[piece], numpy.int64))
+                     for piece in (KNIGHT, BISHOP, ROOK, QUEEN))
+stormTable = 10 * (5 - numpy.array(distance[KING]))
+
+# hunterMasks[color][cord][piece] has the squares from which the piece is at
+# least as close to the promotion square as the pawn of color on cord.
+hunterMasks = [[None] * 64, [None] * 64]
+for color in WHITE, BLACK:
+    for cord in range(64):
+        promotion = cord & 7 | 56 if color == WHITE else cord & 7
+        pawnDistance = distance[PAWN][cord][promotion]
+        masks = {}
+        for piece in range(KNIGHT, KING + 1):
+            mask = 0
+            for square in range(64):
+                if distance[piece][square][promotion] <= pawnDistance:
+                    mask |= bitPosArray[square]
+            masks[piece] = mask
+        hunterMasks[color][cord] = masks
+
+if hasattr(numpy, "bitwise_count"):
+    def popcount(bitboards):
+        return numpy.bitwise_count(bitboards).astype(numpy.int64)
+else:
+    _m1 = numpy.uint64(0x5555555555555555)
+    _m2 = numpy.uint64(0x3333333333333333)
+    _m4 = numpy.uint64(0x0f0f0f0f0f0f0f0f)
+    _h01 = numpy.uint64(0x0101010101010101)
+
+    def popcount(bitboards):
+        b = bitboards - ((bitboards >> numpy.uint64(1)) & _m1)
+        b = (b & _m2) + ((b >> numpy.uint64(2)) & _m2)
+        b = (b + (b >> numpy.uint64(4))) & _m4
+        return ((b * _h01) >> numpy.uint64(56)).astype(numpy.int64)
+
+
+def squares(bitboards):
+    """ Returns an array with a last axis of 64, which is 1 for the cords set
+        in the bitboards, and 0 elsewhere. """
+    bytes = bitboards.astype(">u8").view(numpy.uint8)
+    return numpy.unpackbits(bytes.reshape(bitboards.shape + (8, )), axis=-1)
+
+
+def boardsToArrays(boards):
+    """ Returns the arguments of evaluateBatch for a list of LBoards. """
+    count = len(boards)
+    bitboards = numpy.zeros((count, 2, 7), numpy.uint64)
+    colors = numpy.zeros(count, numpy.int64)
+    castling = numpy.zeros(count, numpy.int64)
+    plyCount = numpy.zeros(count, numpy.int64)
+    castled = numpy.zeros((count, 2), bool)
+    for i, board in enumerate(boards):
+        bitboards[i] = board.boards
+        colors[i] = board.color
+        castling[i] = board.castling
+        plyCount[i] = board.plyCount
+        castled[i] = board.hasCastled
+    return bitboards, colors, castling, plyCount, castled
+
+
+def evaluateBatch(bitboards, colors, castling=None, plyCount=None,
+                  castled=None):
+    """ Evaluates N positions, given as an (N, 2, 7) array of the bitboards
+        of LBoard.boards, and an array of the N colors to move. Returns an
+        array of the N scores, each from the point of view of the side to
+        move, like evaluateComplete(board, board.color).
+        The development of the pieces is only evaluated if the N plyCounts
+        are given, along with the castling rights, and the (N, 2) array of
+        whether each side has castled (no side has for positions read from
+        FEN). """
+
+    bitboards = numpy.asarray(bitboards, numpy.uint64)
+    colors = numpy.asarray(colors)
+    scores = numpy.zeros(len(colors), numpy.int64)
+    for start in range(0, len(colors), CHUNK_SIZE):
+        chunk = slice(start, start + CHUNK_SIZE)
+        dev = None
+        if plyCount is not None:
+            if castled is None:
+                castled = numpy.zeros((len(colors), 2), bool)
+            dev = (numpy.asarray(castling)[chunk],
+                   numpy.asarray(plyCount)[chunk],
+                   numpy.asarray(castled)[chunk])
+        scores[chunk] = _evaluate(bitboards[chunk], colors[chunk], dev)
+    return scores
+
+
+def _evaluate(bitboards, colors, dev):
+    counts = popcount(bitboards)
+    friends = numpy.bitwise_or.reduce(bitboards[:, :, PAWN:], axis=2)
+    blocker = friends[:, WHITE] | friends[:, BLACK]
+    boardSquares = squares(bitboards)
+    kings = boardSquares[:, :, KING].argmax(-1)
+
+    # Everything is summed up from white's point of view
+    score, phase = _material(counts)
+    pawnScore, passed = _pawnInfo(bitboards, counts, phase)
+    score += pawnScore
+    for color in WHITE, BLACK:
+        sign = 1 if color == WHITE else -1
+        boards = bitboards[:, color]
+        score += sign * _bishops(boards, bitboards[:, 1 - color], counts,
+                                 friends, color, phase)
+        score += sign * _rooks(boards, kings, color, phase)
+        score += sign * _doubleQR7(boards, bitboards, colors, color)
+        score += sign * _king(boards, kings, color, phase)
+        score += sign * _kingTropism(boardSquares, kings, color)
+        if dev is not None:
+            score += sign * _dev(boards, color, *dev)
+        score += sign * _pawnStructure(bitboards, counts, colors, blocker,
+                                       kings, color, phase, passed)
+
+    return numpy.where(colors == WHITE, score, -score)
+
+
+def _material(counts):
+    material = (counts * numpy.array(MATERIAL_VALUES)).sum(-1)
+    white, black = material[:, WHITE], material[:, BLACK]
+    matTotal = white + black
+    phase = numpy.maximum(1, 8 - matTotal // 1150)
+
+    whiteLeads = white > black
+    pawns = numpy.where(whiteLeads, counts[:, WHITE, PAWN],
+                        counts[:, BLACK, PAWN])
+    matDiff = abs(white - black)
+    val = numpy.minimum(2400, matDiff) + \
+        (matDiff * (12000 - matTotal) * pawns) // (6400 * (pawns + 1))
+    return numpy.where(whiteLeads, val, -val), phase
+
+
+def _bishops(boards, opboards, counts, friends, color, phase):
+    onWhite = boards[:, BISHOP] & _bitboard(WHITE_SQUARES) != 0
+    squareMask = numpy.where(onWhite, _bitboard(WHITE_SQUARES),
+                             _bitboard(BLACK_SQUARES))
+    score = - popcount(boards[:, PAWN] & squareMask) \
+        - popcount(opboards[:, PAWN] & squareMask) // 2
+    score += numpy.where(
+        phase > 6, popcount(friends[:, 1 - color] & squareMask), 0)
+    return numpy.where(counts[:, color, BISHOP] == 1, score, 0)
+
+
+def _rooks(boards, kings, color, phase):
+    opkingFile = kings[:, 1 - color] & 7
+    score = 0
+    for file in range(8):
+        mask = _bitboard(fileBits[file])
+        bonus = 11 + numpy.where(opkingFile >= 4, 40, 0) if file == 5 else 11
+        score = score + numpy.where(boards[:, PAWN] & mask == 0, popcount(
+            boards[:, ROOK] & mask) * bonus, 0)
+    return numpy.where(phase < 7, score, 0)
+
+
+def _doubleQR7(boards, bitboards, colors, color):
+    # As in leval, the opponent is the side not to move
+    opboards = numpy.where((colors == WHITE)[:, None], bitboards[:, BLACK],
+                           bitboards[:, WHITE])
+    doubled = popcount((boards[:, QUEEN] | boards[:, ROOK]) &
+                       _bitboard(brank7[color])) >= 2
+    targets = (opboards[:, KING] & _bitboard(brank8[color]) != 0) | \
+        (opboards[:, PAWN] & _bitboard(brank7[color]) != 0)
+    return numpy.where(doubled & targets, 30, 0)
+
+
+def _king(boards, kings, color, phase):
+    king = kings[:, color]
+    file = king & 7
+    if color == WHITE:
+        wall1 = numpy.where(file < 3, _bitboard(frontWall[color][B1]),
+                            _bitboard(frontWall[color][G1]))
+        wall2 = wall1 >> _8
+    else:
+        wall1 = numpy.where(file < 3, _bitboard(frontWall[color][B8]),
+                            _bitboard(frontWall[color][G8]))
+        wall2 = wall1 << _8
+    pawns = boards[:, PAWN]
+    numbermod = numberMods[popcount(wall1 | wall2 & pawns)]
+    s = popcount(wall1 & pawns) * 2 + popcount(wall2 & pawns)
+    castled = ((file < 3) | (file > 4)) & (king >> 3 == 0)
+    return numpy.where(phase >= 6, endingKingScores[king], numpy.where(
+        castled, (s * numbermod * 5) // 6, 0))
+
+
+def _kingTropism(boardSquares, kings, color):
+    opking = kings[:, 1 - color]
+    score = 0
+    for piece in (KNIGHT, BISHOP, ROOK, QUEEN):
+        score = score + (boardSquares[:, color, piece] *
+                         tropismTables[piece][:, opking].T).sum(-1)
+    return score
+
+
+def _dev(boards, color, castling, plyCount, castled):
+    score = numpy.where(castling & CAS_FLAGS[color][0], 0, -40)
+    score += numpy.where(castling & CAS_FLAGS[color][1], 0, -50)
+
+    # firstBit of the queens isn't the home square
+    home = D1 + 56 * color
+    before = _bitboard(~(bitPosArray[home] * 2 - 1))
+    queens = boards[:, QUEEN]
+    score += numpy.where((queens & bitPos[home] != 0) & (queens & before == 0),
+                         0, -30)
+
+    # leval compares the wing pawn bitboards with 2, which no pawns on a2/b2
+    # or g2/h2 make, so the structure always counts as destroyed.
+    score -= 35
+
+    return numpy.where((plyCount >= 38) | castled[:, color], 0, score)
+
+
+def _pawnInfo(bitboards, counts, phase):
+    """ The score of cacheablePawnInfo from white's point of view, and the
+        passed pawns. """
+
+    allPawns = bitboards[:, WHITE, PAWN] | bitboards[:, BLACK, PAWN]
+    score = 0
+    passed = numpy.zeros(len(phase), numpy.uint64)
+    for color in WHITE, BLACK:
+        opcolor = 1 - color
+        pawns = bitboards[:, color, PAWN]
+        oppawns = bitboards[:, opcolor, PAWN]
+        if color == WHITE:
+            step, ptype, opptype = 8, PAWN, BPAWN
+        else:
+            step, ptype, opptype = -8, BPAWN, PAWN
+
+        def fewerDefenders(i):
+            return popcount(pawns & _bitboard(moveArray[opptype][i])) < \
+                popcount(oppawns & _bitboard(moveArray[ptype][i]))
+
+        s = (squares(pawns) * pawnScores[color]).sum(-1)
+        for cord in range(8, 56):
+            bit = bitPos[cord]
+            has = pawns & bit != 0
+            if not has.any():
+                continue
+
+            if color == WHITE:
+                ahead = fromToRay[cord][cord | 56]
+            else:
+                ahead = fromToRay[cord][cord & 7]
+            isPassed = has & (oppawns & _bitboard(
+                passedPawnMask[color][cord]) == 0) & \
+                (pawns & _bitboard(ahead) == 0)
+            passed |= numpy.where(isPassed, bit, numpy.uint64(0))
+            s += numpy.where(isPassed,
+                             (passedScores[color][cord >> 3] * phase) // 12, 0)
+
+            i = cord + step
+            backward = (pawns & _bitboard(passedPawnMask[opcolor][i] &
+                                          ~fileBits[cord & 7]) == 0) & \
+                (allPawns & bitPos[i] == 0) & fewerDefenders(i)
+            if bitPosArray[cord] & brank7[opcolor]:
+                for i in (i + step, i + step * 2):
+                    backward |= (pawns & _bitboard(
+                        passedPawnMask[opcolor][i] & ~fileBits[1]) == 0) & \
+                        fewerDefenders(i)
+            s -= numpy.where(has & backward, 8 + phase, 0)
+
+            attacks = _bitboard(moveArray[ptype][cord])
+            s -= numpy.where(has & (oppawns & attacks != 0) &
+                             (pawns & attacks != 0), 18, 0)
+
+        for file in range(8):
+            mask = _bitboard(fileBits[file])
+            nfile = popcount(pawns & mask)
+            s -= numpy.where(nfile > 1, 8 + phase, 0)
+            isolated = (nfile > 0) & (pawns & _bitboard(isolaniMask[file]) == 0)
+            s += numpy.where(isolated, numpy.where(
+                oppawns & mask == 0, isolani_weaker[file],
+                isolani_normal[file]) * nfile, 0)
+
+        s -= numpy.where(counts[:, color, PAWN] == 8, 10, 0)
+        wall = _bitboard(stonewall[color])
+        s += numpy.where(pawns & wall == wall, 10, 0)
+        s -= popcount((pawns >> _8) & oppawns & _bitboard(lbox)) * 10
+
+        score = score + s if color == WHITE else score - s
+    return score, passed
+
+
+def _pawnStructure(bitboards, counts, colors, blocker, kings, color, phase,
+                   passed):
+    opcolor = 1 - color
+    pawns = bitboards[:, color, PAWN]
+    opboards = bitboards[:, opcolor]
+    king = kings[:, color]
+    opking = kings[:, opcolor]
+    passed = passed & pawns
+    score = 0
+
+    # Connected passed pawns on 6th or 7th rank
+    t = passed & _bitboard(brank67[color])
+    opMajorCount = counts[:, opcolor, KNIGHT:KING].sum(-1)
+    n1 = opking & 7
+    n2 = opking >> 3
+    farRank = n2 < 4 if color == WHITE else n2 > 3
+    for f in range(7):
+        connected = (t & _bitboard(fileBits[f]) != 0) & \
+            (t & _bitboard(fileBits[f + 1]) != 0)
+        far = (n1 < f - 1) | (n1 > f + 1) | farRank
+        score += numpy.where(connected & far & (opMajorCount == 1), 50, 0)
+
+    for cord in range(8, 56):
+        has = passed & bitPos[cord] != 0
+        if not has.any():
+            continue
+        bonus = passedScores[color][cord >> 3]
+
+        # Enemy has no pieces & King is out of the square of the pawn
+        square = _bitboard(squarePawnMask[color][cord])
+        outside = numpy.where(colors == color,
+                              opboards[:, KING] & square == 0,
+                              kingMoves[opking] & square == 0)
+        score += numpy.where(has & (opMajorCount == 0) & outside, bonus, 0)
+
+        # No majors are able to hunt us down
+        found = False
+        for piece, mask in hunterMasks[color][cord].items():
+            found = found | (opboards[:, piece] & _bitboard(mask) != 0)
+        score += numpy.where(has & ~found, bonus // 5, 0)
+
+    # Penalize Pawn on d2,e2/d7,e7 is blocked
+    if color == WHITE:
+        blocked = (pawns & _bitboard(d2e2[WHITE])) >> _8 & blocker
+    else:
+        blocked = (pawns & _bitboard(d2e2[BLACK])) << _8 & blocker
+    score -= numpy.where(blocked != 0, 48, 0)
+
+    # Pawn storms against a king castled on the other side
+    storm = squares(pawns & stormMasks[n1])
+    stormScore = (storm * stormTable[:, opking].T).sum(-1)
+    score += numpy.where((abs((king & 7) - n1) >= 4) & (phase < 6),
+                         stormScore, 0)
+
+    return numpy.where(pawns == 0, 0, score)
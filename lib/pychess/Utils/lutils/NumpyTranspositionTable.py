@@ -0,0 +1,88 @@
+from __future__ import absolute_import
+
+# A transposition table with the same memory layout as TranspositionTable,
+# accessed through NumPy arrays instead of struct. A bucket is read with a
+# single indexing operation, and the checks and the choice of the slot to
+# replace are done by array operations on the whole bucket.
+#
+# It is not a speedup: a bucket holds only four entries, so the overhead of
+# creating NumPy scalars and arrays outweighs the vectorized checks. A probe
+# takes about ten times as long as with struct, and a record about five times.
+# As the table takes a small share of the search time, whole searches run at
+# about the same speed with either. It is only used when selected with the
+# CECP command "hashtable numpy", and "benchmark tables" compares the two.
+
+import numpy
+
+from pychess.Utils.const import hashfALPHA, hashfBETA, hashfEXACT, hashfBAD
+from pychess.Utils.lutils.ldata import MATE_VALUE, MAXPLY
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable
+
+# The fields following the check word make up the data word of
+# TranspositionTable (on little endian machines), so both implementations can
+# share a table.
+entryDtype = numpy.dtype([("check", "<u8"), ("move", "<u2"), ("score", "<i2"),
+                          ("depth", "<u2"), ("hashf", "u1"),
+                          ("search_id", "u1")])
+
+
+class NumpyTranspositionTable(TranspositionTable):
+    def __init__(self, maxSize, name=None, create=True):
+        TranspositionTable.__init__(self, maxSize, name, create)
+        count = self.buckets * 4
+        self.entries = numpy.frombuffer(self.data, entryDtype,
+                                        count).reshape(self.buckets, 4)
+        self.words = numpy.frombuffer(self.data, numpy.uint64,
+                                      count * 2).reshape(self.buckets, 4, 2)
+
+    def close(self):
+        # The arrays export the shared buffer, which must be released first
+        self.entries = self.words = None
+        TranspositionTable.close(self)
+
+    def clear(self):
+        self.words.fill(0)
+        self.killer1 = [-1] * 80
+        self.killer2 = [-1] * 80
+        self.hashmove = [-1] * 80
+        self.butterfly = [0] * (64 * 64)
+
+    def probe(self, board, depth, alpha, beta):
+        hash = numpy.uint64(board.hash)
+        index = board.hash % self.buckets
+        words = self.words[index]
+        hits = numpy.flatnonzero((words[:, 0] ^ words[:, 1] == hash) &
+                                 (words[:, 1] != 0))
+        if not len(hits):
+            return
+        move, score, tdepth, hashf = self.entries[index, hits[0]].item()[1:5]
+        # Mate score bounds are guaranteed to be accurate at any depth.
+        if tdepth < depth and abs(score) < MATE_VALUE - MAXPLY:
+            return move, score, hashfBAD
+        if hashf == hashfEXACT:
+            return move, score, hashf
+        if hashf == hashfALPHA and score <= alpha:
+            return move, alpha, hashf
+        if hashf == hashfBETA and score >= beta:
+            return move, beta, hashf
+
+    def record(self, board, move, score, hashf, depth):
+        hash = board.hash
+        index = hash % self.buckets
+        words = self.words[index]
+        free = (words[:, 1] == 0) | (words[:, 0] ^ words[:, 1] == hash)
+        if free.any():
+            staleIndex = free.argmax()
+        else:
+            entries = self.entries[index]
+            search_id = entries["search_id"].astype(int)
+            relevance = numpy.where(
+                (search_id != self.search_id) &
+                (entries["hashf"] == hashfEXACT), 0x8000, 0) + \
+                numpy.where(((self.search_id - search_id) & 0xff) > 1,
+                            0x4000, 0) + entries["depth"]
+            staleIndex = relevance.argmin()
+            self.collisions += 1
+        data = move & 0xffff | (score & 0xffff) << 16 | (depth & 0xffff) << 32 | \
+            hashf << 48 | self.search_id << 56
+        words[staleIndex] = (hash ^ data, data)
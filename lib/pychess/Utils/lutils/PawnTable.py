@@ -0,0 +1,112 @@
+from ctypes import create_string_buffer, memset
+from struct import Struct
+
+from pychess.Utils.lutils.sharedmem import SharedBuffer
+
+# The pawn structure terms only depend on the pawns and the game phase, so
+# they are remembered by the pawn hash of the board. An entry consists of four
+# 64 bit words:
+# check       the key XOR'ed with the three other words
+# info        bits  0-15  score       pawn score from white's point of view
+#             bits 16-47  shelters    the king shelters (see below)
+# passed      bitboard of passed pawns
+# weaked      bitboard of weak pawns
+# The key is the pawn hash XOR'ed with a constant of the phase. Like in the
+# TranspositionTable, the check word makes entries torn by concurrent writers
+# look like entries of other positions, so the table can be shared by several
+# processes without locking.
+# The shelters of the kings castled on either side are packed in 8 bits each,
+# as white on the queen side, white on the king side, black on the queen side
+# and black on the king side, starting from the lowest bits.
+entryType = Struct('=QQQQ')
+
+PHASE_KEYS = (0x3382fa0f975ef186, 0x5fe3163b202c499e, 0x2b4fee6dbe2c83a8,
+              0xc962d003199f5ced, 0x4be3b0f3cae4c359, 0xc8a04fa84cc980ba,
+              0x6fe9160d3903dc72, 0x6776797d623839fb)
+
+
+class PawnTable:
+    def __init__(self, maxSize, name=None, create=True):
+        """ Creates a table of about maxSize bytes.
+            If name is given, the table lives in named shared memory, which
+            other processes can attach to with
+            PawnTable(0, name, create=False). """
+        self.shared = None
+        if name is None:
+            assert maxSize > 0
+            data = create_string_buffer(maxSize)
+        else:
+            self.shared = SharedBuffer(name, maxSize, create)
+            data = self.shared.buf
+        self.data = data
+        self.entries = len(data) // entryType.size
+        assert self.entries > 0
+        self.size = self.entries * entryType.size
+        # The evaluation asks for the entry of the same position several
+        # times, so the last one is kept at hand. Those lookups are counted
+        # apart, so that probes and hits are about the table itself.
+        self.lastKey = None
+        self.lastEntry = None
+        self.lastKeyHits = 0
+        self.probes = 0
+        self.hits = 0
+        # Stores that replaced an entry of another pawn structure
+        self.collisions = 0
+
+    def close(self):
+        """ Releases the shared memory. The creator also removes its name. """
+        if self.shared is not None:
+            self.data = None
+            self.shared.close()
+            if self.shared.created:
+                self.shared.unlink()
+            self.shared = None
+
+    def clear(self):
+        if self.shared is None:
+            memset(self.data, 0, self.size)
+        else:
+            self.data[:self.size] = b"\0" * self.size
+        self.lastKey = None
+        self.lastEntry = None
+
+    def resetCounters(self):
+        self.lastKeyHits = 0
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+
+    def hitRate(self):
+        return self.hits / float(self.probes) if self.probes else 0.
+
+    def probe(self, pawnhash, phase):
+        """ Returns (score, passed, weaked, shelters) or None """
+        key = pawnhash ^ PHASE_KEYS[phase - 1]
+        if key == self.lastKey:
+            self.lastKeyHits += 1
+            return self.lastEntry
+        self.probes += 1
+        check, info, passed, weaked = entryType.unpack_from(
+            self.data, (key % self.entries) * entryType.size)
+        if check ^ info ^ passed ^ weaked != key or not check:
+            return None
+        self.hits += 1
+        score = info & 0xffff
+        if score >= 0x8000:
+            score -= 0x10000
+        self.lastKey = key
+        self.lastEntry = score, passed, weaked, info >> 16
+        return self.lastEntry
+
+    def record(self, pawnhash, phase, score, passed, weaked, shelters):
+        key = pawnhash ^ PHASE_KEYS[phase - 1]
+        offset = (key % self.entries) * entryType.size
+        check, info, oldPassed, oldWeaked = entryType.unpack_from(self.data,
+                                                                  offset)
+        if check and check ^ info ^ oldPassed ^ oldWeaked != key:
+            self.collisions += 1
+        info = score & 0xffff | shelters << 16
+        entryType.pack_into(self.data, offset, key ^ info ^ passed ^ weaked,
+                            info, passed, weaked)
+        self.lastKey = key
+        self.lastEntry = score, passed, weaked, shelters
@@ -1,25 +1,46 @@
-from ctypes import create_string_buffer, memset
+from ctypes import create_string_buffer
 from struct import Struct
 
 from pychess.Utils.const import hashfALPHA, hashfBETA, hashfEXACT, hashfBAD
 from pychess.Utils.lutils.ldata import MATE_VALUE, MAXPLY
-
-# Store hash entries in buckets of 4. An entry consists of:
-# key         32 bits derived from the board hash
-# search_id   counter used to determine entry's age
-# hashf       bound type (one of the hashf* constants)
-# depth       search depth
-# score       search score
-# move        best move (or cutoff move)
-entryType = Struct('=I B B H h H')
+from pychess.Utils.lutils.sharedmem import SharedBuffer
+
+# Store hash entries in buckets of 4. An entry consists of two 64 bit words:
+# check       the board hash XOR'ed with the data word
+# data        the packed entry:
+#             bits  0-15  move        best move (or cutoff move)
+#             bits 16-31  score       search score (two's complement)
+#             bits 32-47  depth       search depth
+#             bits 48-55  hashf       bound type (one of the hashf* constants)
+#             bits 56-63  search_id   counter used to determine entry's age
+# The check word only matches the board hash, when both words were written by
+# the same record() call. Thus several processes can share a table without any
+# locking, as an entry torn by two concurrent writers just looks like an entry
+# of some other position.
+entryType = Struct('=QQ')
+bucketType = Struct('=QQQQQQQQ')
 
 
 class TranspositionTable:
-    def __init__(self, maxSize):
-        assert maxSize > 0
-        self.buckets = maxSize // (4 * entryType.size)
-        self.data = create_string_buffer(self.buckets * 4 * entryType.size)
+    def __init__(self, maxSize, name=None, create=True):
+        """ Creates a table of about maxSize bytes.
+            If name is given, the table lives in named shared memory, which
+            other processes can attach to with
+            TranspositionTable(0, name, create=False). """
+        self.shared = None
+        if name is None:
+            assert maxSize > 0
+            data = create_string_buffer(maxSize)
+        else:
+            self.shared = SharedBuffer(name, maxSize, create)
+            data = self.shared.buf
+        self.data = data
+        self.buckets = len(data) // bucketType.size
+        assert self.buckets > 0
+        self.size = self.buckets * bucketType.size
         self.search_id = 0
+        # Stores that replaced an entry of another position
+        self.collisions = 0
 
         self.killer1 = [-1] * 80
         self.killer2 = [-1] * 80
@@ -27,8 +48,17 @@ class TranspositionTable:
 
         self.butterfly = [0] * (64 * 64)
 
+    def close(self):
+        """ Releases the shared memory. The creator also removes its name. """
+        if self.shared is not None:
+            self.data = None
+            self.shared.close()
+            if self.shared.created:
+                self.shared.unlink()
+            self.shared = None
+
     def clear(self):
-        memset(self.data, 0, self.buckets * 4 * entryType.size)
+        self.data[:self.size] = b"\0" * self.size
         self.killer1 = [-1] * 80
         self.killer2 = [-1] * 80
         self.hashmove = [-1] * 80
@@ -39,12 +69,18 @@ class TranspositionTable:
         # TODO: consider clearing butterfly table
 
     def probe(self, board, depth, alpha, beta):
-        baseIndex = (board.hash % self.buckets) * 4
-        key = (board.hash // self.buckets) & 0xffffffff
-        for i in range(baseIndex, baseIndex + 4):
-            tkey, search_id, hashf, tdepth, score, move = entryType.unpack_from(
-                self.data, i * entryType.size)
-            if tkey == key:
+        hash = board.hash
+        words = bucketType.unpack_from(self.data,
+                                       (hash % self.buckets) * bucketType.size)
+        for i in (0, 2, 4, 6):
+            data = words[i + 1]
+            if data and words[i] ^ data == hash:
+                move = data & 0xffff
+                score = (data >> 16) & 0xffff
+                if score >= 0x8000:
+                    score -= 0x10000
+                tdepth = (data >> 32) & 0xffff
+                hashf = (data >> 48) & 0xff
                 # Mate score bounds are guaranteed to be accurate at any depth.
                 if tdepth < depth and abs(score) < MATE_VALUE - MAXPLY:
                     return move, score, hashfBAD
@@ -54,26 +90,44 @@ class TranspositionTable:
                     return move, alpha, hashf
                 if hashf == hashfBETA and score >= beta:
                     return move, beta, hashf
+                return
+
+    def probePV(self, board):
+        """ Returns the move of board's entry, if it is exact, else None """
+        hash = board.hash
+        words = bucketType.unpack_from(self.data,
+                                       (hash % self.buckets) * bucketType.size)
+        for i in (0, 2, 4, 6):
+            data = words[i + 1]
+            if data and words[i] ^ data == hash:
+                if (data >> 48) & 0xff == hashfEXACT:
+                    return data & 0xffff
+                return
 
     def record(self, board, move, score, hashf, depth):
-        baseIndex = (board.hash % self.buckets) * 4
-        key = (board.hash // self.buckets) & 0xffffffff
+        hash = board.hash
+        offset = (hash % self.buckets) * bucketType.size
+        words = bucketType.unpack_from(self.data, offset)
         # We always overwrite *something*: an empty slot, this position's last entry, or else the least relevant.
-        staleIndex = baseIndex
+        staleIndex = 0
         staleRelevance = 0xffff
-        for i in range(baseIndex, baseIndex + 4):
-            tkey, search_id, thashf, tdepth, tscore, tmove = entryType.unpack_from(
-                self.data, i * entryType.size)
-            if tkey == 0 or tkey == key:
+        for i in (0, 2, 4, 6):
+            data = words[i + 1]
+            if not data or words[i] ^ data == hash:
                 staleIndex = i
                 break
-            relevance = (0x8000 if search_id != self.search_id and thashf == hashfEXACT else 0) + \
-                        (0x4000 if ((self.search_id - search_id) & 0xff) > 1 else 0) + tdepth
+            search_id = data >> 56
+            relevance = (0x8000 if search_id != self.search_id and (data >> 48) & 0xff == hashfEXACT else 0) + \
+                        (0x4000 if ((self.search_id - search_id) & 0xff) > 1 else 0) + ((data >> 32) & 0xffff)
             if relevance < staleRelevance:
                 staleIndex = i
                 staleRelevance = relevance
-        entryType.pack_into(self.data, staleIndex * entryType.size, key,
-                            self.search_id, hashf, depth, score, move)
+        else:
+            self.collisions += 1
+        data = move & 0xffff | (score & 0xffff) << 16 | (depth & 0xffff) << 32 | \
+            hashf << 48 | self.search_id << 56
+        entryType.pack_into(self.data, offset + staleIndex * 8, hash ^ data,
+                            data)
 
     def addKiller(self, ply, move):
         if self.killer1[ply] == -1:
@@ -1,7 +1,8 @@
 from __future__ import absolute_import
 
-from .bitboard import bitPosArray, notBitPosArray, lastBit, firstBit, clearBit, lsb
-from .ldata import moveArray, rays, directions, fromToRay, PIECE_VALUES, PAWN_VALUE
+from .bitboard import bitPosArray, notBitPosArray, lastBit, firstBit, clearBit
+from .ldata import moveArray, rays, directions, fromToRay, PIECE_VALUES, PAWN_VALUE, \
+    rookMask, rookAttacks, bishopMask, bishopAttacks
 from pychess.Utils.const import ASEAN_VARIANTS, ASEAN_BBISHOP, ASEAN_WBISHOP, ASEAN_QUEEN, \
     BLACK, WHITE, PAWN, BPAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, ENPASSANT, ATOMICCHESS
 
@@ -22,7 +23,6 @@ def isAttacked(board, cord, color, ischecked=False):
     if pboards[KNIGHT] & _moveArray[KNIGHT][cord]:
         return True
 
-    rayto = fromToRay[cord]
     blocker = board.blocker
 
     # Bishops & Queens
@@ -33,39 +33,21 @@ def isAttacked(board, cord, color, ischecked=False):
             return True
         if pboards[QUEEN] & _moveArray[ASEAN_QUEEN][cord]:
             return True
+        # Rooks
+        if pboards[ROOK] & rookAttacks[cord][blocker & rookMask[cord]]:
+            return True
     else:
-        bitboard = (pboards[BISHOP] |
-                    pboards[QUEEN]) & _moveArray[BISHOP][cord]
-        if bitboard:
-            others = ~bitboard & blocker
-            # inlined iterBits()
-            while bitboard:
-                bit = bitboard & -bitboard
-                ray = rayto[lsb[bit]]
-                # If there is a path and no other piece stand in our way
-                if ray and not ray & others:
-                    return True
-                bitboard -= bit
-
-    # Rooks & Queens
-    if board.variant in ASEAN_VARIANTS:
-        bitboard = pboards[ROOK] & _moveArray[ROOK][cord]
-    else:
-        bitboard = (pboards[ROOK] | pboards[QUEEN]) & _moveArray[ROOK][cord]
-    if bitboard:
-        others = ~bitboard & blocker
-        # inlined iterBits()
-        while bitboard:
-            bit = bitboard & -bitboard
-            ray = rayto[lsb[bit]]
-            # If there is a path and no other piece stand in our way
-            if ray and not ray & others:
-                return True
-            bitboard -= bit
-
-            # Pawns
-            # Would a pawn of the opposite color, standing at out kings cord, be able
-            # to attack any of our pawns?
+        if (pboards[BISHOP] | pboards[QUEEN]) & \
+                bishopAttacks[cord][blocker & bishopMask[cord]]:
+            return True
+        # Rooks & Queens
+        if (pboards[ROOK] | pboards[QUEEN]) & \
+                rookAttacks[cord][blocker & rookMask[cord]]:
+            return True
+
+    # Pawns
+    # Would a pawn of the opposite color, standing at out kings cord, be able
+    # to attack any of our pawns?
     ptype = color == WHITE and BPAWN or PAWN
     if pboards[PAWN] & _moveArray[ptype][cord]:
         return True
@@ -95,7 +77,6 @@ def getAttacks(board, cord, color):
     # Pawns
     bits |= pieces[PAWN] & _moveArray[color == WHITE and BPAWN or PAWN][cord]
 
-    rayto = fromToRay[cord]
     blocker = board.blocker
 
     # Bishops and Queens
@@ -105,30 +86,16 @@ def getAttacks(board, cord, color):
         bits |= pieces[BISHOP] & bishopMoves[cord]
 
         bits |= pieces[QUEEN] & _moveArray[ASEAN_QUEEN][cord]
+
+        # Rooks
+        bits |= pieces[ROOK] & rookAttacks[cord][blocker & rookMask[cord]]
     else:
-        bitboard = (pieces[BISHOP] | pieces[QUEEN]) & _moveArray[BISHOP][cord]
-        # inlined iterBits()
-        while bitboard:
-            bit = bitboard & -bitboard
-            c = lsb[bit]
-            ray = rayto[c]
-            if ray and not clearBit(ray & blocker, c):
-                bits |= bitPosArray[c]
-            bitboard -= bit
-
-    # Rooks and queens
-    if board.variant in ASEAN_VARIANTS:
-        bitboard = pieces[ROOK] & _moveArray[ROOK][cord]
-    else:
-        bitboard = (pieces[ROOK] | pieces[QUEEN]) & _moveArray[ROOK][cord]
-    # inlined iterBits()
-    while bitboard:
-        bit = bitboard & -bitboard
-        c = lsb[bit]
-        ray = rayto[c]
-        if ray and not clearBit(ray & blocker, c):
-            bits |= bitPosArray[c]
-        bitboard -= bit
+        bits |= (pieces[BISHOP] | pieces[QUEEN]) & \
+            bishopAttacks[cord][blocker & bishopMask[cord]]
+
+        # Rooks and queens
+        bits |= (pieces[ROOK] | pieces[QUEEN]) & \
+            rookAttacks[cord][blocker & rookMask[cord]]
 
     return bits
 
@@ -185,72 +152,98 @@ def staticExchangeEvaluate(board, moveOrTcord, color=None):
     First determine the target square.  Create a bitboard of all squares
     attacking the target square for both sides.  Using these 2 bitboards,
     we take turn making captures from smallest piece to largest piece.
-    When a sliding piece makes a capture, we check behind it to see if
-    another attacker piece has been exposed.  If so, add this to the bitboard
-    as well.  When performing the "captures", we stop if one side is ahead
-    and doesn't need to capture, a form of pseudo-minimaxing. """
+    When a sliding piece (or pawn) makes a capture, it is taken off the
+    occupied squares, and the sliders attacking the target square through
+    them are added to the bitboards, as they have been exposed.  When
+    performing the "captures", we stop if one side is ahead and doesn't need
+    to capture, a form of pseudo-minimaxing. """
 
     #
     # Notice: If you use the tcord version, the color is the color attacked, and
     #         the color to witch the score is relative.
     #
 
-    swaplist = [0]
+    arBoard = board.arBoard
+    friends = board.friends
+    wboards, bboards = board.boards
+    occupied = board.blocker
 
     if color is None:
         move = moveOrTcord
-        flag = move >> 12
-        fcord = (move >> 6) & 63
         tcord = move & 63
+        fcord = (move >> 6) & 63
+        color = friends[BLACK] & bitPosArray[fcord] and BLACK or WHITE
+    else:
+        move = None
+        tcord = moveOrTcord
+    opcolor = 1 - color
 
-        color = board.friends[BLACK] & bitPosArray[fcord] and BLACK or WHITE
-        opcolor = 1 - color
-        boards = board.boards[color]
-        opboards = board.boards[opcolor]
-
+    # The sliders of both sides, which captures can expose
+    if board.variant in ASEAN_VARIANTS:
+        diagonal = 0
+        straight = wboards[ROOK] | bboards[ROOK]
         ours = getAttacks(board, tcord, color)
-        ours = clearBit(ours, fcord)
         theirs = getAttacks(board, tcord, opcolor)
-
-        if xray[board.arBoard[fcord]]:
-            ours, theirs = addXrayPiece(board, tcord, fcord, color, ours,
-                                        theirs)
-
-        from pychess.Variants import variants
-        PROMOTIONS = variants[board.variant].PROMOTIONS
-        if flag in PROMOTIONS:
+    else:
+        diagonal = wboards[BISHOP] | wboards[QUEEN] | bboards[BISHOP] | \
+            bboards[QUEEN]
+        straight = wboards[ROOK] | wboards[QUEEN] | bboards[ROOK] | \
+            bboards[QUEEN]
+        attackers = \
+            (wboards[KNIGHT] | bboards[KNIGHT]) & moveArray[KNIGHT][tcord] | \
+            (wboards[KING] | bboards[KING]) & moveArray[KING][tcord] | \
+            wboards[PAWN] & moveArray[BPAWN][tcord] | \
+            bboards[PAWN] & moveArray[PAWN][tcord] | \
+            diagonal & bishopAttacks[tcord][occupied & bishopMask[tcord]] | \
+            straight & rookAttacks[tcord][occupied & rookMask[tcord]]
+        ours = attackers & friends[color]
+        theirs = attackers & friends[opcolor]
+
+    if move is not None:
+        flag = move >> 12
+        piece = arBoard[fcord]
+        ours = clearBit(ours, fcord)
+        if xray[piece]:
+            occupied = clearBit(occupied, fcord)
+            bits = exposed(tcord, occupied, diagonal, straight)
+            ours |= bits & friends[color]
+            theirs |= bits & friends[opcolor]
+
+        promotions = promotionsByVariant.get(board.variant)
+        if promotions is None:
+            promotions = variantPromotions(board.variant)
+        if flag in promotions:
             swaplist = [PIECE_VALUES[flag - 3] - PAWN_VALUE]
             lastval = -PIECE_VALUES[flag - 3]
         else:
             if flag == ENPASSANT:
                 swaplist = [PAWN_VALUE]
             else:
-                swaplist = [PIECE_VALUES[board.arBoard[tcord]]]
-            lastval = -PIECE_VALUES[board.arBoard[fcord]]
-
+                swaplist = [PIECE_VALUES[arBoard[tcord]]]
+            lastval = -PIECE_VALUES[piece]
     else:
-        tcord = moveOrTcord
-        opcolor = 1 - color
-        boards = board.boards[color]
-        opboards = board.boards[opcolor]
-
-        ours = getAttacks(board, tcord, color)
-        theirs = getAttacks(board, tcord, opcolor)
-
-        lastval = -PIECE_VALUES[board.arBoard[tcord]]
+        swaplist = [0]
+        lastval = -PIECE_VALUES[arBoard[tcord]]
 
+    # The captures are made by the firstBit of the least valuable attackers,
+    # as the order the x-rays are found in may depend on it. Kings don't
+    # expose anything.
+    boards = board.boards[color]
+    opboards = board.boards[opcolor]
     while theirs:
         for piece in range(PAWN, KING + 1):
             r = theirs & opboards[piece]
             if r:
-                cord = firstBit(r)
-                theirs = clearBit(theirs, cord)
-                if xray[piece]:
-                    ours, theirs = addXrayPiece(board, tcord, cord, color,
-                                                ours, theirs)
-                swaplist.append(swaplist[-1] + lastval)
-                lastval = PIECE_VALUES[piece]
                 break
+        bit = 1 << (r.bit_length() - 1)
+        theirs ^= bit
+        if xray[piece]:
+            occupied ^= bit
+            bits = exposed(tcord, occupied, diagonal, straight)
+            ours |= bits & friends[color]
+            theirs |= bits & friends[opcolor]
+        swaplist.append(swaplist[-1] + lastval)
+        lastval = PIECE_VALUES[piece]
 
         if not ours:
             break
@@ -258,14 +251,16 @@ def staticExchangeEvaluate(board, moveOrTcord, color=None):
         for piece in range(PAWN, KING + 1):
             r = ours & boards[piece]
             if r:
-                cord = firstBit(r)
-                ours = clearBit(ours, cord)
-                if xray[piece]:
-                    ours, theirs = addXrayPiece(board, tcord, cord, color,
-                                                ours, theirs)
-                swaplist.append(swaplist[-1] + lastval)
-                lastval = -PIECE_VALUES[piece]
                 break
+        bit = 1 << (r.bit_length() - 1)
+        ours ^= bit
+        if xray[piece]:
+            occupied ^= bit
+            bits = exposed(tcord, occupied, diagonal, straight)
+            ours |= bits & friends[color]
+            theirs |= bits & friends[opcolor]
+        swaplist.append(swaplist[-1] + lastval)
+        lastval = -PIECE_VALUES[piece]
 
     #  At this stage, we have the swap scores in a list.  We just need to
     #  mini-max the scores from the bottom up to the top of the list.
@@ -284,37 +279,23 @@ def staticExchangeEvaluate(board, moveOrTcord, color=None):
 xray = (False, True, False, True, True, True, False)
 
 
-def addXrayPiece(board, tcord, fcord, color, ours, theirs):
-    """ This is used by swapOff.
-    The purpose of this routine is to find a piece which attack through
-    another piece (e.g. two rooks, Q+B, B+P, etc.) Color is the side attacking
-    the square where the swapping is to be done. """
+def exposed(tcord, occupied, diagonal, straight):
+    """ The diagonal and straight sliders attacking tcord over the occupied
+        squares, which are still on them. """
 
-    dir = directions[tcord][fcord]
-    a = rays[fcord][dir] & board.blocker
-    if not a:
-        return ours, theirs
+    bits = straight & rookAttacks[tcord][occupied & rookMask[tcord]]
+    if diagonal:
+        bits |= diagonal & bishopAttacks[tcord][occupied & bishopMask[tcord]]
+    return bits & occupied
 
-    if tcord < fcord:
-        ncord = firstBit(a)
-    else:
-        ncord = lastBit(a)
 
-    piece = board.arBoard[ncord]
-    if board.variant in ASEAN_VARIANTS:
-        cond = piece == ROOK and dir > 3
-    else:
-        cond = piece == QUEEN or (
-            piece == ROOK and dir > 3) or (
-            piece == BISHOP and dir < 4)
-    if cond:
-        bit = bitPosArray[ncord]
-        if bit & board.friends[color]:
-            ours |= bit
-        else:
-            theirs |= bit
+promotionsByVariant = {}
+
 
-    return ours, theirs
+def variantPromotions(variant):
+    from pychess.Variants import variants
+    promotions = promotionsByVariant[variant] = variants[variant].PROMOTIONS
+    return promotions
 
 
 def defends(board, fcord, tcord):
@@ -17,38 +17,21 @@ def clearBit(bitboard, i):
 notBitPosArray = [~2**(63 - i) for i in range(64)]
 
 
-# firstBit returns the bit closest to 0 (A4) that is set in the board
-def firstBit(bitboard):
-    """ Returns the index of the first non-zero bit from left """
-    if (bitboard >> 48):
-        return lzArray[bitboard >> 48]
-    if (bitboard >> 32):
-        return lzArray[bitboard >> 32] + 16
-    if (bitboard >> 16):
-        return lzArray[bitboard >> 16] + 32
-    return lzArray[bitboard] + 48
+# The bit scans below use int.bit_length, which gives the position of the
+# highest set bit in a single call. With A1 as the highest bit of a bitboard,
+# that is 64 minus the cord.
 
-# The bitCount array returns the leading non-zero bit in the 16 bit
-# input argument.
 
-lzArray = array('B', [0] * 65536)
-
-s = n = 1
-for i in range(16):
-    for j in range(s, s + n):
-        lzArray[j] = 16 - 1 - i
-    s += n
-    n += n
+# firstBit returns the bit closest to 0 (A1) that is set in the board, or 64
+# for an empty board
+def firstBit(bitboard):
+    """ Returns the index of the first non-zero bit from left """
+    return 64 - bitboard.bit_length()
 
 
 # lastBit returns the bit closest to 63 (H8) that is set in the board
 def lastBit(bitboard):
-    return lsb[bitboard & -bitboard]
-
-
-lsb = {}
-for i in range(64):
-    lsb[2**i] = 63 - i
+    return 64 - (bitboard & -bitboard).bit_length()
 
 
 # iterBits yields, or returns a list of, the positions of all set bits in a
@@ -56,10 +39,33 @@ for i in range(64):
 def iterBits(bitboard):
     while bitboard:
         bit = bitboard & -bitboard
-        yield lsb[bit]
+        yield 64 - bit.bit_length()
         bitboard -= bit
 
 
+# bitCount returns the number of bits set in the bitboard. Python 3.10 and
+# later count them in C with int.bit_count, otherwise tableBitCount adds up
+# the counts of the four 16 bit parts of the board, looked up in
+# bitCountArray.
+
+bitCountArray = array('B', [0] * 65536)
+for i in range(1, 65536):
+    bitCountArray[i] = bitCountArray[i >> 1] + (i & 1)
+
+
+def tableBitCount(bitboard):
+    return bitCountArray[bitboard & 0xffff] + \
+        bitCountArray[bitboard >> 16 & 0xffff] + \
+        bitCountArray[bitboard >> 32 & 0xffff] + \
+        bitCountArray[bitboard >> 48 & 0xffff]
+
+
+if hasattr(int, "bit_count"):
+    bitCount = int.bit_count
+else:
+    bitCount = tableBitCount
+
+
 # toString returns a representation of the bitboard for debugging
 def toString(bitboard):
     s = []
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 import os
 import re
+from collections import OrderedDict
 from ctypes import byref, c_byte, c_char_p, c_int, c_uint, c_ulong, c_size_t, c_double, Structure,\
     CDLL, CFUNCTYPE, POINTER
 
@@ -34,10 +35,23 @@ class TbStats(Structure):
     ]
 
 
+# Results of the probes kept by Zobrist hash, most recently used last
+CACHE_SIZE = 1 << 16
+# Memory of the library's own cache, and the part of it (out of 128) for the
+# WDL probes of the search
+TBCACHE_SIZE = 4 * 1024 * 1024
+TBCACHE_WDL_FRACTION = 64
+
+
 class EgtbGaviota:
     def __init__(self):
         self.libgtb = None
         self.initialized = False
+        # hash: (result, depth), with depth False when only the result is
+        # known. Failed hard probes are kept as (None, None).
+        self.cache = OrderedDict()
+        self.cacheProbes = 0
+        self.cacheHits = 0
 
         # Get a list of files in the tablebase folder.
         configuredTbPath = conf.get("egtb_path", "")
@@ -81,8 +95,8 @@ class EgtbGaviota:
         elif initInfo:
             log.info(initInfo)
 
-        # TODO: Set up a WDL cache area once the engine can use it.
-        self.initialized &= self.tbcache_init(4 * 1024 * 1024, 0)
+        self.initialized &= self.tbcache_init(TBCACHE_SIZE,
+                                              TBCACHE_WDL_FRACTION)
         if not self.initialized:
             log.warning("Failed to initialize Gaviota EGTB cache")
             self.tb_done()
@@ -100,8 +114,11 @@ class EgtbGaviota:
         return self.initialized and (
             sum(size) <= 2 or (self.availability & (3 << (2 * sum(size) - 6))) != 0)
 
-    def scoreAllMoves(self, board):
-        result, depth = self.scoreGame(board, False, False)
+    def scoreAllMoves(self, board, omitDepth=False):
+        """ Returns the (move, result, depth) of each legal move, best moves
+            first. With omitDepth, only the results are looked up and the
+            depths are None. """
+        result, depth = self.scoreGame(board, True, False)
         if result is None:
             return []
 
@@ -110,7 +127,7 @@ class EgtbGaviota:
         for move in gen(board):
             board.applyMove(move)
             if not board.opIsChecked():
-                result, depth = self.scoreGame(board, False, False)
+                result, depth = self.scoreGame(board, omitDepth, False)
                 if result is None:
                     log.warning(
                         "An EGTB file does not have all its dependencies")
@@ -122,7 +139,7 @@ class EgtbGaviota:
         def mateScore(mrd):
             if mrd[1] == DRAW:
                 return 0
-            absScore = 32767 - mrd[2]
+            absScore = 32767 - (mrd[2] or 0)
             if (board.color == WHITE) ^ (mrd[1] == WHITEWON):
                 return absScore
             return -absScore
@@ -131,6 +148,59 @@ class EgtbGaviota:
         return scores
 
     def scoreGame(self, board, omitDepth, probeSoft):
+        """ Looks the position up in the cache, then in the tables. A cached
+            result with its depth answers the probes that omit the depth as
+            well. """
+        self.cacheProbes += 1
+        cache = self.cache
+        entry = cache.pop(board.hash, None)
+        if entry is not None and (omitDepth or entry[1] is not False):
+            cache[board.hash] = entry
+            self.cacheHits += 1
+            if omitDepth:
+                return entry[0], None
+            return entry
+
+        result, depth = self._probe(board, omitDepth, probeSoft)
+        if result is not None or not probeSoft:
+            if result is not None and omitDepth:
+                entry = result, False
+            else:
+                entry = result, depth
+            cache[board.hash] = entry
+            if len(cache) > CACHE_SIZE:
+                cache.popitem(last=False)
+        elif entry is not None:
+            cache[board.hash] = entry
+        return result, depth
+
+    def clearCache(self):
+        self.cache.clear()
+        if self.initialized:
+            self.tbcache_flush()
+
+    def getStats(self):
+        """ Returns the counters of the library (the fields of TbStats, with
+            the pairs of WDL and DTM counts as lists) and of the cache """
+        result = {"cacheProbes": self.cacheProbes,
+                  "cacheHits": self.cacheHits,
+                  "cacheSize": len(self.cache)}
+        if self.initialized:
+            stats = TbStats()
+            self.tbstats_get(byref(stats))
+            for name, fieldType in TbStats._fields_:
+                value = getattr(stats, name)
+                result[name] = list(value) if hasattr(value, "_length_") \
+                    else value
+        return result
+
+    def resetStats(self):
+        self.cacheProbes = 0
+        self.cacheHits = 0
+        if self.initialized:
+            self.tbstats_reset()
+
+    def _probe(self, board, omitDepth, probeSoft):
         stm = board.color
         epsq = board.enpassant or 64  # 64 is tb_NOSQUARE
         castles = (board.castling >> 2 & 3) | (board.castling << 2 & 12)
@@ -1,12 +1,9 @@
 from __future__ import absolute_import
 
-from functools import reduce
-from operator import or_
 from pychess.Utils.const import WHITE, BLACK, KING, PAWN, EMPTY, KNIGHT, ROOK, BISHOP, QUEEN, \
-    A1, A2, A3, A4, A5, A6, A7, A8, \
-    B2, C3, D4, E5, F6, G7, H8,\
-    B7, C6, D5, E4, F3, G2, H1, \
-    B1, B8, H2, H7, G3, G6, B3, B6, sliders
+    A1, A2, A7, A8, B2, G7, H8, B7, G2, H1, H2, H7, \
+    G3, G6, B3, B6, sliders, ASEAN_VARIANTS, ATOMICCHESS, CRAZYHOUSECHESS, \
+    LOSERSCHESS, SUICIDECHESS
 
 from .bitboard import bitPosArray, iterBits, setBit
 
@@ -33,8 +30,21 @@ ASEAN_PIECE_VALUES = (0, 100, 450, 300, 630, 180, 2000)
 CRAZY_PIECE_VALUES = (0, 100, 200, 240, 240, 380, 2000)
 ATOMIC_PIECE_VALUES = (0, 100, 90, 0, 220, 850, 2000)
 
-# Maximum possible search depth. The hash structure only allows 8-bit depths.
-MAXPLY = 10
+# The values LBoard sums up the material of each side with, as used by
+# evalMaterial. Kings are only counted in the variants where they can be lost.
+MATERIAL_VALUES = (0, PAWN_VALUE, KNIGHT_VALUE, BISHOP_VALUE, ROOK_VALUE,
+                   QUEEN_VALUE, 0)
+VARIANT_MATERIAL_VALUES = {
+    CRAZYHOUSECHESS: CRAZY_PIECE_VALUES[:KING] + (0, ),
+    LOSERSCHESS: (0, 1, 1, 1, 1, 1, 0),
+    SUICIDECHESS: (0, 1, 1, 1, 1, 1, 1),
+    ATOMICCHESS: ATOMIC_PIECE_VALUES,
+}
+VARIANT_MATERIAL_VALUES.update((variant, ASEAN_PIECE_VALUES)
+                               for variant in ASEAN_VARIANTS)
+
+# Maximum possible search depth.
+MAXPLY = 30
 # Maximum possible score. Mate in n ply is +/- (MATE_VALUE-n).
 # The hash structure only allows signed 16-bit scores.
 MATE_VALUE = MAXVAL = 32767
@@ -471,8 +481,8 @@ for cord in range(A2, H2 + 1):
 for cord in range(A7, H7 + 1):
     squarePawnMask[BLACK][cord] = squarePawnMask[BLACK][cord - 8]
 
-# These tables are used to calculate rook, queen and bishop moves
-
+# The whole lines through a square, the square included: rank, a1-h8
+# diagonal, file and h1-a8 diagonal. Used to comment on moves (strateval).
 ray00 = [rays[cord][5] | rays[cord][6] | 1 << (63 - cord)
          for cord in range(64)]
 ray45 = [rays[cord][0] | rays[cord][3] | 1 << (63 - cord)
@@ -482,90 +492,60 @@ ray90 = [rays[cord][4] | rays[cord][7] | 1 << (63 - cord)
 ray135 = [rays[cord][1] | rays[cord][2] | 1 << (63 - cord)
           for cord in range(64)]
 
-attack00 = [{} for a in range(64)]
-attack45 = [{} for a in range(64)]
-attack90 = [{} for a in range(64)]
-attack135 = [{} for a in range(64)]
-
-cmap = [128, 64, 32, 16, 8, 4, 2, 1]
-rot1 = [A1, A2, A3, A4, A5, A6, A7, A8]
-rot2 = [A1, B2, C3, D4, E5, F6, G7, H8]
-rot3 = [A8, B7, C6, D5, E4, F3, G2, H1]
-
-# To save time, we init a main line for each of the four directions, and next
-# we will translate it for each possible cord
-for cord in range(8):
-    for map in range(1, 256):
-
-        # Skip entries without cord set, as cord will always be set
-        if not map & cmap[cord]:
-            continue
-
-        # Find limits inclusive
-        cord1 = cord2 = cord
-        while cord1 > 0:
-            cord1 -= 1
-            if cmap[cord1] & map:
-                break
-        while cord2 < 7:
-            cord2 += 1
-            if cmap[cord2] & map:
-                break
-
-        # Remember A1 is the left most bit
-        map00 = map << 56
-
-        attack00[cord][map00] = \
-            fromToRay[cord][cord1] |\
-            fromToRay[cord][cord2]
-
-        map90 = reduce(or_, (1 << 63 - rot1[c] for c in iterBits(map00)))
-        attack90[rot1[cord]][map90] = \
-            fromToRay[rot1[cord]][rot1[cord1]] | \
-            fromToRay[rot1[cord]][rot1[cord2]]
-
-        map45 = reduce(or_, (1 << 63 - rot2[c] for c in iterBits(map00)))
-        attack45[rot2[cord]][map45] = \
-            fromToRay[rot2[cord]][rot2[cord1]] | \
-            fromToRay[rot2[cord]][rot2[cord2]]
-
-        map135 = reduce(or_, (1 << 63 - rot3[c] for c in iterBits(map00)))
-        attack135[rot3[cord]][map135] = \
-            fromToRay[rot3[cord]][rot3[cord1]] |\
-            fromToRay[rot3[cord]][rot3[cord2]]
+# These tables are used to calculate rook, queen and bishop moves.
+# rookAttacks[cord] maps the pieces standing on the lines of a rook on cord,
+# blocker & rookMask[cord], to the squares the rook attacks. As with magic
+# bitboards, the masks leave out the squares at the ends of the lines, where a
+# piece can't block anything, which keeps the tables small. The dicts take the
+# place of the magic multiplication, and are faster at that in Python. A
+# queen attacks the union of the rook and bishop attacks.
 
 MAXBITBOARD = (1 << 64) - 1
 
-for r in range(A2, A8 + 1, 8):
-    for cord in iterBits(ray00[r]):
-        attack00[cord] = dict((map >> 8, ray >> 8)
-                              for map, ray in attack00[cord - 8].items())
-
-for r in range(B1, H1 + 1):
-    for cord in iterBits(ray90[r]):
-        attack90[cord] = dict((map >> 1, ray >> 1)
-                              for map, ray in attack90[cord - 1].items())
-
-# Bottom right
-for r in range(B1, H1 + 1):
-    for cord in iterBits(ray45[r]):
-        attack45[cord] = dict((map << 8 & MAXBITBOARD, ray << 8 & MAXBITBOARD)
-                              for map, ray in attack45[cord + 8].items())
-
-# Top left
-for r in reversed(range(A8, H8)):
-    for cord in iterBits(ray45[r]):
-        attack45[cord] = dict((map >> 8, ray >> 8)
-                              for map, ray in attack45[cord - 8].items())
-
-# Top right
-for r in range(B8, H8 + 1):
-    for cord in iterBits(ray135[r]):
-        attack135[cord] = dict((map >> 8, ray >> 8)
-                               for map, ray in attack135[cord - 8].items())
-
-# Bottom left
-for r in reversed(range(A1, H1)):
-    for cord in iterBits(ray135[r]):
-        attack135[cord] = dict((map << 8 & MAXBITBOARD, ray << 8 & MAXBITBOARD)
-                               for map, ray in attack135[cord + 8].items())
+
+def _lineAttacks(cord, dirs):
+    """ Returns the mask and the {occupancy: attacks} table of the line made
+        by the two opposite rays dirs of cord. """
+    walks = []
+    for d in dirs:
+        # The squares of the ray, from cord outwards
+        walks.append(sorted(iterBits(rays[cord][d]),
+                            key=lambda c: abs(c - cord)))
+    mask = 0
+    for walk in walks:
+        for c in walk[:-1]:
+            mask |= bitPosArray[c]
+
+    table = {}
+    # Enumerate all subsets of mask (Carry-Rippler)
+    occupancy = 0
+    while True:
+        attacks = 0
+        for walk in walks:
+            for c in walk:
+                attacks |= bitPosArray[c]
+                if occupancy & bitPosArray[c]:
+                    break
+        table[occupancy] = attacks
+        occupancy = (occupancy - mask) & mask
+        if not occupancy:
+            break
+    return mask, table
+
+
+def _sliderAttacks(lines):
+    masks = []
+    tables = []
+    for cord in range(64):
+        (mask1, table1), (mask2, table2) = [_lineAttacks(cord, dirs)
+                                            for dirs in lines]
+        masks.append(mask1 | mask2)
+        tables.append(dict((occ1 | occ2, att1 | att2)
+                           for occ1, att1 in table1.items()
+                           for occ2, att2 in table2.items()))
+    return masks, tables
+
+
+# The first 4 rays are diagonals and the next 4 file/rank (see rays above)
+bishopMask, bishopAttacks = _sliderAttacks(((0, 3), (1, 2)))
+rookMask, rookAttacks = _sliderAttacks(((4, 7), (5, 6)))
@@ -7,17 +7,16 @@ from pychess.Utils.const import WHITE, BLACK, LOSERSCHESS, SUICIDECHESS,\
     ASEAN_VARIANTS, ATOMICCHESS, CRAZYHOUSECHESS,\
     BPAWN, BISHOP, KNIGHT, QUEEN, KING, PAWN, ROOK, \
     CAS_FLAGS, H7, B6, A7, H2, G3, A2, B3, G6, D1, G8, B8, G1, B1
-from .bitboard import iterBits, firstBit, lsb
-from .ldata import fileBits, bitPosArray, PIECE_VALUES, FILE, RANK,\
-    WHITE_SQUARES, BLACK_SQUARES, ASEAN_PIECE_VALUES, ATOMIC_PIECE_VALUES, CRAZY_PIECE_VALUES,\
+from .bitboard import iterBits, firstBit, bitCount
+from .ldata import fileBits, bitPosArray, FILE, RANK,\
+    WHITE_SQUARES, BLACK_SQUARES, CRAZY_PIECE_VALUES,\
     kwingpawns1, kwingpawns2, qwingpawns1, qwingpawns2, frontWall, endingKing,\
     brank7, brank8, distance, isolaniMask, d2e2, passedScores, squarePawnMask,\
     moveArray, brank67, lbox, stonewall, isolani_normal, isolani_weaker,\
     passedPawnMask, fromToRay, pawnScoreBoard, sdistance, taxicab
 from .lsort import staticExchangeEvaluate
 from .lmovegen import newMove
-from ctypes import create_string_buffer, memset
-from struct import Struct
+from .PawnTable import PawnTable
 
 # from random import randint
 randomval = 0  # randint(8,12)/10.
@@ -62,50 +61,22 @@ def evaluateComplete(board, color):
 def evalMaterial(board, color):
     pieceCount = board.pieceCount
     opcolor = 1 - color
-    material = [0, 0]
+    # The material on the board is summed up by applyMove and popMove
+    material = board.material
     if board.variant == CRAZYHOUSECHESS:
+        holding = board.holding
+        material = material[:]
         for piece in range(PAWN, KING):
-            material[WHITE] += CRAZY_PIECE_VALUES[piece] * pieceCount[WHITE][
-                piece]
-            material[BLACK] += CRAZY_PIECE_VALUES[piece] * pieceCount[BLACK][
-                piece]
-            material[WHITE] += CRAZY_PIECE_VALUES[piece] * board.holding[
-                WHITE][piece]
-            material[BLACK] += CRAZY_PIECE_VALUES[piece] * board.holding[
-                BLACK][piece]
-    elif board.variant == LOSERSCHESS:
-        for piece in range(PAWN, KING):
-            material[WHITE] += pieceCount[WHITE][piece]
-            material[BLACK] += pieceCount[BLACK][piece]
-    elif board.variant == SUICIDECHESS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += pieceCount[WHITE][piece]
-            material[BLACK] += pieceCount[BLACK][piece]
-    elif board.variant == ATOMICCHESS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += ATOMIC_PIECE_VALUES[piece] * pieceCount[WHITE][
-                piece]
-            material[BLACK] += ATOMIC_PIECE_VALUES[piece] * pieceCount[BLACK][
-                piece]
-    elif board.variant in ASEAN_VARIANTS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += ASEAN_PIECE_VALUES[piece] * pieceCount[WHITE][
-                piece]
-            material[BLACK] += ASEAN_PIECE_VALUES[piece] * pieceCount[BLACK][
-                piece]
-    else:
-        for piece in range(PAWN, KING):
-            material[WHITE] += PIECE_VALUES[piece] * pieceCount[WHITE][piece]
-            material[BLACK] += PIECE_VALUES[piece] * pieceCount[BLACK][piece]
+            material[WHITE] += CRAZY_PIECE_VALUES[piece] * holding[WHITE][piece]
+            material[BLACK] += CRAZY_PIECE_VALUES[piece] * holding[BLACK][piece]
 
-    phase = max(1, 8 - (material[WHITE] + material[BLACK]) // 1150)
+    matTotal = material[WHITE] + material[BLACK]
+    phase = max(1, 8 - matTotal // 1150)
 
     # If both sides are equal, we don't need to compute anything!
     if material[BLACK] == material[WHITE]:
         return 0, phase
 
-    matTotal = sum(material)
-
     # Who is leading the game, material-wise?
     if material[color] > material[opcolor]:
         leading = color
@@ -163,7 +134,6 @@ def evalKingTropism(board, color, phase):
     """ All other things being equal, having your Knights, Queens and Rooks
         close to the opponent's king is a good thing """
     _tropisms = tropisms
-    _lsb = lsb
     opcolor = 1 - color
     pieces = board.boards[color]
 
@@ -177,7 +147,7 @@ def evalKingTropism(board, color, phase):
         # inlined iterBits()
         while bitboard:
             bit = bitboard & -bitboard
-            score += tropism[_lsb[bit]][opking]
+            score += tropism[64 - bit.bit_length()][opking]
             bitboard -= bit
     return score
 
@@ -185,43 +155,74 @@ def evalKingTropism(board, color, phase):
 # evalPawnStructure                                                            #
 ################################################################################
 
-# For pawn hash, don't use buckets. Store:
-# key         high 16 bits of pawn hash key
-# score       score from white's point of view
-# passed      bitboard of passed pawns
-# weaked      bitboard of weak pawns
-pawnEntryType = Struct('=H h Q Q')
-PAWN_HASH_SIZE = 16384
-PAWN_PHASE_KEY = (0x343d, 0x055d, 0x3d3c, 0x1a1c, 0x28aa, 0x19ee, 0x1538,
-                  0x2a99)
-pawntable = create_string_buffer(PAWN_HASH_SIZE * pawnEntryType.size)
+# The pawn structure and king shelter terms are remembered in a PawnTable,
+# which can be replaced by a bigger one, or one in shared memory.
+PAWN_TABLE_SIZE = 1 << 20
+pawnTable = PawnTable(PAWN_TABLE_SIZE)
+
+
+def setPawnTable(table):
+    global pawnTable
+    pawnTable = table
+
+
+def setPawnTableSize(size):
+    """ Replaces the pawn table with an empty one of size bytes """
+    setPawnTable(PawnTable(size))
 
 
 def clearPawnTable():
-    memset(pawntable, 0, PAWN_HASH_SIZE * pawnEntryType.size)
+    pawnTable.clear()
 
 
 def probePawns(board, phase):
-    index = (board.pawnhash % PAWN_HASH_SIZE) ^ PAWN_PHASE_KEY[phase - 1]
-    key, score, passed, weaked = pawnEntryType.unpack_from(pawntable, index *
-                                                           pawnEntryType.size)
-    if key == (board.pawnhash >> 14) & 0xffff:
-        return score, passed, weaked
-    return None
+    return pawnTable.probe(board.pawnhash, phase)
 
 
-def recordPawns(board, phase, score, passed, weaked):
-    index = (board.pawnhash % PAWN_HASH_SIZE) ^ PAWN_PHASE_KEY[phase - 1]
-    key = (board.pawnhash >> 14) & 0xffff
-    pawnEntryType.pack_into(pawntable, index * pawnEntryType.size, key, score,
-                            passed, weaked)
+def recordPawns(board, phase, score, passed, weaked, shelters):
+    pawnTable.record(board.pawnhash, phase, score, passed, weaked, shelters)
+
+
+def kingShelter(pawns, color, kingside):
+    """ The score of the pawns in front of a king castled on kingside """
+    if color == WHITE:
+        wall1 = frontWall[color][G1 if kingside else B1]
+        wall2 = wall1 >> 8
+    else:
+        wall1 = frontWall[color][G8 if kingside else B8]
+        wall2 = wall1 << 8
+
+    total_in_front = bitCount(wall1 | wall2 & pawns)
+    numbermod = (0, 3, 6, 9, 7, 5, 3)[total_in_front]
+
+    s = bitCount(wall1 & pawns) * 2 + bitCount(wall2 & pawns)
+    return (s * numbermod * 5) // 6
+
+
+def pawnEntry(board, phase):
+    """ Returns the pawn score, passed and weak pawns, and the king shelters
+        (packed as in the PawnTable), from the pawn table, or else computed
+        and recorded there """
+    entry = pawnTable.probe(board.pawnhash, phase)
+    if entry is None:
+        score, passed, weaked = _pawnInfo(board, phase)
+        wpawns = board.boards[WHITE][PAWN]
+        bpawns = board.boards[BLACK][PAWN]
+        shelters = kingShelter(wpawns, WHITE, False) | \
+            kingShelter(wpawns, WHITE, True) << 8 | \
+            kingShelter(bpawns, BLACK, False) << 16 | \
+            kingShelter(bpawns, BLACK, True) << 24
+        recordPawns(board, phase, score, passed, weaked, shelters)
+        entry = score, passed, weaked, shelters
+    return entry
 
 
 def cacheablePawnInfo(board, phase):
-    entry = probePawns(board, phase)
-    if entry:
-        return entry
+    score, passed, weaked, shelters = pawnEntry(board, phase)
+    return score, passed, weaked
+
 
+def _pawnInfo(board, phase):
     score = 0
     passed = 0
     weaked = 0
@@ -256,24 +257,24 @@ def cacheablePawnInfo(board, phase):
 
             if not (passedPawnMask[opcolor][i] & ~fileBits[cord & 7] & pawns) and\
                     board.arBoard[i] != PAWN:
-                n1 = bin(pawns & moveArray[opptype][i]).count("1")
-                n2 = bin(oppawns & moveArray[ptype][i]).count("1")
+                n1 = bitCount(pawns & moveArray[opptype][i])
+                n2 = bitCount(oppawns & moveArray[ptype][i])
                 if n1 < n2:
                     backward = True
 
             if not backward and bitPosArray[cord] & brank7[opcolor]:
                 i = i + (color == WHITE and 8 or -8)
                 if not (passedPawnMask[opcolor][i] & ~fileBits[1] & pawns):
-                    n1 = bin(pawns & moveArray[opptype][i]).count("1")
-                    n2 = bin(oppawns & moveArray[ptype][i]).count("1")
+                    n1 = bitCount(pawns & moveArray[opptype][i])
+                    n2 = bitCount(oppawns & moveArray[ptype][i])
                     if n1 < n2:
                         backward = True
 
                 if not backward and bitPosArray[cord] & brank7[opcolor]:
                     i = i + (color == WHITE and 8 or -8)
                     if not (passedPawnMask[opcolor][i] & ~fileBits[1] & pawns):
-                        n1 = bin(pawns & moveArray[opptype][i]).count("1")
-                        n2 = bin(oppawns & moveArray[ptype][i]).count("1")
+                        n1 = bitCount(pawns & moveArray[opptype][i])
+                        n2 = bitCount(oppawns & moveArray[ptype][i])
                         if n1 < n2:
                             backward = True
 
@@ -313,13 +314,12 @@ def cacheablePawnInfo(board, phase):
             score += 10
 
         # Penalize Locked pawns
-        n = bin((pawns >> 8) & oppawns & lbox).count("1")
+        n = bitCount((pawns >> 8) & oppawns & lbox)
         score -= n * 10
 
         # Switch point of view when switching colors
         score = -score
 
-    recordPawns(board, phase, score, passed, weaked)
     return score, passed, weaked
 
 
@@ -428,7 +428,7 @@ def evalDoubleQR7(board, color, phase):
     boards = board.boards[color]
     opboards = board.boards[opcolor]
 
-    if bin((boards[QUEEN] | boards[ROOK]) & brank7[color]).count("1") >= 2 and \
+    if bitCount((boards[QUEEN] | boards[ROOK]) & brank7[color]) >= 2 and \
             (opboards[KING] & brank8[color] or opboards[PAWN] & brank7[color]):
             return 30
 
@@ -463,25 +463,8 @@ def evalKing(board, color, phase):
 
     # else if castled, prefer having some pawns in front
     elif FILE(king) not in (3, 4) and RANK(king) in (0, 8):
-        if color == WHITE:
-            if FILE(king) < 3:
-                wall1 = frontWall[color][B1]
-            else:
-                wall1 = frontWall[color][G1]
-            wall2 = wall1 >> 8
-        else:
-            if FILE(king) < 3:
-                wall1 = frontWall[color][B8]
-            else:
-                wall1 = frontWall[color][G8]
-            wall2 = wall1 << 8
-
-        pawns = board.boards[color][PAWN]
-        total_in_front = bin(wall1 | wall2 & pawns).count("1")
-        numbermod = (0, 3, 6, 9, 7, 5, 3)[total_in_front]
-
-        s = bin(wall1 & pawns).count("1") * 2 + bin(wall2 & pawns).count("1")
-        return (s * numbermod * 5) // 6
+        shelters = pawnEntry(board, phase)[3]
+        return shelters >> (color * 16 + (FILE(king) > 4) * 8) & 0xff
 
     return 0
 
@@ -549,10 +532,10 @@ def evalBishops(board, color, phase):
     if board.pieceCount[color][BISHOP] == 1:
         squareMask = WHITE_SQUARES if (bishops &
                                        WHITE_SQUARES) else BLACK_SQUARES
-        score = - bin(pawns & squareMask).count("1") \
-                - bin(oppawns & squareMask).count("1") // 2
+        score = - bitCount(pawns & squareMask) \
+                - bitCount(oppawns & squareMask) // 2
         if phase > 6:
-            score += bin(board.friends[1 - color] & squareMask).count("1")
+            score += bitCount(board.friends[1 - color] & squareMask)
 
     return score
 
@@ -1,9 +1,9 @@
 from __future__ import absolute_import
 
-from .bitboard import bitPosArray, iterBits, clearBit, firstBit
+from .bitboard import bitPosArray, iterBits, clearBit, firstBit, bitCount
 from .attack import isAttacked, pinnedOnKing, getAttacks
 from .ldata import fromToRay, moveArray, directions, fileBits, rankBits,\
-    ray45, attack45, ray135, attack135, ray90, attack90, ray00, attack00, FILE, rays
+    rookMask, rookAttacks, bishopMask, bishopAttacks, FILE, rays
 from pychess.Utils.const import EMPTY, PAWN,\
     QUEEN, KNIGHT, BISHOP, ROOK, KING, WHITE, BLACK,\
     SITTUYINCHESS, FISCHERRANDOMCHESS, SUICIDECHESS, CAMBODIANCHESS,\
@@ -118,11 +118,7 @@ def genPieceMoves(board, piece, tcord):
         else:
             blocker = board.blocker
             for fcord in iterBits(bishops):
-                try:
-                    attackBoard = attack45[fcord][ray45[fcord] & blocker] | \
-                        attack135[fcord][ray135[fcord] & blocker]
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = bishopAttacks[fcord][blocker & bishopMask[fcord]]
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
             return moves
@@ -131,11 +127,7 @@ def genPieceMoves(board, piece, tcord):
         blocker = board.blocker
         rooks = board.boards[board.color][ROOK]
         for fcord in iterBits(rooks):
-            try:
-                attackBoard = attack00[fcord][ray00[fcord] & blocker] | \
-                    attack90[fcord][ray90[fcord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[fcord][blocker & rookMask[fcord]]
             if tcord in iterBits(attackBoard & notfriends):
                 moves.add(newMove(fcord, tcord))
         return moves
@@ -160,19 +152,11 @@ def genPieceMoves(board, piece, tcord):
         else:
             blocker = board.blocker
             for fcord in iterBits(queens):
-                try:
-                    attackBoard = attack45[fcord][ray45[fcord] & blocker] | \
-                        attack135[fcord][ray135[fcord] & blocker]
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = bishopAttacks[fcord][blocker & bishopMask[fcord]]
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
 
-                try:
-                    attackBoard = attack00[fcord][ray00[fcord] & blocker] | \
-                        attack90[fcord][ray90[fcord] & blocker]
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = rookAttacks[fcord][blocker & rookMask[fcord]]
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
             return moves
@@ -238,11 +222,7 @@ def genAllMoves(board, drops=True):
     if board.variant in ASEAN_VARIANTS:
         # Rooks
         for cord in iterBits(rooks):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMask[cord]]
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
@@ -262,21 +242,13 @@ def genAllMoves(board, drops=True):
     else:
         # Rooks and Queens
         for cord in iterBits(rooks | queens):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMask[cord]]
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
     # Bishops and Queens
         for cord in iterBits(bishops | queens):
-            try:
-                attackBoard = attack45[cord][ray45[cord] & blocker] | \
-                    attack135[cord][ray135[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = bishopAttacks[cord][blocker & bishopMask[cord]]
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
@@ -459,20 +431,12 @@ def genCaptures(board):
     # Rooks and Queens
     if board.variant in ASEAN_VARIANTS:
         for cord in iterBits(rooks):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMask[cord]]
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
     else:
         for cord in iterBits(rooks | queens):
-            try:
-                attackBoard = attack00[cord][ray00[cord] & blocker] | \
-                    attack90[cord][ray90[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks[cord][blocker & rookMask[cord]]
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
 
@@ -489,11 +453,7 @@ def genCaptures(board):
                 yield newMove(cord, c)
     else:
         for cord in iterBits(bishops | queens):
-            try:
-                attackBoard = attack45[cord][ray45[cord] & blocker] | \
-                    attack135[cord][ray135[cord] & blocker]
-            except KeyError:
-                attackBoard = 0
+            attackBoard = bishopAttacks[cord][blocker & bishopMask[cord]]
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
 
@@ -579,7 +539,7 @@ def genCheckEvasions(board):
     checkers = getAttacks(board, kcord, opcolor)
 
     arBoard = board.arBoard
-    if bin(checkers).count("1") == 1:
+    if bitCount(checkers) == 1:
 
         PROMOTIONS = variants[board.variant].PROMOTIONS
         if board.variant == SITTUYINCHESS and board.boards[board.color][QUEEN]:
@@ -690,3 +650,76 @@ def genDrops(board):
                         if cord >= 56 or cord <= 7:
                             continue
                     yield newMove(piece, cord, DROP)
+
+
+################################################################################
+#   Generate legal moves                                                       #
+################################################################################
+
+# Variants where a move leaving the king attacked isn't simply illegal
+NO_LEGAL_VARIANTS = (ATOMICCHESS, SUICIDECHESS, SITTUYINCHESS)
+
+
+def genLegalMoves(board):
+    """ Generates the moves of genAllMoves which don't leave the king in
+        check, like filtering them with applyMove and opIsChecked. The checks
+        and pins are found once for the position, so only castling and en
+        passant moves have to be made to be tested. """
+
+    color = board.color
+    if board.variant in NO_LEGAL_VARIANTS or not board.boards[color][KING]:
+        for move in genAllMoves(board):
+            board.applyMove(move)
+            if not board.opIsChecked():
+                board.popMove()
+                yield move
+            else:
+                board.popMove()
+        return
+
+    opcolor = 1 - color
+    kcord = board.kings[color]
+
+    # Destinations resolving a check: capturing the checker or blocking it
+    checkers = getAttacks(board, kcord, opcolor)
+    if not checkers:
+        evasions = ~0
+        blocks = ~0
+    elif checkers & (checkers - 1):
+        evasions = blocks = 0
+    else:
+        chkcord = firstBit(checkers)
+        blocks = clearBit(fromToRay[kcord][chkcord], chkcord)
+        evasions = blocks | checkers
+
+    # Pinned pieces can only move along the ray of the pin
+    pins = {}
+    for cord in iterBits(moveArray[QUEEN][kcord] & board.friends[color]):
+        if pinnedOnKing(board, cord, color):
+            pins[cord] = rays[kcord][directions[kcord][cord]]
+
+    kingbit = bitPosArray[kcord]
+    for move in genAllMoves(board):
+        flag = move >> 12
+        fcord = (move >> 6) & 63
+        tcord = move & 63
+        if flag == DROP:
+            if bitPosArray[tcord] & blocks:
+                yield move
+        elif flag in (QUEEN_CASTLE, KING_CASTLE, ENPASSANT):
+            board.applyMove(move)
+            if not board.opIsChecked():
+                board.popMove()
+                yield move
+            else:
+                board.popMove()
+        elif fcord == kcord:
+            # The king mustn't stay in the line of a slider checking it
+            board.blocker ^= kingbit
+            attacked = isAttacked(board, tcord, opcolor)
+            board.blocker ^= kingbit
+            if not attacked:
+                yield move
+        elif bitPosArray[tcord] & evasions and \
+                (fcord not in pins or bitPosArray[tcord] & pins[fcord]):
+            yield move
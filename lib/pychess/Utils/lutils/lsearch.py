@@ -3,14 +3,16 @@ from time import time
 from random import random
 from heapq import heappush, heappop
 
-from .lmovegen import genAllMoves, genCheckEvasions, genCaptures
+from .bitboard import bitCount
+from .lmovegen import genAllMoves, genCheckEvasions, genCaptures, newMove
 from .egtb_gaviota import EgtbGaviota
 from pychess.Utils.const import ATOMICCHESS, KINGOFTHEHILLCHESS, THREECHECKCHESS,\
     DROP_VARIANTS, LOSERSCHESS, SUICIDECHESS, EMPTY, PROMOTIONS, DROP, KING,\
-    hashfALPHA, hashfBETA, hashfEXACT, hashfBAD
+    PAWN, NULL_MOVE, ENPASSANT, hashfALPHA, hashfBETA, hashfEXACT, hashfBAD, \
+    WHITE, DRAW, WHITEWON
 from .leval import evaluateComplete
-from .lsort import getCaptureValue, getMoveValue
-from .ldata import MATE_VALUE, VALUE_AT_PLY
+from .lsort import getCaptureValue, getMoveValue, pickMoves
+from .ldata import MATE_VALUE, MAXPLY, VALUE_AT_PLY, PAWN_VALUE
 from .TranspositionTable import TranspositionTable
 from pychess.Variants.atomic import kingExplode
 from pychess.Variants.kingofthehill import testKingInCenter
@@ -19,7 +21,8 @@ from . import ldraw
 
 TIMECHECK_FREQ = 500
 
-table = TranspositionTable(32 * 1024 * 1024)
+tableClass = TranspositionTable
+table = tableClass(32 * 1024 * 1024)
 skipPruneChance = 0
 searching = False
 nodes = 0
@@ -27,23 +30,162 @@ endtime = 0
 timecheck_counter = TIMECHECK_FREQ
 egtb = None
 
+# Pruning and reductions. Null move pruning assumes that passing is never
+# better than the best move, which doesn't hold where zugzwang is common or
+# captures are compulsory, and the drop variants' positions are rarely quiet
+# enough for it. Futility pruning relies on a mostly material evaluation.
+NULLMOVE_REDUCTION = 2
+NO_NULLMOVE_VARIANTS = (LOSERSCHESS, SUICIDECHESS, ATOMICCHESS) + DROP_VARIANTS
+FUTILITY_MARGINS = (0, 2 * PAWN_VALUE, 5 * PAWN_VALUE)
+NO_FUTILITY_VARIANTS = (LOSERSCHESS, SUICIDECHESS, ATOMICCHESS)
+# Quiet moves sorted after the first LMR_MOVES are searched one ply shallower
+LMR_MOVES = 3
+LMR_DEPTH = 3
+NO_LMR_VARIANTS = (LOSERSCHESS, SUICIDECHESS)
+
+# Half widths of the aspiration windows tried around the score of the previous
+# iteration. Each fail-low or fail-high widens that side to the next stage,
+# and after the last stage to the full window.
+ASPIRATION_WINDOWS = (35, 150, 600)
+ASPIRATION_DEPTH = 4
+
+# Triangular principal variation table. pvTable[ply][ply:pvLength[ply]] is the
+# best line found so far from the node at ply. The rows are reused for the
+# whole search, so finding a new best move only copies the line of the child
+# into its parent's row, instead of building new lists up the tree.
+# Quiescence search can go far beyond the nominal depth, so we stop it at
+# MAX_SEARCH_PLY.
+MAX_SEARCH_PLY = MAXPLY * 4
+pvTable = [[0] * MAX_SEARCH_PLY for ply in range(MAX_SEARCH_PLY)]
+pvLength = [0] * MAX_SEARCH_PLY
+
+# Below the root, the end game tables are only asked whether the position is
+# won, drawn or lost, which is cheaper than the distance to mate. A win scores
+# less than any mate found by the search, and more than any evaluation.
+TB_WIN_VALUE = 32512 - MAX_SEARCH_PLY
+
+
+class SearchStats(object):
+    """ Counters of a search, from one reset() to the next. Nodes are counted
+        as in lsearch.nodes. The table collisions are stores that had to
+        replace an entry of another position. """
 
-def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.qnodes = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttCutoffs = 0
+        self.ttCollisions = 0
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.egtbProbes = 0
+        self.egtbHits = 0
+        # (depth, nodes, seconds) of every finished iteration
+        self.iterations = []
+        self._collisionsStart = table.collisions
+        self._collisionsMerged = 0
+
+    def update(self):
+        """ Collects the counters kept outside of the search functions """
+        self.ttCollisions = self._collisionsMerged + \
+            table.collisions - self._collisionsStart
+
+    def addIteration(self, depth, nodes, seconds):
+        self.iterations.append((depth, nodes, seconds))
+
+    def merge(self, counters):
+        """ Adds the counters of an asDict() result from another process """
+        for key in ("qnodes", "ttProbes", "ttHits", "ttCutoffs",
+                    "cutoffs", "firstMoveCutoffs", "egtbProbes", "egtbHits"):
+            setattr(self, key, getattr(self, key) + counters[key])
+        self._collisionsMerged += counters["ttCollisions"]
+
+    @property
+    def nodes(self):
+        return sum(iteration[1] for iteration in self.iterations)
+
+    @property
+    def firstMoveCutoffRate(self):
+        """ How often a fail high happened on the first move searched """
+        if not self.cutoffs:
+            return 0.
+        return self.firstMoveCutoffs / float(self.cutoffs)
+
+    @property
+    def branchingFactor(self):
+        """ The effective branching factor of the last two iterations """
+        if len(self.iterations) < 2 or not self.iterations[-2][1]:
+            return 0.
+        return self.iterations[-1][1] / float(self.iterations[-2][1])
+
+    def asDict(self):
+        self.update()
+        return {"nodes": self.nodes,
+                "qnodes": self.qnodes,
+                "ttProbes": self.ttProbes,
+                "ttHits": self.ttHits,
+                "ttCutoffs": self.ttCutoffs,
+                "ttCollisions": self.ttCollisions,
+                "cutoffs": self.cutoffs,
+                "firstMoveCutoffs": self.firstMoveCutoffs,
+                "firstMoveCutoffRate": self.firstMoveCutoffRate,
+                "egtbProbes": self.egtbProbes,
+                "egtbHits": self.egtbHits,
+                "iterations": list(self.iterations),
+                "branchingFactor": self.branchingFactor}
+
+    def __str__(self):
+        self.update()
+        return "nodes %d qnodes %d tthits %d/%d ttcuts %d ttcollisions %d " \
+            "fhf %.2f egtb %d/%d ebf %.2f" % (
+                self.nodes, self.qnodes, self.ttHits, self.ttProbes,
+                self.ttCutoffs, self.ttCollisions, self.firstMoveCutoffRate,
+                self.egtbHits, self.egtbProbes, self.branchingFactor)
+
+
+stats = SearchStats()
+
+
+def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE):
     """ This is a alphabeta/negamax/quiescent/iterativedeepend search algorithm
         Based on moves found by the validator.py findmoves2 function and
         evaluated by eval.py.
-        The function recalls itself "depth" times. If the last move in range
-        depth was a capture, it will continue calling itself, only searching for
-        captures.
         It returns a tuple of
         *   a list of the path it found through the search tree (last item being
             the deepest)
         *   a score of your standing the the last possition. """
 
+    score = search(board, depth, alpha, beta, 0)
+    return pvTable[0][:pvLength[0]], score
+
+
+def updatePV(ply, move):
+    """ Makes move, followed by the line of the child node, the best line at
+        ply """
+    row = pvTable[ply]
+    row[ply] = move
+    length = pvLength[ply + 1]
+    if length > ply + 1:
+        row[ply + 1:length] = pvTable[ply + 1][ply + 1:length]
+        pvLength[ply] = length
+    else:
+        pvLength[ply] = ply + 1
+
+
+def search(board, depth, alpha, beta, ply):
+    """ The recursion of alphaBeta. Returns the score, and leaves the
+        principal variation in pvTable[ply]. The function recalls itself
+        "depth" times. If the last move in range depth was a capture, it will
+        continue calling quiescent, only searching for captures. """
+
     global searching, nodes, table, endtime, timecheck_counter
     foundPv = False
     hashf = hashfALPHA
-    amove = []
+    bestMove = None
+    pvLength[ply] = ply
 
     ############################################################################
     # Mate distance pruning
@@ -53,30 +195,32 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     MATE_IN_1 = MATE_VALUE - ply - 1
 
     if beta <= MATED:
-        return [], MATED
+        return MATED
     if beta >= MATE_IN_1:
         beta = MATE_IN_1
         if alpha >= beta:
-            return [], MATE_IN_1
+            return MATE_IN_1
 
     if board.variant == ATOMICCHESS:
-        if bin(board.boards[board.color][KING]).count("1") == 0:
-            return [], MATED
+        if bitCount(board.boards[board.color][KING]) == 0:
+            return MATED
     elif board.variant == KINGOFTHEHILLCHESS:
         if testKingInCenter(board):
-            return [], MATED
+            return MATED
     elif board.variant == THREECHECKCHESS:
         if checkCount(board) == 3:
-            return [], MATED
+            return MATED
 
     ############################################################################
     # Look in the end game table
     ############################################################################
 
     global egtb
-    if egtb:
+    if egtb and ply == 0:
+        stats.egtbProbes += 1
         tbhits = egtb.scoreAllMoves(board)
         if tbhits:
+            stats.egtbHits += 1
             move, state, steps = tbhits[0]
 
             if state == DRAW:
@@ -91,7 +235,19 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
                     score = -MATE_VALUE + steps
                 else:
                     score = MATE_VALUE - steps
-            return [move], score
+            pvTable[ply][ply] = move
+            pvLength[ply] = ply + 1
+            return score
+    elif egtb:
+        stats.egtbProbes += 1
+        state = egtb.scoreGame(board, omitDepth=True)[0]
+        if state is not None:
+            stats.egtbHits += 1
+            if state == DRAW:
+                return 0
+            if (state == WHITEWON) == (board.color == WHITE):
+                return TB_WIN_VALUE - ply
+            return -TB_WIN_VALUE + ply
 
     ###########################################################################
     # We don't save repetition in the table, so we need to test draw before   #
@@ -101,7 +257,7 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     # We don't adjudicate draws. Clients may have different rules for that.
     if ply > 0:
         if ldraw.test(board):
-            return [], 0
+            return 0
 
     ############################################################################
     # Look up transposition table                                              #
@@ -112,21 +268,29 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
             table.newSearch()
 
         table.setHashMove(depth, -1)
+        stats.ttProbes += 1
         probe = table.probe(board, depth, alpha, beta)
         if probe:
+            stats.ttHits += 1
             move, score, hashf = probe
             score = VALUE_AT_PLY(score, ply)
             table.setHashMove(depth, move)
 
             if hashf == hashfEXACT:
-                return [move], score
+                stats.ttCutoffs += 1
+                pvTable[ply][ply] = move
+                pvLength[ply] = ply + 1
+                return score
             elif hashf == hashfBETA:
                 beta = min(score, beta)
             elif hashf == hashfALPHA:
                 alpha = score
 
             if hashf != hashfBAD and alpha >= beta:
-                return [move], score
+                stats.ttCutoffs += 1
+                pvTable[ply][ply] = move
+                pvLength[ply] = ply + 1
+                return score
 
     ############################################################################
     # Cheking the time                                                         #
@@ -143,7 +307,7 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     ############################################################################
 
     if not searching:
-        return [], -evaluateComplete(board, 1 - board.color)
+        return -evaluateComplete(board, 1 - board.color)
 
     ############################################################################
     # Go for quiescent search                                                  #
@@ -156,10 +320,47 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
             # Being in check is that serious, that we want to take a deeper look
             depth += 1
         elif board.variant in (LOSERSCHESS, SUICIDECHESS, ATOMICCHESS):
-            return [], evaluateComplete(board, board.color)
+            return evaluateComplete(board, board.color)
         else:
-            mvs, val = quiescent(board, alpha, beta, ply)
-            return mvs, val
+            return quiescent(board, alpha, beta, ply)
+
+    ############################################################################
+    # Null move pruning                                                        #
+    ############################################################################
+
+    # If passing still fails high on a reduced search, so will a real move.
+    # The side to move needs some pieces, as pawn endings are full of zugzwang.
+    staticEval = None
+    pvNode = beta - alpha > 1
+    if not pvNode and ply > 0 and depth >= 2 and not isCheck and \
+            board.variant not in NO_NULLMOVE_VARIANTS and \
+            abs(beta) < MATE_VALUE - MAXPLY * 2 and \
+            board.hist[1] >> 12 != NULL_MOVE and \
+            board.friends[board.color] & ~(board.boards[board.color][PAWN] |
+                                           board.boards[board.color][KING]):
+        staticEval = evaluateComplete(board, board.color)
+        if staticEval >= beta:
+            board.applyMove(newMove(0, 0, NULL_MOVE))
+            reduction = NULLMOVE_REDUCTION + (depth > 6)
+            val = search(board, depth - 1 - reduction, -beta, -beta + 1,
+                         ply + 1)
+            board.popMove()
+            if -val >= beta and searching:
+                return beta
+
+    ############################################################################
+    # Futility pruning                                                         #
+    ############################################################################
+
+    # Near the leaves, don't search quiet moves that can't raise the static
+    # evaluation above alpha.
+    futile = False
+    if not pvNode and depth < len(FUTILITY_MARGINS) and not isCheck and \
+            board.variant not in NO_FUTILITY_VARIANTS and \
+            abs(alpha) < MATE_VALUE - MAXPLY * 2:
+        if staticEval is None:
+            staticEval = evaluateComplete(board, board.color)
+        futile = staticEval + FUTILITY_MARGINS[depth] <= alpha
 
     ############################################################################
     # Find and sort moves                                                      #
@@ -173,7 +374,8 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
             mlist = eva_cap if eva_cap else evasions
         if not mlist and not isCheck:
             mlist = [m for m in genAllMoves(board)]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
+        moves = sorted((-getMoveValue(board, table, depth, m), m)
+                       for m in mlist)
     elif board.variant == ATOMICCHESS:
         if isCheck:
             mlist = [m
@@ -183,19 +385,21 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
             mlist = [m
                      for m in genAllMoves(board)
                      if not kingExplode(board, m, board.color)]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
+        moves = sorted((-getMoveValue(board, table, depth, m), m)
+                       for m in mlist)
+    elif isCheck:
+        moves = sorted((-getMoveValue(board, table, depth, m), m)
+                       for m in genCheckEvasions(board))
     else:
-        if isCheck:
-            moves = [(-getMoveValue(board, table, depth, m), m)
-                     for m in genCheckEvasions(board)]
-        else:
-            moves = [(-getMoveValue(board, table, depth, m), m)
-                     for m in genAllMoves(board)]
-    moves.sort()
+        moves = pickMoves(board, table, depth)
 
     # This is needed on checkmate
     catchFailLow = None
 
+    canReduce = depth >= LMR_DEPTH and not isCheck and \
+        board.variant not in NO_LMR_VARIANTS
+    legalMoves = 0
+
     ############################################################################
     # Loop moves                                                               #
     ############################################################################
@@ -204,6 +408,11 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
 
         nodes += 1
 
+        # Captures, promotions and drops are never pruned nor reduced
+        flag = move >> 12
+        quiet = board.arBoard[move & 63] == EMPTY and flag != ENPASSANT and \
+            flag not in PROMOTIONS and flag != DROP
+
         board.applyMove(move)
         if not isCheck:
             if board.opIsChecked():
@@ -211,21 +420,34 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
                 continue
 
         catchFailLow = move
-
-        if foundPv:
-            mvs, val = alphaBeta(board, depth - 1, -alpha - 1, -alpha, ply + 1)
-            val = -val
+        legalMoves += 1
+
+        if futile and quiet and not board.isChecked():
+            board.popMove()
+            continue
+
+        reduction = 0
+        if canReduce and quiet and legalMoves > LMR_MOVES and \
+                not board.isChecked():
+            reduction = 1
+
+        if foundPv or reduction:
+            val = -search(board, depth - 1 - reduction, -alpha - 1, -alpha,
+                          ply + 1)
+            if reduction and val > alpha:
+                val = -search(board, depth - 1, -alpha - 1, -alpha, ply + 1)
             if val > alpha and val < beta:
-                mvs, val = alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
-                val = -val
+                val = -search(board, depth - 1, -beta, -alpha, ply + 1)
         else:
-            mvs, val = alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
-            val = -val
+            val = -search(board, depth - 1, -beta, -alpha, ply + 1)
 
         board.popMove()
 
         if val > alpha:
             if val >= beta:
+                stats.cutoffs += 1
+                if legalMoves == 1:
+                    stats.firstMoveCutoffs += 1
                 if searching and move >> 12 != DROP:
                     table.record(board, move, VALUE_AT_PLY(beta, -ply),
                                  hashfBETA, depth)
@@ -235,10 +457,12 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
                             not move >> 12 in PROMOTIONS:
                         table.addKiller(depth, move)
                         table.addButterfly(move, depth)
-                return [move] + mvs, beta
+                updatePV(ply, move)
+                return beta
 
             alpha = val
-            amove = [move] + mvs
+            bestMove = move
+            updatePV(ply, move)
             hashf = hashfEXACT
             foundPv = True
 
@@ -246,36 +470,104 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     # Return                                                                   #
     ############################################################################
 
-    if amove:
+    if foundPv:
         if searching:
-            table.record(board, amove[0], VALUE_AT_PLY(alpha, -ply), hashf,
+            table.record(board, bestMove, VALUE_AT_PLY(alpha, -ply), hashf,
                          depth)
-            if board.arBoard[amove[0] & 63] == EMPTY:
-                table.addKiller(depth, amove[0])
-        return amove, alpha
+            if board.arBoard[bestMove & 63] == EMPTY:
+                table.addKiller(depth, bestMove)
+        return alpha
 
     if catchFailLow:
         if searching:
             table.record(board, catchFailLow, VALUE_AT_PLY(alpha, -ply), hashf,
                          depth)
-        return [catchFailLow], alpha
+        pvTable[ply][ply] = catchFailLow
+        pvLength[ply] = ply + 1
+        return alpha
 
     # If no moves were found, this must be a mate or stalemate
     if isCheck:
-        return [], MATED
+        return MATED
+
+    return 0
+
+
+def aspirationSearch(board, depth, score=0):
+    """ Searches board to depth, like alphaBeta, but with a narrow window
+        around score, which should be the result of the previous iteration.
+        The window is widened and the search repeated, until the result falls
+        inside it. The principal variation is completed from the table. """
+
+    start = time()
+    startNodes = nodes
+
+    if depth < ASPIRATION_DEPTH or abs(score) >= MATE_VALUE - MAXPLY * 2:
+        mvs, val = alphaBeta(board, depth)
+    else:
+        low = high = 0
+        stages = len(ASPIRATION_WINDOWS)
+        while True:
+            alpha = -MATE_VALUE if low == stages else \
+                score - ASPIRATION_WINDOWS[low]
+            beta = MATE_VALUE if high == stages else \
+                score + ASPIRATION_WINDOWS[high]
+            mvs, val = alphaBeta(board, depth, alpha, beta)
+            if not searching:
+                return mvs, val
+            if val <= alpha and low < stages:
+                low += 1
+            elif val >= beta and high < stages:
+                high += 1
+            else:
+                break
+
+    if searching:
+        stats.addIteration(depth, nodes - startNodes, time() - start)
+    return extendPV(board, mvs), val
 
-    return [], 0
+
+def extendPV(board, mvs):
+    """ The search returns only the first move, when it finds a position in
+        the table. Follow the exact table entries from the end of mvs to
+        recover the rest of the principal variation. """
+
+    if board.variant in DROP_VARIANTS:
+        return mvs
+
+    pv = list(mvs)
+    for move in pv:
+        board.applyMove(move)
+    seen = set()
+    while len(pv) < MAXPLY and board.hash not in seen:
+        seen.add(board.hash)
+        move = table.probePV(board)
+        if move is None or move not in genAllMoves(board):
+            break
+        board.applyMove(move)
+        if board.opIsChecked():
+            board.popMove()
+            break
+        pv.append(move)
+    for move in pv:
+        board.popMove()
+    return pv
 
 
 def quiescent(board, alpha, beta, ply):
 
+    pvLength[ply] = ply
+
     if skipPruneChance and random() < skipPruneChance:
-        return [], (alpha + beta) // 2
+        return (alpha + beta) // 2
 
     global nodes
 
     if ldraw.test(board):
-        return [], 0
+        return 0
+
+    if ply >= MAX_SEARCH_PLY - 1:
+        return evaluateComplete(board, board.color)
 
     isCheck = board.isChecked()
 
@@ -283,12 +575,10 @@ def quiescent(board, alpha, beta, ply):
     if not isCheck:
         value = evaluateComplete(board, board.color)
         if value >= beta:
-            return [], beta
+            return beta
         if value > alpha:
             alpha = value
 
-    amove = []
-
     heap = []
 
     if isCheck:
@@ -298,7 +588,7 @@ def quiescent(board, alpha, beta, ply):
             # Heap.append is fine, as we don't really do sorting on the few moves
             heap.append((0, move))
         if not someMove:
-            return [], -MATE_VALUE + ply
+            return -MATE_VALUE + ply
     else:
         for move in genCaptures(board):
             heappush(heap, (-getCaptureValue(board, move), move))
@@ -306,6 +596,7 @@ def quiescent(board, alpha, beta, ply):
     while heap:
 
         nodes += 1
+        stats.qnodes += 1
 
         v, move = heappop(heap)
 
@@ -315,23 +606,19 @@ def quiescent(board, alpha, beta, ply):
                 board.popMove()
                 continue
 
-        mvs, val = quiescent(board, -beta, -alpha, ply + 1)
-        val = -val
+        val = -quiescent(board, -beta, -alpha, ply + 1)
 
         board.popMove()
 
         if val >= beta:
-            return [move] + mvs, beta
+            updatePV(ply, move)
+            return beta
 
         if val > alpha:
             alpha = val
-            amove = [move] + mvs
+            updatePV(ply, move)
 
-    if amove:
-        return amove, alpha
-
-    else:
-        return [], alpha
+    return alpha
 
 
 class EndgameTable():
@@ -339,7 +626,16 @@ class EndgameTable():
         self.provider = EgtbGaviota()
 
     def _pieceCounts(self, board):
-        return sorted([bin(board.friends[i]).count("1") for i in range(2)])
+        return sorted([bitCount(board.friends[i]) for i in range(2)])
+
+    def scoreGame(self, lBoard, omitDepth=False, probeSoft=False):
+        """ Return the result and depth to mate of the position, or
+            (None, None) when it isn't in the tables """
+
+        pc = self._pieceCounts(lBoard)
+        if self.provider.supports(pc):
+            return self.provider.scoreGame(lBoard, omitDepth, probeSoft)
+        return None, None
 
     def scoreAllMoves(self, lBoard):
         """ Return each move's result and depth to mate.
@@ -355,6 +651,28 @@ class EndgameTable():
             return self.provider.scoreAllMoves(lBoard)
         return []
 
+    def getStats(self):
+        return self.provider.getStats()
+
+    def resetStats(self):
+        self.provider.resetStats()
+
+
+def setHashSize(size):
+    """ Replaces the transposition table with an empty one of size bytes """
+    global table
+    table = tableClass(size)
+
+
+def setTableClass(cls):
+    """ Selects the transposition table implementation (TranspositionTable or
+        NumpyTranspositionTable) and replaces the table with an empty one of
+        the same size. TranspositionTable is the default, as it is the faster
+        of the two in pure Python. """
+    global tableClass
+    tableClass = cls
+    setHashSize(table.size)
+
 
 def enableEGTB():
     global egtb
@@ -0,0 +1,203 @@
+from __future__ import absolute_import
+
+# Lazy SMP: several processes search the same root position with the ordinary
+# alphaBeta, each one at slightly different depths, while sharing a single
+# transposition table and pawn table. The helpers mostly fill the table with
+# useful entries for each other, and the best move is taken from the deepest
+# finished search.
+
+import atexit
+import multiprocessing
+import os
+import sys
+from threading import Thread
+from time import sleep, time
+
+from pychess.compat import Empty
+from . import leval, lsearch
+from .PawnTable import PawnTable
+
+# How often (in seconds) the main process looks at the clock and at
+# lsearch.searching while waiting for results from the workers.
+POLL_INTERVAL = 0.02
+
+# Depth skipping pattern of the helper processes (as used in Stockfish).
+# Helper i skips depth d if ((d + SKIP_PHASE[i]) // SKIP_SIZE[i]) % 2 is odd.
+SKIP_SIZE = (1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4)
+SKIP_PHASE = (0, 1, 0, 1, 2, 3, 0, 1, 2, 3, 4, 5, 0, 1, 2, 3, 4, 5, 6, 7)
+
+# The workers are not forked from the engine. It searches on a thread of its
+# own while its main thread waits for input in raw_input, holding the lock of
+# sys.stdin, and a forked child would wait for that lock forever when it
+# closes its stdin. A fork server, started once with the search modules
+# loaded, forks them from a single thread instead. Where there is none, they
+# are spawned, which takes longer.
+try:
+    multiprocessing.get_context
+except AttributeError:
+    # Python 2
+    context = multiprocessing
+else:
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context("spawn")
+
+# Result messages sent from the workers to the main process
+ITERATION, EXITED = range(2)
+
+sharedTable = None
+sharedPawnTable = None
+
+
+def getSharedTable():
+    """ The shared table is created once, with the size of lsearch.table, and
+        kept between searches, so it stays warm from move to move. It is only
+        recreated when the hash size or implementation has been changed. """
+    global sharedTable
+    if sharedTable is None or sharedTable.size != lsearch.table.size or \
+            type(sharedTable) is not lsearch.tableClass:
+        closeSharedTable()
+        sharedTable = lsearch.tableClass(lsearch.table.size,
+                                         "pychess-tt-%d" % os.getpid())
+    return sharedTable
+
+
+def getSharedPawnTable():
+    """ Like getSharedTable, for the pawn table of leval """
+    global sharedPawnTable
+    if sharedPawnTable is None or \
+            sharedPawnTable.size != leval.pawnTable.size:
+        closeSharedPawnTable()
+        sharedPawnTable = PawnTable(leval.pawnTable.size,
+                                    "pychess-pawns-%d" % os.getpid())
+    return sharedPawnTable
+
+
+@atexit.register
+def closeSharedTable():
+    global sharedTable
+    if sharedTable is not None:
+        sharedTable.close()
+        sharedTable = None
+
+
+@atexit.register
+def closeSharedPawnTable():
+    global sharedPawnTable
+    if sharedPawnTable is not None:
+        sharedPawnTable.close()
+        sharedPawnTable = None
+
+
+def skipDepth(wid, depth):
+    if wid == 0:
+        return False
+    i = (wid - 1) % len(SKIP_SIZE)
+    return ((depth + SKIP_PHASE[i]) // SKIP_SIZE[i]) % 2 == 1
+
+
+def _watchStop(stop):
+    # Polling is_set() rather than blocking in stop.wait(), as a process
+    # exiting while it waits on the event would make stop.set() hang.
+    while not stop.is_set():
+        sleep(POLL_INTERVAL)
+    lsearch.searching = False
+
+
+def _worker(wid, board, maxdepth, table, pawnTable, skipPruneChance, results,
+            stop):
+    cls, name = table
+    lsearch.tableClass = cls
+    lsearch.table = cls(0, name, create=False)
+    leval.setPawnTable(PawnTable(0, pawnTable, create=False))
+    lsearch.skipPruneChance = skipPruneChance
+    lsearch.endtime = sys.maxsize
+    lsearch.searching = True
+    lsearch.nodes = 0
+    lsearch.stats.reset()
+
+    # The main process owns the clock. We only have to notice when it
+    # tells us to stop.
+    watcher = Thread(target=_watchStop, args=(stop, ))
+    watcher.daemon = True
+    watcher.start()
+
+    reported = 0
+    score = 0
+    for depth in range(1, maxdepth + 1):
+        if skipDepth(wid, depth):
+            continue
+        lsearch.timecheck_counter = lsearch.TIMECHECK_FREQ
+        mvs, score = lsearch.aspirationSearch(board, depth, score)
+        if not lsearch.searching:
+            break
+        results.put((ITERATION, wid, depth, score, mvs,
+                     lsearch.nodes - reported))
+        reported = lsearch.nodes
+
+    counters = lsearch.stats.asDict()
+    lsearch.table.close()
+    leval.pawnTable.close()
+    results.put((EXITED, wid, 0, 0, counters, lsearch.nodes - reported))
+
+
+def search(board, maxdepth, cores, skipPruneChance=0, onIteration=None):
+    """ Searches board with cores processes, until maxdepth is reached,
+        lsearch.endtime is passed or lsearch.searching is set False.
+        onIteration(depth, score, nodes, mvs) is called every time a new
+        depth is finished by any of the processes.
+        Returns a tuple of the principal variation, the score, and the depth
+        the result comes from. The workers' counters are summed up in
+        lsearch.stats. """
+
+    table = getSharedTable()
+    pawnTable = getSharedPawnTable()
+    results = context.Queue()
+    stop = context.Event()
+
+    workers = []
+    for wid in range(cores):
+        worker = context.Process(
+            target=_worker,
+            name="PyChess SMP worker %d" % wid,
+            args=(wid, board, maxdepth, (type(table), table.shared.name),
+                  pawnTable.shared.name, skipPruneChance, results, stop))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+
+    mvs, score, bestDepth = [], 0, 0
+    lsearch.nodes = 0
+    lsearch.stats.reset()
+    lastNodes, lastTime = 0, time()
+    running = cores
+    while running:
+        if not lsearch.searching or time() > lsearch.endtime:
+            stop.set()
+        try:
+            kind, wid, depth, scr, pv, nodes = results.get(
+                timeout=POLL_INTERVAL)
+        except Empty:
+            continue
+
+        lsearch.nodes += nodes
+        if kind == EXITED:
+            running -= 1
+            lsearch.stats.merge(pv)
+        elif depth > bestDepth:
+            mvs, score, bestDepth = pv, scr, depth
+            lsearch.stats.addIteration(depth, lsearch.nodes - lastNodes,
+                                       time() - lastTime)
+            lastNodes, lastTime = lsearch.nodes, time()
+            if onIteration:
+                onIteration(depth, score, lsearch.nodes, mvs)
+            if depth >= maxdepth:
+                stop.set()
+
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    return mvs, score, bestDepth
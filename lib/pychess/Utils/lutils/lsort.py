@@ -3,12 +3,25 @@ from __future__ import print_function
 import sys
 
 from .attack import staticExchangeEvaluate
+from .lmovegen import genAllMoves, genCaptures
+from .validator import isPseudoLegal
 from .ldata import PIECE_VALUES, ASEAN_PIECE_VALUES, PAWN_VALUE, MATE_VALUE
 from pychess.Utils.const import DROP, EMPTY, ASEAN_VARIANTS, PROMOTIONS, ATOMICCHESS
 from pychess.Utils.eval import pos as position_values
 from pychess.Variants.atomic import kingExplode
 
 
+# The SEE values of the captures getCaptureValue has looked at, by the board
+# hash, move and variant, as the quiescence search orders the captures of the
+# same positions over and over. Cleared when it reaches SEE_CACHE_SIZE entries.
+SEE_CACHE_SIZE = 1 << 16
+seeCache = {}
+
+
+def clearSeeCache():
+    seeCache.clear()
+
+
 def getCaptureValue(board, move):
     if board.variant in ASEAN_VARIANTS:
         mpV = ASEAN_PIECE_VALUES[board.arBoard[move >> 6 & 63]]
@@ -19,7 +32,13 @@ def getCaptureValue(board, move):
     if mpV < cpV:
         return cpV - mpV
     else:
-        temp = staticExchangeEvaluate(board, move)
+        key = (board.hash << 16 | move) << 6 | board.variant
+        temp = seeCache.get(key)
+        if temp is None:
+            temp = staticExchangeEvaluate(board, move)
+            if len(seeCache) >= SEE_CACHE_SIZE:
+                seeCache.clear()
+            seeCache[key] = temp
         return temp < 0 and -sys.maxsize or temp
 
 
@@ -102,3 +121,54 @@ def sortMoves(board, table, ply, hashmove, moves):
         return getMoveValue(board, table, ply, hashmove, move)
     moves.sort(key=sort_moves_func, reverse=True)
     return moves
+
+
+def pickMoves(board, table, depth):
+    """ Yields the moves of genAllMoves(board) as (-value, move) tuples, like
+        the sorted lists made with getMoveValue, but in stages, each of them
+        generated only when the previous one is used up:
+        1.  The move from the hash table
+        2.  Captures not losing material, by getCaptureValue
+        3.  Killers
+        4.  The other moves, by getMoveValue (promotions, drops, history)
+        5.  Captures losing material
+        As most cut-nodes fail high on one of the first moves, the quiet moves
+        are often never generated. Not for positions in check. """
+
+    done = set()
+
+    hashmove = table.hashmove[depth]
+    if hashmove != -1 and isPseudoLegal(board, hashmove):
+        done.add(hashmove)
+        yield -sys.maxsize, hashmove
+
+    captures = []
+    badCaptures = []
+    for move in genCaptures(board):
+        if move in done:
+            continue
+        done.add(move)
+        value = getCaptureValue(board, move)
+        if value == -sys.maxsize:
+            badCaptures.append(move)
+        else:
+            captures.append((-1000 - value, move))
+    captures.sort()
+    for item in captures:
+        yield item
+
+    arBoard = board.arBoard
+    for killer in (table.killer1[depth], table.killer2[depth]):
+        if killer != -1 and killer not in done and \
+                arBoard[killer & 63] == EMPTY and isPseudoLegal(board, killer):
+            done.add(killer)
+            yield -1000 - table.isKiller(depth, killer), killer
+
+    moves = [(-getMoveValue(board, table, depth, move), move)
+             for move in genAllMoves(board) if move not in done]
+    moves.sort()
+    for item in moves:
+        yield item
+
+    for move in badCaptures:
+        yield -1000, move
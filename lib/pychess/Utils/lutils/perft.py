@@ -1,22 +1,28 @@
 from __future__ import print_function
 
+import multiprocessing
 from time import time
 
-from pychess.Utils.lutils.lmovegen import genAllMoves
+from pychess.Utils.const import CAMBODIANCHESS, DROP_VARIANTS
+from pychess.Utils.lutils.lmovegen import genLegalMoves
 from pychess.Utils.lutils.lmove import toLAN
 
+# Variants where the zobrist hash doesn't cover everything the move generator
+# depends on (the holdings, or the first moves of the king and queen).
+NO_CACHE_VARIANTS = DROP_VARIANTS + (CAMBODIANCHESS, )
+
+# The subtree count cache of fast_perft is cleared when it reaches this many
+# entries.
+CACHE_SIZE = 1 << 20
+
 
 def do_perft(board, depth, root):
     nodes = 0
     if depth == 0:
         return 1
 
-    for move in genAllMoves(board):
+    for move in genLegalMoves(board):
         board.applyMove(move)
-        if board.opIsChecked():
-            board.popMove()
-            continue
-
         count = do_perft(board, depth - 1, root - 1)
         nodes += count
         board.popMove()
@@ -26,10 +32,87 @@ def do_perft(board, depth, root):
     return nodes
 
 
-def perft(board, depth, root):
+def countLegalMoves(board):
+    """ Counts the legal moves of board, like do_perft(board, 1, 0), without
+        making them. """
+    count = 0
+    for move in genLegalMoves(board):
+        count += 1
+    return count
+
+
+def fast_perft(board, depth, cache=None):
+    """ Returns the same node count as do_perft(board, depth, 0). The last ply
+        is counted by countLegalMoves, and the counts of subtrees are
+        remembered in cache, a dict keyed on hash and depth, as the same
+        positions are reached by many move orders. """
+
+    if depth <= 1:
+        return countLegalMoves(board) if depth == 1 else 1
+
+    if cache is not None and board.variant not in NO_CACHE_VARIANTS:
+        key = board.hash << 8 | depth
+        nodes = cache.get(key)
+        if nodes is not None:
+            return nodes
+    else:
+        key = None
+
+    nodes = 0
+    for move in genLegalMoves(board):
+        board.applyMove(move)
+        nodes += fast_perft(board, depth - 1, cache)
+        board.popMove()
+
+    if key is not None:
+        if len(cache) >= CACHE_SIZE:
+            cache.clear()
+        cache[key] = nodes
+    return nodes
+
+
+def _perftMove(args):
+    board, move, depth = args
+    board.applyMove(move)
+    return move, fast_perft(board, depth - 1, {})
+
+
+def parallel_perft(board, depth, processes=None):
+    """ Runs fast_perft with the root moves split among a pool of processes
+        (by default one per cpu). Returns a list of (move, count) tuples, in
+        the order of genLegalMoves. """
+
+    moves = list(genLegalMoves(board))
+
+    if depth <= 1:
+        return [(move, 1) for move in moves]
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_perftMove, [(board, move, depth) for move in moves],
+                        chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def perft(board, depth, root, processes=0):
+    """ Prints the node counts for depths 1 to depth. If root is above 0, the
+        counts of the root moves are printed too. With processes above 0 the
+        fast perft is used, split among that many processes if above 1. """
+
     for i in range(depth):
         start_time = time()
-        nodes = do_perft(board, i + 1, root)
+        if processes > 1:
+            counts = parallel_perft(board, i + 1, processes)
+            nodes = sum(count for move, count in counts)
+            if root > 0:
+                for move, count in counts:
+                    print("%8s %10d" % (toLAN(board, move), count))
+        elif processes == 1:
+            nodes = fast_perft(board, i + 1, {})
+        else:
+            nodes = do_perft(board, i + 1, root)
         ttime = time() - start_time
         print("%2d %10d %5.2f %12.2fnps" %
               (i + 1, nodes, ttime, nodes / ttime))
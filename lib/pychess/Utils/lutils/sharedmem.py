@@ -0,0 +1,79 @@
+from __future__ import absolute_import
+
+# Named memory blocks, which can be attached to from other processes.
+# Python 3.8+ has multiprocessing.shared_memory. Elsewhere we fall back to an
+# mmap of a file in the temp directory.
+
+import mmap
+import os
+import tempfile
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+# Names of the blocks created by this process
+_created = set()
+
+
+class SharedBuffer(object):
+    """ A writable buffer of at least size bytes, shared by name.
+        If create is False, an existing buffer called name is attached to, and
+        size is ignored. The actual size is len(self.buf). """
+
+    def __init__(self, name, size=0, create=True):
+        self.name = name
+        self.created = create
+
+        if shared_memory is not None:
+            if create:
+                self._shm = shared_memory.SharedMemory(name=name, create=True,
+                                                       size=size)
+                _created.add(name)
+            else:
+                self._shm = shared_memory.SharedMemory(name=name)
+                self._untrack()
+            self.buf = self._shm.buf
+        else:
+            path = os.path.join(tempfile.gettempdir(), name)
+            with open(path, "w+b" if create else "r+b") as f:
+                if create:
+                    f.truncate(size)
+                self.buf = mmap.mmap(f.fileno(), 0)
+            self._path = path
+
+    def _untrack(self):
+        # The resource tracker of an unrelated process would remove the block
+        # when that process exits. Only the creator should decide when it goes
+        # away. Our own multiprocessing children share the creator's tracker,
+        # so they must leave its registration alone, and so must the creator
+        # when it attaches to its own block.
+        if self.name in _created:
+            return
+        try:
+            import multiprocessing
+            if multiprocessing.parent_process() is not None:
+                return
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        except (ImportError, AttributeError, KeyError):
+            pass
+
+    def __len__(self):
+        return len(self.buf)
+
+    def close(self):
+        if shared_memory is not None:
+            self.buf.release()
+            self._shm.close()
+        else:
+            self.buf.close()
+
+    def unlink(self):
+        """ Removes the name. Attached processes keep their mapping. """
+        if shared_memory is not None:
+            self._shm.unlink()
+            _created.discard(self.name)
+        else:
+            os.remove(self._path)
@@ -11,7 +11,7 @@ from .ldata import brank48, brank67, bitPosArray, left, right,\
     fromToRay, outpost, FILE, PIECE_VALUES,\
     ray45, ray135, ray90, ray00
 
-from .bitboard import clearBit, lastBit, iterBits
+from .bitboard import clearBit, lastBit, iterBits, bitCount
 from pychess.Utils.lutils.attack import staticExchangeEvaluate, getAttacks, \
     defends
 from pychess.Utils.lutils.lmove import toSAN, TCORD, FCORD, FLAG, PROMOTE_PIECE
@@ -111,7 +111,7 @@ def offencive_moves_rook(model, ply, phase):
     ffile = fileBits[FILE(FCORD(move))]
     tfile = fileBits[FILE(tcord)]
 
-    if ffile & pawns and not tfile & pawns and bin(pawns).count("1") >= 3:
+    if ffile & pawns and not tfile & pawns and bitCount(pawns) >= 3:
         if not tfile & oppawns:
             yield _("moves a rook to an open file")
         else:
@@ -340,7 +340,7 @@ def offencive_moves_pin(model, ply, phase):
                 continue
             # There should be exactly one opponent piece in between
             op = clearBit(ray & board.friends[board.color], c)
-            if bin(op).count("1") != 1:
+            if bitCount(op) != 1:
                 continue
             # The king can't be pinned
             pinned = lastBit(op)
@@ -446,10 +446,10 @@ def state_pawn(model, ply, phase):
     for file in range(8):
         bits = fileBits[file]
 
-        count = bin(pawns & bits).count("1")
-        oldcount = bin(oldpawns & bits).count("1")
-        opcount = bin(oppawns & bits).count("1")
-        oldopcount = bin(oldoppawns & bits).count("1")
+        count = bitCount(pawns & bits)
+        oldcount = bitCount(oldpawns & bits)
+        opcount = bitCount(oppawns & bits)
+        oldopcount = bitCount(oldoppawns & bits)
 
         # Single pawn -> double pawns
         if count > oldcount >= 1:
@@ -676,10 +676,10 @@ def tip_pawnStorm(model, ply, phase):
 
     wking = board.boards[WHITE][KING]
     bking = board.boards[BLACK][KING]
-    wleft = bin(board.boards[WHITE][PAWN] & left).count("1")
-    wright = bin(board.boards[WHITE][PAWN] & right).count("1")
-    bleft = bin(board.boards[BLACK][PAWN] & left).count("1")
-    bright = bin(board.boards[BLACK][PAWN] & right).count("1")
+    wleft = bitCount(board.boards[WHITE][PAWN] & left)
+    wright = bitCount(board.boards[WHITE][PAWN] & right)
+    bleft = bitCount(board.boards[BLACK][PAWN] & left)
+    bright = bitCount(board.boards[BLACK][PAWN] & right)
 
     if wking & left and bking & right:
         if wright > bright:
@@ -1,7 +1,13 @@
 from __future__ import print_function
 
+from pychess.Utils.const import NORMAL_MOVE, ASEAN_VARIANTS, ATOMICCHESS, \
+    KNIGHT, BISHOP, ROOK, QUEEN, KING
+from pychess.Utils.lutils.bitboard import bitPosArray, clearBit
+from pychess.Utils.lutils.ldata import moveArray, fromToRay
 from pychess.Utils.lutils.lmovegen import genAllMoves
 
+PIECES = (KNIGHT, BISHOP, ROOK, QUEEN, KING)
+
 ################################################################################
 #   Validate move                                                              #
 ################################################################################
@@ -9,3 +15,25 @@ from pychess.Utils.lutils.lmovegen import genAllMoves
 
 def validateMove(board, move):
     return move in genAllMoves(board)
+
+
+def isPseudoLegal(board, move):
+    """ Same as validateMove, but without generating the moves, for the plain
+        moves of pieces. Used by the search to check hash and killer moves,
+        which may come from other positions. """
+
+    fcord = move >> 6 & 63
+    tcord = move & 63
+    piece = board.arBoard[fcord]
+    if move >> 12 != NORMAL_MOVE or piece not in PIECES or \
+            board.variant in ASEAN_VARIANTS or board.variant == ATOMICCHESS:
+        return move in genAllMoves(board)
+
+    friends = board.friends[board.color]
+    if not friends & bitPosArray[fcord] or friends & bitPosArray[tcord]:
+        return False
+    if not moveArray[piece][fcord] & bitPosArray[tcord]:
+        return False
+    if piece in (KNIGHT, KING):
+        return True
+    return not clearBit(fromToRay[fcord][tcord], tcord) & board.blocker
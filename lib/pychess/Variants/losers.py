@@ -2,6 +2,7 @@
 
 from pychess.Utils.const import LOSERSCHESS, VARIANTS_OTHER_NONSTANDARD
 from pychess.Utils.Board import Board
+from pychess.Utils.lutils.bitboard import bitCount
 
 
 class LosersBoard(Board):
@@ -21,4 +22,4 @@ class LosersBoard(Board):
 def testKingOnly(board):
     """ Checks to see if if a winning position has been acheived
     """
-    return bin(board.friends[board.color]).count("1") == 1
+    return bitCount(board.friends[board.color]) == 1
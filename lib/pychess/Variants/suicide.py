@@ -4,6 +4,7 @@ from __future__ import print_function
 from pychess.Utils.const import SUICIDECHESS, VARIANTS_OTHER_NONSTANDARD, KING_PROMOTION, \
     QUEEN_PROMOTION, ROOK_PROMOTION, BISHOP_PROMOTION, KNIGHT_PROMOTION
 from pychess.Utils.Board import Board
+from pychess.Utils.lutils.bitboard import bitCount
 
 SUICIDESTART = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"
 
@@ -29,7 +30,7 @@ class SuicideBoard(Board):
 
 
 def pieceCount(board, color):
-    return bin(board.friends[color]).count("1")
+    return bitCount(board.friends[color])
 
 
 if __name__ == '__main__':
@@ -19,10 +19,10 @@ class ThreeCheckBoard(Board):
 def checkCount(board):
     cc = 0
     lboard = board.clone()
-    while lboard.hist_move:
+    while lboard.hist is not None:
         if lboard.isChecked():
             cc += 1
         lboard.popMove()
-        if lboard.hist_move:
+        if lboard.hist is not None:
             lboard.popMove()
     return cc
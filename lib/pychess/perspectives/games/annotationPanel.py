@@ -1120,8 +1120,7 @@ class Sidepanel:
         log.debug("annotationPanel.players_changed: returning")
 
     def game_loaded(self, model, uri):
-        for ply in range(min(40, model.ply, len(model.boards))):
-            model.setOpening(ply)
+        model.setDeepestOpening()
         self.update()
 
     def __movestr(self, board):
@@ -6,79 +6,120 @@ from __future__ import print_function
 import os
 import sys
 import sqlite3
-import struct
+import hashlib
 
-from pychess.compat import memoryview, unicode
-from pychess.Savers.pgn import load
-from pychess.System.protoopen import protoopen
+from pychess.compat import memoryview, unicode, open
+from pychess.Savers.pgnbase import PgnBase, pgn_games
+from pychess.System.protoopen import PGN_ENCODING
 from pychess.System.prefix import addDataPrefix
+from pychess.Utils.const import FEN_START
 from pychess.Utils.eco import hash_struct
+from pychess.Utils.lutils.LBoard import LBoard
+import pychess.Utils.repr  # noqa, installs _ for the parsing errors
+
 
-    
 path = os.path.join(addDataPrefix("eco.db"))
 conn = sqlite3.connect(path)
 
-if __name__ == '__main__':
-    c = conn.cursor()
 
-    c.execute("drop table if exists openings")
+def digest(pgnfile):
+    with open(pgnfile, "rb") as f:
+        return unicode(hashlib.sha1(f.read()).hexdigest())
+
+
+def feed(pgnfile, lang, base_hashes):
+    """ Returns the rows of the openings of an eco.pgn. The last position of
+        each line is found by parsing its moves on a bare LBoard. Lines
+        without moves take the position of the first English line of their
+        ECO code, from base_hashes, which the English file fills in. """
+    rows = []
+    old_eco = ""
+    ply_max = 0
+    with open(pgnfile, "r", encoding=PGN_ENCODING) as f:
+        for game in pgn_games(f):
+            cf = PgnBase(f, [game])
+
+            eco = cf._getTag(0, "ECO")[:3]
+
+            opening = cf._getTag(0, "Opening")
+            variation = cf._getTag(0, "Variation")
 
-    # Unfortunately sqlite doesn't support uint64, so we have to use blob type to store polyglot-hash values
-    c.execute("create table openings(hash blob, base integer, eco text, lang text, opening text, variation text)")
-
-    def feed(pgnfile, lang):
-        cf = load(protoopen(pgnfile))
-        rows = []
-        old_eco = ""
-        ply_max = 0
-        for i, game in enumerate(cf.games):
-            model = cf.loadToModel(i)
-
-            eco = cf._getTag(i, "ECO")[:3]
-            
-            opening = cf._getTag(i, "Opening")
-            if opening is None:
-                opening = ""
-
-            variation = cf._getTag(i, "Variation")
-            if variation is None:
-                variation = ""
-            
             base = int(old_eco != eco)
-            
-            ply = len(model.moves)
+            old_eco = eco
+
+            board = LBoard()
+            board.applyFen(FEN_START)
+            boards = cf.parse_string(cf.get_movetext(0), board, -1,
+                                     pgn_import=True)
+            if cf.error is not None:
+                print("ERROR in %s %s" % (eco, opening), cf.error.args[0])
+                continue
+            ply = len(boards) - 1
             ply_max = max(ply_max, ply)
             if ply == 0:
-                cu = conn.cursor()
-                cu.execute("select * from openings where eco=? and lang='en' and base=1", (eco,))
-                res = cu.fetchone()
-                if res is not None:
-                    hash = res[0]
+                hash = base_hashes.get(eco)
+                if hash is None:
+                    continue
             else:
-                hash = memoryview(hash_struct.pack(model.boards[-1].board.hash))
-                
+                hash = memoryview(hash_struct.pack(boards[-1].hash))
+                if lang == "en" and base:
+                    base_hashes.setdefault(eco, hash)
+
             if opening:
-                rows.append((hash, base, unicode(eco), unicode(lang), unicode(opening), unicode(variation)))
-                
-            old_eco = eco
-                
-        c.executemany("insert into openings(hash, base, eco, lang, opening, variation) values (?, ?, ?, ?, ?, ?)", rows)
-        conn.commit()
+                rows.append((hash, base, unicode(eco), unicode(lang),
+                             unicode(opening), unicode(variation)))
+
+    print("Max ply was %s" % ply_max)
+    return rows
 
-        print("Max ply was %s" % ply_max)
 
+def build(force=False):
+    """ (Re)builds the openings of the languages whose eco.pgn changed since
+        the last build, or of all of them when the English one did, as the
+        others depend on it """
+    c = conn.cursor()
+
+    # Unfortunately sqlite doesn't support uint64, so we have to use blob type to store polyglot-hash values
+    c.execute("create table if not exists openings(hash blob, base integer, eco text, lang text, opening text, variation text)")
+    c.execute("create table if not exists sources(lang text primary key, digest text)")
+
+    langs = sorted(d for d in os.listdir("lang")
+                   if os.path.isfile("lang/%s/eco.pgn" % d))
     # Several eco list contains only eco+name pairs, so
-    # we will use base ECO line positions from en eco.pgn 
-    print("processing en eco.pgn")
-    feed("lang/en/eco.pgn", "en")
-    
-    for lang in [d for d in os.listdir("lang") if os.path.isdir("lang/"+d)]:
-        if lang == "en":
-            continue
-            
+    # we will use base ECO line positions from en eco.pgn
+    langs.remove("en")
+    langs.insert(0, "en")
+
+    digests = dict(c.execute("select lang, digest from sources"))
+    changed = [lang for lang in langs
+               if force or digests.get(lang) != digest("lang/%s/eco.pgn" % lang)]
+    if "en" in changed:
+        changed = langs
+
+    for lang in set(digests) - set(langs):
+        c.execute("delete from openings where lang=?", (lang, ))
+        c.execute("delete from sources where lang=?", (lang, ))
+
+    base_hashes = {}
+    if changed and "en" not in changed:
+        c.execute("select eco, hash from openings where lang='en' and base=1")
+        for eco, hash in c.fetchall():
+            base_hashes.setdefault(eco, hash)
+
+    for lang in changed:
         pgnfile = "lang/%s/eco.pgn" % lang
-        if os.path.isfile(pgnfile):
-            print("processing %s eco.pgn" % lang)
-            feed(pgnfile, lang)
-    
+        print("processing %s eco.pgn" % lang)
+        rows = feed(pgnfile, lang, base_hashes)
+        c.execute("delete from openings where lang=?", (lang, ))
+        c.executemany("insert into openings(hash, base, eco, lang, opening, variation) values (?, ?, ?, ?, ?, ?)", rows)
+        c.execute("insert or replace into sources(lang, digest) values (?, ?)",
+                  (lang, digest(pgnfile)))
+        conn.commit()
+
+    if not changed:
+        print("eco.db is up to date")
+
+
+if __name__ == '__main__':
+    build(force="--force" in sys.argv)
     conn.close()
@@ -102,7 +102,7 @@ class AtomicTestCase(unittest.TestCase):
         board = LBoard(variant=ATOMICCHESS)
         board.applyFen(FEN1)
         print(board)
-        hist_exploding_around0 = [a[:] for a in board.hist_exploding_around]
+        hist0 = board.hist
         print_apply_pop = False
 
         for lmove1 in genAllMoves(board):
@@ -113,8 +113,7 @@ class AtomicTestCase(unittest.TestCase):
                 board.popMove()
                 continue
 
-            hist_exploding_around1 = [a[:]
-                                      for a in board.hist_exploding_around]
+            hist1 = board.hist
             for lmove2 in genAllMoves(board):
                 board.applyMove(lmove2)
                 if print_apply_pop:
@@ -125,8 +124,7 @@ class AtomicTestCase(unittest.TestCase):
                     board.popMove()
                     continue
 
-                hist_exploding_around2 = [a[:]
-                                          for a in board.hist_exploding_around]
+                hist2 = board.hist
                 for lmove3 in genAllMoves(board):
                     board.applyMove(lmove3)
                     if print_apply_pop:
@@ -141,22 +139,19 @@ class AtomicTestCase(unittest.TestCase):
                     if print_apply_pop:
                         print("      popMove3", Move(lmove3))
 
-                    self.assertEqual(hist_exploding_around2,
-                                     board.hist_exploding_around)
+                    self.assertEqual(hist2, board.hist)
 
                 board.popMove()
                 if print_apply_pop:
                     print("   popMove2", Move(lmove2))
 
-                self.assertEqual(hist_exploding_around1,
-                                 board.hist_exploding_around)
+                self.assertEqual(hist1, board.hist)
 
             board.popMove()
             if print_apply_pop:
                 print("popMove1", Move(lmove1))
 
-            self.assertEqual(hist_exploding_around0,
-                             board.hist_exploding_around)
+            self.assertEqual(hist0, board.hist)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,42 @@
+import unittest
+
+from pychess.Utils.lutils.Benchmark import welchTest, compareResults
+
+
+def results(times):
+    return {"search": [{"depths": [{"times": times}]}],
+            "perft": [{"times": times}],
+            "eval": {"times": times}}
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def testWelch(self):
+        """Testing Welch's t-test p-values"""
+
+        t, p = welchTest([1.0, 1.1, 0.9, 1.05], [1.3, 1.4, 1.35, 1.2])
+        self.assertAlmostEqual(t, 4.968, 3)
+        self.assertAlmostEqual(p, 0.0025, 4)
+
+        t, p = welchTest([1.0, 2.0, 3.0], [1.0, 2.0, 3.0])
+        self.assertEqual(p, 1.0)
+
+        t, p = welchTest([1.0, 1.2, 0.8], [1.1, 0.9, 1.0])
+        self.assertGreater(p, 0.5)
+
+    def testCompare(self):
+        """Testing that only significant slowdowns are flagged"""
+
+        old = results([1.0, 1.02, 0.98, 1.01])
+        for name, oldTime, newTime, p, slower in compareResults(
+                old, results([1.5, 1.52, 1.48, 1.51])):
+            self.assertTrue(slower)
+        for name, oldTime, newTime, p, slower in compareResults(
+                old, results([0.5, 0.52, 0.48, 0.51])):
+            self.assertFalse(slower)
+        for name, oldTime, newTime, p, slower in compareResults(
+                old, results([0.8, 1.3, 0.9, 1.1])):
+            self.assertFalse(slower)
+
+
+if __name__ == '__main__':
+    unittest.main()
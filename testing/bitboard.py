@@ -4,7 +4,10 @@ import random
 import operator
 from functools import reduce
 
-from pychess.Utils.lutils.bitboard import setBit, clearBit, firstBit, lastBit, iterBits
+from pychess.Utils.lutils.bitboard import setBit, clearBit, firstBit, lastBit, iterBits, \
+    bitCount, tableBitCount
+from pychess.Utils.lutils.ldata import rookMask, rookAttacks, bishopMask, \
+    bishopAttacks
 
 
 class BitboardTestCase(unittest.TestCase):
@@ -52,6 +55,36 @@ class BitboardTestCase(unittest.TestCase):
             itered = sorted(iterBits(board))
             self.assertEqual(positions, itered)
 
+    def test5(self):
+        """Testing bitcount"""
+
+        for positions, board in self.positionSets:
+            self.assertEqual(len(positions), bitCount(board))
+            self.assertEqual(len(positions), tableBitCount(board))
+
+    def test4(self):
+        """Testing the sliding attack tables"""
+
+        def walk(cord, board, steps):
+            attacks = 0
+            for df, dr in steps:
+                f, r = cord & 7, cord >> 3
+                while 0 <= f + df < 8 and 0 <= r + dr < 8:
+                    f, r = f + df, r + dr
+                    attacks = setBit(attacks, r * 8 + f)
+                    if board & 1 << (63 - (r * 8 + f)):
+                        break
+            return attacks
+
+        for positions, board in self.positionSets:
+            for cord in range(64):
+                self.assertEqual(
+                    rookAttacks[cord][board & rookMask[cord]],
+                    walk(cord, board, ((0, 1), (0, -1), (1, 0), (-1, 0))))
+                self.assertEqual(
+                    bishopAttacks[cord][board & bishopMask[cord]],
+                    walk(cord, board, ((1, 1), (1, -1), (-1, 1), (-1, -1))))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,129 @@
+import os
+import sys
+import unittest
+from threading import Thread
+from time import sleep, time
+
+from pychess.compat import Queue
+from pychess.Players.PyChessCECP import PyChessCECP
+from pychess.Utils.const import NORMALCHESS
+from pychess.Utils.lutils import lsearch
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import parseSAN, toSAN
+from pychess.Utils.lutils.lmovegen import genAllMoves
+from pychess.Utils.lutils.validator import validateMove
+
+# Out of the opening book
+FEN = "r1bqkb1r/pppp1ppp/2n2n2/4p3/4P3/2N2N2/PPPP1PPP/R1BQKB1R w KQkq - 4 4"
+
+# Seconds to wait for the engine to move or to start pondering
+TIMEOUT = 30
+
+
+class Engine(PyChessCECP):
+    """ The CECP engine, reading its commands from a pipe and keeping its
+        output in self.output """
+
+    def __init__(self):
+        self.output = Queue()
+        PyChessCECP.__init__(self)
+
+    def print(self, text):
+        self.output.put(text)
+
+    def run(self):
+        try:
+            PyChessCECP.run(self)
+        except SystemExit:
+            pass
+
+
+class CECPTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = Engine()
+        r, w = os.pipe()
+        self.stdin = sys.stdin
+        sys.stdin = os.fdopen(r)
+        self.pipe = os.fdopen(w, "w")
+        self.thread = Thread(target=self.engine.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.board = LBoard(NORMALCHESS)
+        self.board.applyFen(FEN)
+        # One second per move, from a clock of one minute
+        self.send("setboard " + FEN, "hard", "level 0 1 0", "st 1",
+                  "time 6000", "otim 6000", "go")
+        self.expectMove()
+
+    def tearDown(self):
+        self.send("quit")
+        self.thread.join(TIMEOUT)
+        self.pipe.close()
+        sys.stdin.close()
+        sys.stdin = self.stdin
+        lsearch.searching = False
+
+    def send(self, *commands):
+        for command in commands:
+            self.pipe.write(command + "\n")
+        self.pipe.flush()
+
+    def expectMove(self):
+        """ Waits for the engine's move, and plays it on self.board """
+        while True:
+            line = self.engine.output.get(timeout=TIMEOUT)
+            if line.startswith("move "):
+                break
+        move = parseSAN(self.board, line.split()[1])
+        self.assertTrue(validateMove(self.board, move))
+        self.board.applyMove(move)
+
+    def waitForPondering(self):
+        end = time() + TIMEOUT
+        while not self.engine.pondering:
+            self.assertTrue(time() < end)
+            sleep(0.01)
+        # Let the ponder search run for a while
+        sleep(0.5)
+
+    def testPonderHit(self):
+        """Testing that a ponder hit continues the search, and that only the
+        time since the hit is charged to the clock"""
+
+        self.waitForPondering()
+        move = self.engine.ponderMove
+        san = toSAN(self.board, move)
+        self.board.applyMove(move)
+        self.send("time 6000")
+        start = time()
+        self.send("usermove " + san)
+        self.expectMove()
+        spent = time() - start
+        # The ponder search had used half of the second for the move
+        self.assertTrue(spent < 0.9)
+        charged = 60 - self.engine.clock[self.engine.playingAs]
+        self.assertTrue(0 < charged <= spent)
+
+    def testPonderMiss(self):
+        """Testing that an unexpected move stops pondering and starts a new
+        search"""
+
+        self.waitForPondering()
+        ponderMove = self.engine.ponderMove
+        move = [move for move in genAllMoves(self.board)
+                if move != ponderMove and validateMove(self.board, move)][0]
+        san = toSAN(self.board, move)
+        self.board.applyMove(move)
+        self.send("time 6000")
+        start = time()
+        self.send("usermove " + san)
+        self.expectMove()
+        spent = time() - start
+        self.assertTrue(spent >= 1)
+        charged = 60 - self.engine.clock[self.engine.playingAs]
+        self.assertTrue(1 <= charged <= spent)
+
+
+if __name__ == '__main__':
+    unittest.main()
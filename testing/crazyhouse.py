@@ -54,7 +54,7 @@ class CrazyhouseTestCase(unittest.TestCase):
         holding0 = (board.holding[0].copy(), board.holding[1].copy())
         promoted0 = board.promoted[:]
         capture_promoting0 = board.capture_promoting
-        hist_capture_promoting0 = board.hist_capture_promoting[:]
+        hist0 = board.hist
 
         print_board_promoted = False
         print_apply_pop = False
@@ -77,7 +77,7 @@ class CrazyhouseTestCase(unittest.TestCase):
             holding1 = (board.holding[0].copy(), board.holding[1].copy())
             promoted1 = board.promoted[:]
             capture_promoting1 = board.capture_promoting
-            hist_capture_promoting1 = board.hist_capture_promoting[:]
+            hist1 = board.hist
             for lmove2 in genAllMoves(board):
                 # if lmove2 != parseAN(board, "e8f7"):
                 #   continue
@@ -96,7 +96,7 @@ class CrazyhouseTestCase(unittest.TestCase):
                 holding2 = (board.holding[0].copy(), board.holding[1].copy())
                 promoted2 = board.promoted[:]
                 capture_promoting2 = board.capture_promoting
-                hist_capture_promoting2 = board.hist_capture_promoting[:]
+                hist2 = board.hist
                 for lmove3 in genAllMoves(board):
                     # if lmove3 != parseAN(board, "b8c8"):
                     #   continue
@@ -123,8 +123,7 @@ class CrazyhouseTestCase(unittest.TestCase):
                     self.assertEqual(promoted2, board.promoted)
                     self.assertEqual(capture_promoting2,
                                      board.capture_promoting)
-                    self.assertEqual(hist_capture_promoting2,
-                                     board.hist_capture_promoting)
+                    self.assertEqual(hist2, board.hist)
 
                 board.popMove()
                 if print_apply_pop:
@@ -136,8 +135,7 @@ class CrazyhouseTestCase(unittest.TestCase):
                 self.assertEqual(holding1, board.holding)
                 self.assertEqual(promoted1, board.promoted)
                 self.assertEqual(capture_promoting1, board.capture_promoting)
-                self.assertEqual(hist_capture_promoting1,
-                                 board.hist_capture_promoting)
+                self.assertEqual(hist1, board.hist)
 
             board.popMove()
             if print_apply_pop:
@@ -149,8 +147,7 @@ class CrazyhouseTestCase(unittest.TestCase):
             self.assertEqual(holding0, board.holding)
             self.assertEqual(promoted0, board.promoted)
             self.assertEqual(capture_promoting0, board.capture_promoting)
-            self.assertEqual(hist_capture_promoting0,
-                             board.hist_capture_promoting)
+            self.assertEqual(hist0, board.hist)
 
 
 if __name__ == '__main__':
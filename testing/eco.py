@@ -0,0 +1,72 @@
+import sqlite3
+import unittest
+
+from pychess.compat import memoryview
+from pychess.Utils.const import NORMALCHESS, FEN_START
+from pychess.Utils.eco import EcoIndex, hash_struct
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import parseSAN
+
+
+def hashes(sans):
+    """ Returns the hashes of the positions after each move """
+    board = LBoard(NORMALCHESS)
+    board.applyFen(FEN_START)
+    result = []
+    for san in sans.split():
+        board.applyMove(parseSAN(board, san))
+        result.append(board.hash)
+    return result
+
+
+OPENINGS = (
+    ("e4", "B00", "en", "King's pawn", ""),
+    ("e4 c5", "B20", "en", "Sicilian defence", ""),
+    ("e4 c5", "B20", "hu", "Szicilia", ""),
+    ("d4 d5 c4", "D06", "en", "Queen's Gambit", ""),
+    ("d4 d5 c4 e6", "D30", "en", "Queen's Gambit declined", ""),
+    ("d4 d5 c4 e6", "D30", "en", "QGD", "duplicate"),
+)
+
+
+class EcoTestCase(unittest.TestCase):
+    def setUp(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("create table openings(hash blob, base integer, "
+                     "eco text, lang text, opening text, variation text)")
+        for sans, eco, lang, opening, variation in OPENINGS:
+            conn.execute("insert into openings values (?, 0, ?, ?, ?, ?)",
+                         (memoryview(hash_struct.pack(hashes(sans)[-1])),
+                          eco, lang, opening, variation))
+        self.index = EcoIndex(conn)
+        conn.close()
+
+    def testGet(self):
+        """Testing looking up openings by hash and language"""
+        index = self.index
+        self.assertEqual(len(index), 5)
+        sicilian = hashes("e4 c5")[-1]
+        self.assertEqual(index.get(sicilian, "en"),
+                         ("B20", "Sicilian defence", ""))
+        self.assertEqual(index.get(sicilian, "hu"),
+                         ("B20", "Szicilia", ""))
+        self.assertEqual(index.get(sicilian, "de"), None)
+        self.assertEqual(index.get(hashes("d4")[-1], "en"), None)
+        # The first line of a position wins
+        self.assertEqual(index.get(hashes("d4 d5 c4 e6")[-1], "en"),
+                         ("D30", "Queen's Gambit declined", ""))
+
+    def testDeepest(self):
+        """Testing finding the deepest opening of a game"""
+        index = self.index
+        self.assertEqual(index.deepest(hashes("e4 c5 Nf3 d6"), "en"),
+                         ("B20", "Sicilian defence", ""))
+        self.assertEqual(index.deepest(hashes("d4 Nf6 Nf3"), "en"), None)
+        self.assertEqual(index.deepest([], "en"), None)
+        # By transposition
+        self.assertEqual(index.deepest(hashes("c4 e6 d4 d5 Nc3"), "en"),
+                         ("D30", "Queen's Gambit declined", ""))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,22 @@
+import os
+import random
 import unittest
 
-from pychess.Utils.const import WHITE, BLACK, NORMALCHESS
+from pychess.Utils.const import WHITE, BLACK, NORMALCHESS, ATOMICCHESS, \
+    CRAZYHOUSECHESS, SUICIDECHESS, MAKRUKCHESS, FEN_START, PAWN
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.leval import evaluateComplete
+from pychess.Utils.lutils.lmovegen import genLegalMoves
 from pychess.Utils.lutils import leval
+from pychess.Utils.lutils.PawnTable import PawnTable
+from pychess.Utils.lutils.EvalProfiler import EvalProfiler, TERMS, \
+    readPositions
+from pychess.Variants.asean import MAKRUKSTART
+
+try:
+    from pychess.Utils.lutils.NumpyEval import evaluateBatch, boardsToArrays
+except ImportError:
+    evaluateBatch = None
 
 
 class EvalTestCase(unittest.TestCase):
@@ -56,6 +69,130 @@ class EvalTestCase(unittest.TestCase):
             # print func, sw, sb
             self.assertEqual(sw, sb)
 
+    def test4(self):
+        """Testing the material kept by applyMove and popMove"""
+
+        def counted(board):
+            return [sum(board.pieceValues[piece] * count
+                        for piece, count in enumerate(board.pieceCount[color]))
+                    for color in (WHITE, BLACK)]
+
+        rand = random.Random(42)
+        for variant, fen in ((NORMALCHESS, FEN_START),
+                             (ATOMICCHESS, FEN_START),
+                             (CRAZYHOUSECHESS, FEN_START),
+                             (SUICIDECHESS, FEN_START),
+                             (MAKRUKCHESS, MAKRUKSTART)):
+            board = LBoard(variant)
+            board.applyFen(fen)
+            start = board.material[:]
+            for ply in range(120):
+                moves = list(genLegalMoves(board))
+                if not moves:
+                    break
+                board.applyMove(rand.choice(moves))
+                self.assertEqual(board.material, counted(board))
+            while board.hist is not None:
+                board.popMove()
+            self.assertEqual(board.material, start)
+
+    def test5(self):
+        """Testing evaluateBatch against evaluateComplete"""
+
+        if evaluateBatch is None:
+            return
+
+        rand = random.Random(7)
+        boards = []
+        for game in range(30):
+            board = LBoard(NORMALCHESS)
+            board.applyFen(FEN_START)
+            for ply in range(rand.randint(0, 120)):
+                moves = list(genLegalMoves(board))
+                if not moves:
+                    break
+                board.applyMove(rand.choice(moves))
+                if ply % 10 == 0:
+                    boards.append(board.clone())
+            boards.append(board)
+
+        scores = evaluateBatch(*boardsToArrays(boards))
+        self.assertEqual(len(scores), len(boards))
+        for board, score in zip(boards, scores):
+            # The batch leaves out the trapped bishops
+            leval.clearPawnTable()
+            expected = evaluateComplete(board, board.color) - \
+                leval.evalTrappedBishops(board, board.color)
+            self.assertEqual(score, expected, board.asFen())
+
+    def test6(self):
+        """Testing the pawn table, also when shared"""
+
+        name = "pychess-test-pawns-%d" % os.getpid()
+        table = PawnTable(64 * 1024, name)
+        try:
+            attached = PawnTable(0, name, create=False)
+            entry = (-123, 0x00ff000000000000, 0x8000000000000001,
+                     0x16054300)
+            self.assertEqual(table.probe(0x1234, 3), None)
+            table.record(0x1234, 3, *entry)
+            self.assertEqual(attached.probe(0x1234, 3), entry)
+            self.assertEqual(attached.probe(0x1234, 4), None)
+            self.assertEqual((attached.probes, attached.hits), (2, 1))
+            attached.close()
+        finally:
+            table.close()
+
+        old = leval.pawnTable
+        leval.setPawnTableSize(4096)
+        try:
+            board = LBoard(NORMALCHESS)
+            board.applyFen(
+                "r1bq1rk1/pp3ppp/2n2n2/8/8/2N2N2/PPP2P1P/1KBR1Q1R w - - 0 1")
+            score = evaluateComplete(board, WHITE)
+            # The white king's shelter is computed along with the pawn terms,
+            # which are then reused without probing the table again
+            table = leval.pawnTable
+            self.assertEqual((table.probes, table.hits, table.lastKeyHits),
+                             (1, 0, 1))
+            phase = leval.evalMaterial(board, WHITE)[1]
+            shelters = leval.pawnEntry(board, phase)[3]
+            self.assertEqual(
+                [shelters >> shift & 0xff for shift in (0, 8, 16, 24)],
+                [leval.kingShelter(board.boards[WHITE][PAWN], WHITE, False),
+                 leval.kingShelter(board.boards[WHITE][PAWN], WHITE, True),
+                 leval.kingShelter(board.boards[BLACK][PAWN], BLACK, False),
+                 leval.kingShelter(board.boards[BLACK][PAWN], BLACK, True)])
+            leval.clearPawnTable()
+            self.assertEqual(evaluateComplete(board, WHITE), score)
+        finally:
+            leval.setPawnTable(old)
+
+    def test7(self):
+        """Testing the evaluation profiler"""
+
+        with open("gamefiles/bilbao.pgn") as f:
+            boards = readPositions(f, 2)
+        expected = [evaluateComplete(board, board.color) for board in boards]
+
+        originals = [getattr(leval, term) for term in TERMS]
+        profiler = EvalProfiler()
+        profiler.profile(boards, 2)
+        self.assertEqual([getattr(leval, term) for term in TERMS], originals)
+
+        calls = [entry[0] for entry in profiler.stats["evalMaterial"]]
+        self.assertEqual(sum(calls), 2 * len(boards))
+        self.assertEqual(profiler.total[0], 2 * len(boards))
+        self.assertEqual(
+            sum(entry[0] for entry in profiler.stats["evalKing"]),
+            4 * len(boards))
+
+        with profiler:
+            self.assertNotEqual(leval.evalMaterial, originals[0])
+            self.assertEqual([evaluateComplete(board, board.color)
+                              for board in boards], expected)
+        self.assertEqual(leval.evalMaterial, originals[0])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+from threading import Thread
+
+from pychess.Utils.const import NORMALCHESS
+from pychess.Utils.lutils import lsearch, lsmp
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmovegen import genAllMoves
+
+FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+# Seconds a search of depth 3 may take, starting the workers included
+TIMEOUT = 120
+
+
+class LazySMPTestCase(unittest.TestCase):
+    def setUp(self):
+        self.board = LBoard(NORMALCHESS)
+        self.board.applyFen(FEN)
+        lsearch.searching = True
+        lsearch.endtime = sys.maxsize
+
+    def search(self):
+        """ Runs lsmp.search on another thread, as the CECP engine does, and
+            returns its result, or None if it didn't finish in time """
+        result = []
+
+        def think():
+            result.append(lsmp.search(self.board, 3, 2))
+
+        thread = Thread(target=think)
+        thread.daemon = True
+        thread.start()
+        thread.join(TIMEOUT)
+        if thread.is_alive():
+            lsearch.searching = False
+            return None
+        return result[0]
+
+    def testSearch(self):
+        """Testing a search shared by two processes"""
+
+        result = self.search()
+        self.assertNotEqual(result, None)
+        mvs, score, depth = result
+        self.assertEqual(depth, 3)
+        self.assertTrue(mvs[0] in genAllMoves(self.board))
+        self.assertTrue(lsearch.stats.nodes > 0)
+
+    def testSearchWhileReadingStdin(self):
+        """Testing the workers start while the main thread reads stdin"""
+
+        # The engine's main thread waits for commands in raw_input, holding
+        # the lock of sys.stdin
+        r, w = os.pipe()
+        stdin = sys.stdin
+        sys.stdin = os.fdopen(r)
+        reader = Thread(target=sys.stdin.readline)
+        reader.daemon = True
+        reader.start()
+        try:
+            result = self.search()
+        finally:
+            os.write(w, b"quit\n")
+            reader.join()
+            os.close(w)
+            sys.stdin.close()
+            sys.stdin = stdin
+        self.assertNotEqual(result, None)
+        self.assertEqual(result[2], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
+import pickle
 import unittest
 
+from pychess.Utils.const import FEN_START
 from pychess.Utils.Move import Move
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.lmove import parseAN, parseSAN, parseFAN, toFAN, ParsingError
@@ -63,6 +65,31 @@ class MoveTestCase(unittest.TestCase):
             fan = toFAN(board, lmove)
             self.assertEqual(parseFAN(board, fan), lmove)
 
+    def test_clone(self):
+        """Testing that clones share the history without depending on it"""
+
+        board = LBoard()
+        board.applyFen(FEN_START)
+        for san in ("Nf3", "Nf6", "Ng1", "Ng8", "Nf3", "Nf6", "Ng1", "Ng8"):
+            board.applyMove(parseSAN(board, san))
+        self.assertEqual(board.repetitionCount(), 3)
+
+        clone = board.clone()
+        self.assertTrue(clone.hist is board.hist)
+        self.assertEqual(clone.repetitionCount(), 3)
+        clone.popMove()
+        clone.applyMove(parseSAN(clone, "Nc6"))
+        self.assertEqual(clone.repetitionCount(), 1)
+        self.assertEqual(board.repetitionCount(), 3)
+        self.assertEqual(repr(Move(board.lastMove)), "f6g8")
+
+        copy = pickle.loads(pickle.dumps(board, 2))
+        self.assertEqual(copy.asFen(), board.asFen())
+        self.assertEqual(copy.hist, board.hist)
+        while copy.hist is not None:
+            copy.popMove()
+        self.assertEqual(copy.asFen(), FEN_START)
+
 
 if __name__ == '__main__':
     unittest.main()
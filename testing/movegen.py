@@ -1,13 +1,15 @@
 from __future__ import print_function
 import unittest
 
-from pychess.Utils.lutils.lmovegen import genAllMoves, genCheckEvasions
+from pychess.Utils.lutils.lmovegen import genAllMoves, genCheckEvasions, genLegalMoves
 from pychess.Utils.lutils.LBoard import LBoard
 # from pychess.Utils.lutils.ldata import *
 from pychess.Utils.lutils.validator import validateMove
+from pychess.Utils.lutils.perft import fast_perft, parallel_perft
 
 from pychess.Utils.lutils.lmove import toSAN, parseSAN, ParsingError
-from pychess.Utils.const import NORMALCHESS, SITTUYINCHESS, CAMBODIANCHESS, MAKRUKCHESS
+from pychess.Utils.const import NORMALCHESS, SITTUYINCHESS, CAMBODIANCHESS, MAKRUKCHESS, \
+    CRAZYHOUSECHESS
 
 
 class FindMovesTestCase(unittest.TestCase):
@@ -169,5 +171,62 @@ class FindMovesTestCase(unittest.TestCase):
         self.MAXDEPTH = 3
         self.movegen(positions, MAKRUKCHESS)
 
+    def legalMoves(self, board, depth):
+        moves = []
+        for move in genAllMoves(board):
+            board.applyMove(move)
+            if not board.opIsChecked():
+                moves.append(move)
+            board.popMove()
+        self.assertEqual(sorted(genLegalMoves(board)), sorted(moves))
+        if depth > 1:
+            for move in moves:
+                board.applyMove(move)
+                self.legalMoves(board, depth - 1)
+                board.popMove()
+
+    def testLegalMoves(self):
+        """Testing the legal move generator with perftsuite.epd"""
+        for line in open('gamefiles/perftsuite.epd'):
+            if line.startswith("#"):
+                continue
+            board = LBoard(NORMALCHESS)
+            board.applyFen(line.split(";")[0])
+            self.legalMoves(board, 2)
+
+        for variant, fen in (
+                (CRAZYHOUSECHESS, "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/2N2N2/PPPP1PPP/R1BQK2R/Pp w KQkq - 4 5"),
+                (MAKRUKCHESS, "rnsmksnr/8/ppppp1pp/2P5/5p2/PP1PPPPP/8/RNSKMSNR w - - 0 3")):
+            board = LBoard(variant)
+            board.applyFen(fen)
+            self.legalMoves(board, 3)
+
+    def testFastPerft(self):
+        """Testing bulk counted and hashed perft with perftsuite.epd"""
+        cache = {}
+        for line in open('gamefiles/perftsuite.epd'):
+            if line.startswith("#"):
+                continue
+            parts = line.split(";")
+            board = LBoard(NORMALCHESS)
+            board.applyFen(parts[0])
+            hash = board.hash
+            for s in parts[1:4]:
+                depth, count = int(s[1]), int(s[3:].rstrip())
+                self.assertEqual(fast_perft(board, depth, cache), count)
+            self.assertEqual(board.hash, hash)
+
+        board = LBoard(MAKRUKCHESS)
+        board.applyFen("rnsmksnr/8/ppppp1pp/2P5/5p2/PP1PPPPP/8/RNSKMSNR w - - 0 3")
+        self.assertEqual(fast_perft(board, 3, {}), 17062)
+
+    def testParallelPerft(self):
+        """Testing perft with the root moves split among processes"""
+        board = LBoard(NORMALCHESS)
+        board.applyFen("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        counts = parallel_perft(board, 2, 2)
+        self.assertEqual(len(counts), 48)
+        self.assertEqual(sum(count for move, count in counts), 2039)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,15 @@
+import os
+import tempfile
 import unittest
 
 from pychess.Utils.Board import Board
+from pychess.Utils.const import WHITEWON, DRAW, FEN_START
 from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import parseAN
+from pychess.Utils import book
+from pychess.Utils.book import PolyglotBook, entrystruct
+from pychess.Utils.bookbuilder import GameFilter, BookBuilder, pgnGames, \
+    mergeBooks
 
 # Examples taken from http://alpha.uhasselt.be/Research/Algebra/Toga/book_format.html
 testcases = [
@@ -27,5 +35,163 @@ class PolyglotTestCase(unittest.TestCase):
             board.applyFen(testcase[0])
             self.assertEqual(board.hash, testcase[1])
 
+    def testBook(self):
+        """Testing probing a Polyglot book"""
+
+        # e2e4, d2d4 and g1f3 in the start position, and e7e5 after 1. e4
+        start, e4 = testcases[0][1], testcases[1][1]
+        entries = [(start - 1, 796, 1, 0, 0),
+                   (start, 796, 10, 30, 35),
+                   (start, 731, 8, 20, 22),
+                   (start, 405, 1, 2, 1),
+                   (e4, 3364, 5, 0, 0)]
+        entries.sort(key=lambda entry: entry[0])
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        with os.fdopen(fd, "wb") as f:
+            for entry in entries:
+                f.write(entrystruct.pack(*entry))
+
+        board = LBoard(Board)
+        board.applyFen(testcases[0][0])
+        expected = [(parseAN(board, "e2e4"), 10, 30, 35),
+                    (parseAN(board, "d2d4"), 8, 20, 22),
+                    (parseAN(board, "g1f3"), 1, 2, 1)]
+        indexLimit = book.INDEX_LIMIT
+        try:
+            for book.INDEX_LIMIT in (indexLimit, 0):
+                polyglot = PolyglotBook(path)
+                self.assertEqual(polyglot.keys is None, book.INDEX_LIMIT == 0)
+                self.assertEqual(polyglot.getOpenings(board), expected)
+                self.assertEqual(polyglot.entries(e4), [(3364, 5, 0, 0)])
+                self.assertEqual(polyglot.entries(start + 1), [])
+                self.assertEqual(polyglot.entries(0), [])
+                polyglot.close()
+        finally:
+            book.INDEX_LIMIT = indexLimit
+            os.remove(path)
+
+    def testReload(self):
+        """Testing that a reloaded book stays readable by its last user"""
+
+        old = book.book
+        if old is None:
+            return
+        board = LBoard()
+        board.applyFen(FEN_START)
+        openings = book.getOpenings(board)
+        self.assertTrue(openings)
+        book.loadBook()
+        self.assertFalse(book.book is old)
+        self.assertEqual(old.getOpenings(board), openings)
+        self.assertEqual(book.getOpenings(board), openings)
+
+    def testBuilder(self):
+        """Testing building a Polyglot book from a PGN file"""
+
+        pgnfile = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "gamefiles", "dortmund.pgn")
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        fd, spilled = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        try:
+            with BookBuilder() as builder:
+                builder.addGames(pgnGames(pgnfile, maxPly=10))
+                self.assertEqual(builder.games, 347)
+                entries = builder.write(path)
+            # Counting in small runs gives the same book
+            with BookBuilder(maxEntries=100) as builder:
+                builder.addGames(pgnGames(pgnfile, maxPly=10))
+                self.assertTrue(len(builder.runs) > 1)
+                self.assertEqual(builder.write(spilled), entries)
+            with open(path, "rb") as f1, open(spilled, "rb") as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+            polyglot = PolyglotBook(path)
+            self.assertEqual(polyglot.count, entries)
+            keys = [entry[0] for entry in polyglot]
+            self.assertEqual(keys, sorted(keys))
+            board = LBoard(Board)
+            board.applyFen(testcases[0][0])
+            self.assertEqual(polyglot.getOpenings(board),
+                             [(parseAN(board, "e2e4"), 198, 165, 198),
+                              (parseAN(board, "d2d4"), 179, 140, 179),
+                              (parseAN(board, "g1f3"), 46, 32, 46),
+                              (parseAN(board, "c2c4"), 13, 9, 13)])
+            polyglot.close()
+
+            gameFilter = GameFilter(minElo=2700, results=(WHITEWON, DRAW))
+            with BookBuilder() as builder:
+                builder.addGames(pgnGames(pgnfile, gameFilter, maxPly=10))
+                self.assertEqual(builder.games, 85)
+        finally:
+            os.remove(path)
+            os.remove(spilled)
+
+    def testGameFilter(self):
+        """Testing the filters of the games of a book"""
+
+        gameFilter = GameFilter(minElo=2500, fromDate=(2000, 6, 1),
+                                toDate=(2001,), results=(WHITEWON,))
+        self.assertTrue(gameFilter.accept(2600, 2500, (2001, 12, 31),
+                                          WHITEWON))
+        self.assertTrue(gameFilter.accept(2600, 2500, (2000, 7, 0),
+                                          WHITEWON))
+        self.assertFalse(gameFilter.accept(2600, 2500, (2000, 6, 1), DRAW))
+        self.assertFalse(gameFilter.accept(2600, 2499, (2000, 6, 1),
+                                           WHITEWON))
+        self.assertFalse(gameFilter.accept(2600, None, (2000, 6, 1),
+                                           WHITEWON))
+        self.assertFalse(gameFilter.accept(2600, 2500, (2000, 5, 31),
+                                           WHITEWON))
+        self.assertFalse(gameFilter.accept(2600, 2500, (2002, 1, 1),
+                                           WHITEWON))
+        self.assertFalse(gameFilter.accept(2600, 2500, (0, 0, 0), WHITEWON))
+
+    def testMerge(self):
+        """Testing merging Polyglot books by priority"""
+
+        start, e4 = testcases[0][1], testcases[1][1]
+        books = (
+            [(start, 796, 10, 30, 35), (e4, 3364, 5, 0, 0)],
+            [(start, 731, 8, 20, 22), (start + 1, 405, 1, 2, 1)],
+            [(start, 796, 0xffff, 2, 4), (start, 405, 3, 2, 1)],
+        )
+        paths = []
+        try:
+            for entries in books:
+                fd, path = tempfile.mkstemp(suffix=".bin")
+                with os.fdopen(fd, "wb") as f:
+                    for entry in entries:
+                        f.write(entrystruct.pack(*entry))
+                paths.append(path)
+            fd, path = tempfile.mkstemp(suffix=".bin")
+            os.close(fd)
+            paths.append(path)
+
+            # The first two books override the third one on the start
+            # position
+            self.assertEqual(mergeBooks([(paths[0], 1), (paths[1], 1),
+                                         (paths[2], 0)], path), 4)
+            polyglot = PolyglotBook(path)
+            self.assertEqual(list(polyglot),
+                             [(start, 796, 10, 30, 35),
+                              (start, 731, 8, 20, 22),
+                              (start + 1, 405, 1, 2, 1),
+                              (e4, 3364, 5, 0, 0)])
+            polyglot.close()
+
+            # Moves of books of the same priority are summed up, and scaled
+            # down to 16 bits
+            self.assertEqual(mergeBooks([(paths[0], 0), (paths[2], 0)],
+                                        path), 3)
+            polyglot = PolyglotBook(path)
+            self.assertEqual(polyglot.entries(start),
+                             [(796, 32772, 32, 39), (405, 1, 2, 1)])
+            polyglot.close()
+        finally:
+            for path in paths:
+                os.remove(path)
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,7 +4,9 @@ modules_to_test = (
     "bitboard",
     "database",
     "draw",
+    "eco",
     "eval",
+    "strateval",
     "fen",
     "frc_castling",
     "frc_movegen",
@@ -17,6 +19,12 @@ modules_to_test = (
     "sittuyin",
     "suicide",
     "zobrist",
+    "transposition",
+    "search",
+    "lsmp",
+    "cecp",
+    "see",
+    "benchmark",
     "polyglot",
     'ficsmanagers',
     'analysis',
@@ -0,0 +1,237 @@
+import sys
+import unittest
+
+from pychess.Utils.const import NORMALCHESS, WHITE, QUEEN, DRAW, WHITEWON, \
+    FEN_START, hashfBETA, hashfEXACT
+from pychess.Utils.lutils import lsearch
+from pychess.Utils.lutils.egtb_gaviota import EgtbGaviota
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import toSAN, parseAN
+from pychess.Utils.lutils.lmovegen import genAllMoves
+from pychess.Utils.lutils.lsort import getCaptureValue, pickMoves
+from pychess.Utils.lutils.validator import isPseudoLegal
+
+FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+class QueenWinsTables(EgtbGaviota):
+    """ Three men tables, where a white queen wins in 10 plies, without the
+        library. The probes are kept in self.probes. """
+
+    def __init__(self):
+        EgtbGaviota.__init__(self)
+        self.probes = []
+
+    def supports(self, size):
+        return sum(size) <= 3
+
+    def _probe(self, board, omitDepth, probeSoft):
+        self.probes.append((board.hash, omitDepth))
+        if board.boards[WHITE][QUEEN]:
+            return WHITEWON, None if omitDepth else 10
+        return DRAW, None
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.board = LBoard(NORMALCHESS)
+        self.board.applyFen(FEN)
+        lsearch.table.clear()
+        lsearch.searching = True
+        lsearch.endtime = sys.maxsize
+        lsearch.nodes = 0
+        lsearch.stats.reset()
+
+    def testStats(self):
+        """Testing the search statistics"""
+
+        score = 0
+        for depth in range(1, 5):
+            mvs, score = lsearch.aspirationSearch(self.board, depth, score)
+
+        stats = lsearch.stats.asDict()
+        self.assertEqual([it[0] for it in stats["iterations"]], [1, 2, 3, 4])
+        self.assertEqual(stats["nodes"], lsearch.nodes)
+        self.assertTrue(0 < stats["qnodes"] < stats["nodes"])
+        self.assertTrue(stats["ttCutoffs"] <= stats["ttHits"] <=
+                        stats["ttProbes"])
+        self.assertTrue(stats["ttHits"] > 0)
+        self.assertTrue(0 < stats["firstMoveCutoffs"] <= stats["cutoffs"])
+        self.assertTrue(0 < stats["firstMoveCutoffRate"] <= 1)
+        self.assertTrue(stats["branchingFactor"] > 1)
+        self.assertEqual(stats["egtbProbes"], 0)
+
+    def testAspiration(self):
+        """Testing that the aspiration windows are widened on a fail high or
+        low, and give the result of a full window search"""
+
+        depth = lsearch.ASPIRATION_DEPTH
+        mvs, score = lsearch.alphaBeta(self.board, depth)
+
+        windows = []
+
+        def alphaBeta(board, depth, alpha, beta):
+            windows.append((alpha, beta))
+            return search(board, depth, alpha, beta)
+
+        search = lsearch.alphaBeta
+        lsearch.alphaBeta = alphaBeta
+        try:
+            for guess in (score - 1000, score + 1000):
+                del windows[:]
+                lsearch.table.clear()
+                result = lsearch.aspirationSearch(self.board, depth, guess)
+                self.assertEqual(result[0][0], mvs[0])
+                self.assertEqual(result[1], score)
+                # Only one bound moves, until the window holds the score
+                self.assertEqual(len(windows), 4)
+                if guess < score:
+                    self.assertEqual(len(set(a for a, b in windows)), 1)
+                    self.assertEqual(windows[-1][1], lsearch.MATE_VALUE)
+                else:
+                    self.assertEqual(len(set(b for a, b in windows)), 1)
+                    self.assertEqual(windows[-1][0], -lsearch.MATE_VALUE)
+        finally:
+            lsearch.alphaBeta = search
+
+    def testExtendPV(self):
+        """Testing that the principal variation is completed from the exact
+        table entries"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN_START)
+        table = lsearch.table
+        moves = [parseAN(board, an) for an in ("g1f3", "g8f6", "f3g1")]
+        for move in moves:
+            table.record(board, move, 0, hashfEXACT, 1)
+            board.applyMove(move)
+        # The line stops at an inexact entry
+        table.record(board, parseAN(board, "f6g8"), 0, hashfBETA, 1)
+        self.assertEqual(lsearch.extendPV(board, []), [])
+        for move in moves:
+            board.popMove()
+        self.assertEqual(lsearch.extendPV(board, moves[:1]), moves)
+        self.assertEqual(board.asFen(), FEN_START)
+
+        # ... and at a repetition
+        for move in moves:
+            board.applyMove(move)
+        last = parseAN(board, "f6g8")
+        table.record(board, last, 0, hashfEXACT, 1)
+        for move in moves:
+            board.popMove()
+        self.assertEqual(lsearch.extendPV(board, []), moves + [last])
+
+    def testPVTable(self):
+        """Testing that the principal variation is legal and reaches the
+        search depth"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN_START)
+        for depth in range(1, 5):
+            lsearch.table.clear()
+            mvs, score = lsearch.alphaBeta(board, depth)
+            # Nothing is hanging, so the quiescence search adds no moves
+            self.assertEqual(len(mvs), depth)
+            for move in mvs:
+                self.assertTrue(move in genAllMoves(board))
+                board.applyMove(move)
+                self.assertFalse(board.opIsChecked())
+            for move in mvs:
+                board.popMove()
+
+    def testMate(self):
+        """Testing that the search finds a mate in one"""
+
+        board = LBoard(NORMALCHESS)
+        board.applyFen("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1")
+        mvs, score = lsearch.alphaBeta(board, 3)
+        self.assertEqual(toSAN(board, mvs[0]), "Rd8#")
+        self.assertEqual(score, lsearch.MATE_VALUE - 1)
+
+    def testPickMoves(self):
+        """Testing that the staged move picker yields every move once"""
+
+        table = lsearch.table
+        hashmove = parseAN(self.board, "e2a6")
+        killer = parseAN(self.board, "a2a3")
+        table.setHashMove(4, hashmove)
+        table.addKiller(4, killer)
+        # A killer from another position, which isn't a move here
+        table.addKiller(4, parseAN(self.board, "h1h4"))
+
+        moves = [move for value, move in pickMoves(self.board, table, 4)]
+        self.assertEqual(sorted(moves), sorted(genAllMoves(self.board)))
+        self.assertEqual(moves[0], hashmove)
+        # Captures not losing material, then the killer
+        self.assertEqual(toSAN(self.board, moves[1]), "gxh3")
+        self.assertEqual(toSAN(self.board, moves[2]), "dxe6")
+        self.assertEqual(moves[3], killer)
+        # Captures losing material come last
+        self.assertEqual(getCaptureValue(self.board, moves[-1]), -sys.maxsize)
+
+    def testEgtbCache(self):
+        """Testing the cache of the end game table probes"""
+
+        tables = QueenWinsTables()
+        board = LBoard(NORMALCHESS)
+        board.applyFen("4k3/8/8/8/8/8/8/4QK2 b - - 0 1")
+        self.assertEqual(tables.scoreGame(board, True, False),
+                         (WHITEWON, None))
+        self.assertEqual(tables.scoreGame(board, True, False),
+                         (WHITEWON, None))
+        self.assertEqual(len(tables.probes), 1)
+        # The depth isn't known yet, and answers later probes of the result
+        self.assertEqual(tables.scoreGame(board, False, False),
+                         (WHITEWON, 10))
+        self.assertEqual(tables.scoreGame(board, True, False),
+                         (WHITEWON, None))
+        self.assertEqual(tables.scoreGame(board, False, False),
+                         (WHITEWON, 10))
+        self.assertEqual(len(tables.probes), 2)
+        stats = tables.getStats()
+        self.assertEqual(stats["cacheProbes"], 5)
+        self.assertEqual(stats["cacheHits"], 3)
+
+    def testEgtbSearch(self):
+        """Testing the search only probes results below the root"""
+
+        tables = QueenWinsTables()
+        egtb = lsearch.EndgameTable()
+        egtb.provider = tables
+        board = LBoard(NORMALCHESS)
+        board.applyFen("4k3/8/8/8/8/8/4r3/4Q1K1 w - - 0 1")
+        lsearch.egtb = egtb
+        try:
+            mvs, score = lsearch.alphaBeta(board, 2)
+        finally:
+            lsearch.egtb = None
+        self.assertEqual(toSAN(board, mvs[0]), "Qxe2+")
+        self.assertEqual(score, lsearch.TB_WIN_VALUE - 1)
+        self.assertTrue(tables.probes)
+        self.assertTrue(all(omitDepth for key, omitDepth in tables.probes))
+        self.assertTrue(lsearch.stats.egtbHits > 0)
+
+        # At the root, the tables give the distance to mate
+        board.applyMove(mvs[0])
+        board.applyMove(parseAN(board, "e8d8"))
+        lsearch.egtb = egtb
+        try:
+            mvs, score = lsearch.alphaBeta(board, 2)
+        finally:
+            lsearch.egtb = None
+        self.assertEqual(score, lsearch.MATE_VALUE - 10)
+
+    def testPseudoLegal(self):
+        """Testing the validation of hash and killer moves"""
+
+        moves = set(genAllMoves(self.board))
+        for fcord in range(64):
+            for tcord in range(64):
+                move = fcord << 6 | tcord
+                self.assertEqual(isPseudoLegal(self.board, move),
+                                 move in moves)
+
+
+if __name__ == '__main__':
+    unittest.main()
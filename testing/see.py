@@ -0,0 +1,105 @@
+import random
+import unittest
+
+from pychess.Utils.const import WHITE, BLACK, NORMALCHESS, ATOMICCHESS, \
+    CRAZYHOUSECHESS, SUICIDECHESS, MAKRUKCHESS, SITTUYINCHESS, FEN_START, \
+    DROP
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.attack import staticExchangeEvaluate
+from pychess.Utils.lutils.bitboard import bitPosArray
+from pychess.Utils.lutils.lmove import parseSAN
+from pychess.Utils.lutils.lmovegen import genAllMoves, genLegalMoves
+from pychess.Utils.lutils import lsort
+from pychess.Utils.lutils.perft import do_perft
+from pychess.Variants.asean import MAKRUKSTART, SITTUYINSTART
+
+# Values of the former SEE, which walked the attackers square by square
+SEE_VALUES = (
+    ("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1", "Rxe5", 100),
+    ("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1", "Nxe5",
+     -200),
+    ("4k3/8/8/3p4/4P3/8/8/3QK3 w - - 0 1", "exd5", 100),
+    ("4k3/3q4/8/3p4/4P3/5B2/8/3RK3 w - - 0 1", "exd5", 100),
+    ("3rk3/3q4/3r4/3p4/4P3/8/3Q4/3RK3 w - - 0 1", "exd5", 0),
+    ("4k3/8/2q5/3r4/4P3/5B2/8/4K3 w - - 0 1", "exd5", 500),
+)
+
+# Sums of all the SEE values in random games of each variant, as computed
+# by the former SEE
+SEE_DIGESTS = {
+    NORMALCHESS: -4584952220,
+    ATOMICCHESS: -1793103360,
+    CRAZYHOUSECHESS: -4925538310,
+    SUICIDECHESS: -4872614570,
+    MAKRUKCHESS: -3416490150,
+    SITTUYINCHESS: 3288516450,
+}
+
+
+def seeDigest(variant, fen, seed):
+    """ Sums up the SEE values of every move but drops, and of every
+        occupied square, in a random game, weighted by their order """
+    rand = random.Random(seed)
+    board = LBoard(variant)
+    board.applyFen(fen)
+    digest = 0
+    n = 0
+    for ply in range(150):
+        for move in genAllMoves(board):
+            if move >> 12 != DROP:
+                n += 1
+                digest += n * staticExchangeEvaluate(board, move)
+        for cord in range(64):
+            for color in (WHITE, BLACK):
+                if board.friends[color] & bitPosArray[cord]:
+                    n += 1
+                    digest += n * staticExchangeEvaluate(board, cord, color)
+        moves = list(genLegalMoves(board))
+        if not moves:
+            break
+        board.applyMove(rand.choice(moves))
+    return digest
+
+
+class SEETestCase(unittest.TestCase):
+    def testValues(self):
+        """Testing SEE on some known exchanges"""
+        for fen, san, value in SEE_VALUES:
+            board = LBoard(NORMALCHESS)
+            board.applyFen(fen)
+            move = parseSAN(board, san)
+            self.assertEqual(staticExchangeEvaluate(board, move), value, fen)
+
+    def testDigests(self):
+        """Testing SEE gives the values of the former implementation"""
+        for variant, fen in ((NORMALCHESS, FEN_START),
+                             (ATOMICCHESS, FEN_START),
+                             (CRAZYHOUSECHESS, FEN_START),
+                             (SUICIDECHESS, FEN_START),
+                             (MAKRUKCHESS, MAKRUKSTART),
+                             (SITTUYINCHESS, SITTUYINSTART)):
+            self.assertEqual(seeDigest(variant, fen, 42),
+                             SEE_DIGESTS[variant], variant)
+
+    def testCache(self):
+        """Testing the SEE cache of the capture ordering"""
+        board = LBoard(NORMALCHESS)
+        board.applyFen(SEE_VALUES[1][0])
+        lsort.clearSeeCache()
+        values = [lsort.getCaptureValue(board, move)
+                  for move in genAllMoves(board)]
+        self.assertEqual([lsort.getCaptureValue(board, move)
+                          for move in genAllMoves(board)], values)
+        self.assertTrue(lsort.seeCache)
+
+    def testPerft(self):
+        """Testing perft is unchanged by the SEE cache"""
+        board = LBoard(NORMALCHESS)
+        board.applyFen(
+            "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq "
+            "- 0 1")
+        self.assertEqual(do_perft(board, 2, 0), 2039)
+
+
+if __name__ == '__main__':
+    unittest.main()
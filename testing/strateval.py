@@ -0,0 +1,55 @@
+import unittest
+
+from pychess.Utils.const import NORMALCHESS, FEN_START
+from pychess.Utils.lutils import strateval
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import parseSAN
+
+
+class Node(object):
+    def __init__(self, board=None, move=None):
+        self.board = board
+        self.move = move
+
+
+class Model(object):
+    """ The boards and moves of a game, as strateval reads them from a
+        GameModel """
+
+    def __init__(self, sans):
+        board = LBoard(NORMALCHESS)
+        board.applyFen(FEN_START)
+        self.boards = [board]
+        self.moves = []
+        for san in sans.split():
+            move = parseSAN(board, san)
+            board = board.clone()
+            board.applyMove(move)
+            self.boards.append(board)
+            self.moves.append(move)
+        self.lowply = 0
+        self.ply = len(self.moves)
+
+    def getBoardAtPly(self, ply):
+        return Node(board=self.boards[ply])
+
+    def getMoveAtPly(self, ply):
+        return Node(move=self.moves[ply])
+
+
+class StratevalTestCase(unittest.TestCase):
+    def testPin(self):
+        """Testing the comment on a pinning move"""
+
+        model = Model("e4 e5 Nf3 Nc6 d4 d6 Bb5")
+        self.assertEqual(
+            list(strateval.offencive_moves_pin(model, model.ply, 0)),
+            ["pins an enemy knight on the king at e8"])
+
+        model = Model("e4 e5 Nf3 Nc6 d4 d6 Bc4")
+        self.assertEqual(
+            list(strateval.offencive_moves_pin(model, model.ply, 0)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import unittest
+
+from pychess.Utils.const import hashfALPHA, hashfBETA, hashfEXACT, hashfBAD
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import parseAN
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable, entryType
+
+try:
+    from pychess.Utils.lutils.NumpyTranspositionTable import \
+        NumpyTranspositionTable
+except ImportError:
+    NumpyTranspositionTable = None
+
+FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+class TranspositionTableTestCase(unittest.TestCase):
+    tableClass = TranspositionTable
+
+    def setUp(self):
+        self.board = LBoard()
+        self.board.applyFen(FEN)
+        self.move = parseAN(self.board, "e2a6")
+
+    def testRecordProbe(self):
+        """Testing transposition table record and probe"""
+
+        table = self.tableClass(1024 * 1024)
+        self.assertEqual(table.probe(self.board, 1, -100, 100), None)
+
+        table.record(self.board, self.move, -42, hashfEXACT, 5)
+        self.assertEqual(table.probe(self.board, 5, -100, 100),
+                         (self.move, -42, hashfEXACT))
+        self.assertEqual(table.probe(self.board, 6, -100, 100),
+                         (self.move, -42, hashfBAD))
+
+        table.record(self.board, self.move, 120, hashfBETA, 5)
+        self.assertEqual(table.probe(self.board, 5, -100, 100),
+                         (self.move, 100, hashfBETA))
+
+        table.record(self.board, self.move, -120, hashfALPHA, 5)
+        self.assertEqual(table.probe(self.board, 5, -100, 100),
+                         (self.move, -100, hashfALPHA))
+
+        table.clear()
+        self.assertEqual(table.probe(self.board, 1, -100, 100), None)
+
+    def testProbePV(self):
+        """Testing that only exact entries give a principal variation move"""
+
+        table = self.tableClass(1024 * 1024)
+        self.assertEqual(table.probePV(self.board), None)
+
+        table.record(self.board, self.move, 42, hashfEXACT, 5)
+        self.assertEqual(table.probePV(self.board), self.move)
+
+        table.record(self.board, self.move, 42, hashfBETA, 5)
+        self.assertEqual(table.probePV(self.board), None)
+
+        table.record(self.board, self.move, 42, hashfALPHA, 5)
+        self.assertEqual(table.probePV(self.board), None)
+
+    def testTornEntry(self):
+        """Testing that an entry with a mismatching check word is ignored"""
+
+        table = self.tableClass(1024 * 1024)
+        table.record(self.board, self.move, 42, hashfEXACT, 5)
+
+        offset = (self.board.hash % table.buckets) * 4 * entryType.size
+        check, data = entryType.unpack_from(table.data, offset)
+        entryType.pack_into(table.data, offset, check, data ^ 1)
+        self.assertEqual(table.probe(self.board, 5, -100, 100), None)
+
+    def testShared(self):
+        """Testing attaching to a named transposition table"""
+
+        name = "pychess-test-tt-%d" % os.getpid()
+        table = self.tableClass(1024 * 1024, name)
+        try:
+            attached = self.tableClass(0, name, create=False)
+            self.assertEqual(attached.size, table.size)
+
+            table.record(self.board, self.move, 42, hashfEXACT, 5)
+            self.assertEqual(attached.probe(self.board, 5, -100, 100),
+                             (self.move, 42, hashfEXACT))
+            attached.close()
+        finally:
+            table.close()
+
+    def testMixed(self):
+        """Testing that both implementations read each other's entries"""
+
+        if NumpyTranspositionTable is None:
+            return
+        other = NumpyTranspositionTable \
+            if self.tableClass is TranspositionTable else TranspositionTable
+        name = "pychess-test-tt-%d" % os.getpid()
+        table = self.tableClass(1024 * 1024, name)
+        try:
+            attached = other(0, name, create=False)
+            table.record(self.board, self.move, -42, hashfBETA, 5)
+            self.assertEqual(attached.probe(self.board, 5, -100, -50),
+                             (self.move, -50, hashfBETA))
+            attached.close()
+        finally:
+            table.close()
+
+
+if NumpyTranspositionTable is not None:
+    class NumpyTranspositionTableTestCase(TranspositionTableTestCase):
+        tableClass = NumpyTranspositionTable
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@ import unittest
 from pychess.Utils.Board import Board
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.lmove import parseAN
+from pychess.Utils.lutils.lmovegen import newMove
+from pychess.Utils.const import NULL_MOVE
 
 FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
 
@@ -91,6 +93,22 @@ class ZobristTestCase(unittest.TestCase):
 
         self.assertEqual(hash1, hash2)
 
+    def testZobrist_5(self):
+        """Testing zobrist hashing with a null move and take back"""
+
+        self.make_move("a2a4")
+        fen = self.board.asFen()
+        hash1 = self.board.hash
+
+        self.board.applyMove(newMove(0, 0, NULL_MOVE))
+        self.assertNotEqual(hash1, self.board.hash)
+        self.assertEqual(self.board.enpassant, None)
+        self.board.popMove()
+
+        self.assertEqual(hash1, self.board.hash)
+        self.assertEqual(fen, self.board.asFen())
+        self.make_move("b4a3")
+
 
 if __name__ == '__main__':
     unittest.main()